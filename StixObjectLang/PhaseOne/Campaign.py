@@ -11,10 +11,13 @@ from langchain_experimental.tabular_synthetic_data.prompts import (
     SYNTHETIC_FEW_SHOT_PREFIX,
     SYNTHETIC_FEW_SHOT_SUFFIX,
 )
-from langchain_community.chat_models import ChatOpenAI
+
+from StixObjectLang import engine, few_shot, registry, replay
 
 dotenv.load_dotenv()
 
+STIX_TYPE = "campaign"
+
 # Define the Campaign schema
 class Campaign(BaseModel):
     type: str = Field(default="campaign")
@@ -28,44 +31,52 @@ class Campaign(BaseModel):
     first_seen: Optional[str] = Field(default=None, description="Time that this Campaign was first seen")
     last_seen: Optional[str] = Field(default=None, description="Time that this Campaign was last seen")
     objective: Optional[str] = Field(default=None, description="Campaign's primary goal or desired outcome")
-    
-# Sample data as examples
-examples = [
-    {"example": """Type: campaign, Name: Green Group Attacks Against Finance, Description: Campaign by Green Group against a series of targets in the financial services sector., First Seen: 2016-01-01T00:00:00Z, Last Seen: 2016-06-30T00:00:00Z, Objective: Steal financial data and disrupt operations, Aliases: [Operation Money Grab, Finance Sector Assault]"""},
-    {"example": """Type: campaign, Name: Operation Clipboard, Description: A series of spear-phishing attacks targeting government agencies to steal classified information., First Seen: 2018-03-15T00:00:00Z, Last Seen: 2019-12-31T00:00:00Z, Objective: Espionage and data exfiltration, Aliases: [ClipperCrew Campaign, Govt-Spear]"""},
-    {"example": """Type: campaign, Name: Ransomware Wave Alpha, Description: Widespread ransomware attacks against healthcare institutions using a new strain of malware., First Seen: 2020-09-01T00:00:00Z, Last Seen: 2021-03-31T00:00:00Z, Objective: Extort money from healthcare providers, Aliases: [MediLock Campaign, Healthcare Ransom Spree]"""},
-]
+
 
 OPENAI_TEMPLATE = PromptTemplate(input_variables=["example"], template="{example}")
 
-prompt_template = FewShotPromptTemplate(
-    prefix=SYNTHETIC_FEW_SHOT_PREFIX,
-    examples=examples,
-    suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
-    input_variables=["subject", "extra"],
-    example_prompt=OPENAI_TEMPLATE,
-)
+def build_generator():
+    """
+    Build the LangChain data generator for campaign entries.
 
-# Create a LangChain data generator
-synthetic_data_generator = create_openai_data_generator(
-    output_schema=Campaign,
-    llm=ChatOpenAI(temperature=1, model='gpt-4o'),
-    prompt=prompt_template,
-)
+    Called once by the StixObjectLang registry on first use, so importing this
+    module does not construct an LLM client.
+    """
+    prompt_template = FewShotPromptTemplate(
+        prefix=SYNTHETIC_FEW_SHOT_PREFIX,
+        example_selector=few_shot.build_selector(STIX_TYPE),
+        suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
+        input_variables=["subject", "extra"],
+        example_prompt=OPENAI_TEMPLATE,
+    )
+
+    # Create a LangChain data generator
+    return create_openai_data_generator(
+        output_schema=Campaign,
+        llm=replay.chat_model(temperature=1, model='gpt-4o'),
+        prompt=prompt_template,
+    )
 
-def generate_campaigns(count: int) -> List[Campaign]:
+def generate_campaigns(count: int, max_concurrency: Optional[int] = None,
+                       batch_size: Optional[int] = None) -> List[Campaign]:
     """
     Generate synthetic campaign entries.
     
     Args:
         count (int): Number of campaign entries to generate.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight. Defaults to STIX_GEN_MAX_CONCURRENCY.
+        batch_size (Optional[int]): Records requested per LLM call. Defaults to STIX_GEN_BATCH_SIZE.
     
     Returns:
         List[Campaign]: List of generated campaign entries.
     """
-    synthetic_results = synthetic_data_generator.generate(
+    synthetic_results = engine.generate(
+        registry.get_generator(STIX_TYPE),
         subject="campaign",
         extra="Create unique and diverse campaigns with realistic objectives, timeframes, and aliases. Ensure a mix of different sectors targeted and varied campaign durations.",
         runs=count,
+        max_concurrency=max_concurrency,
+        batch_size=batch_size,
+        output_schema=Campaign,
     )
     return synthetic_results
\ No newline at end of file
@@ -11,10 +11,13 @@ from langchain_experimental.tabular_synthetic_data.prompts import (
     SYNTHETIC_FEW_SHOT_PREFIX,
     SYNTHETIC_FEW_SHOT_SUFFIX,
 )
-from langchain_community.chat_models import ChatOpenAI
+
+from StixObjectLang import engine, few_shot, registry, replay
 
 dotenv.load_dotenv()
 
+STIX_TYPE = "identity"
+
 # Define the Identity schema
 class Identity(BaseModel):
     type: str = Field(default="identity")
@@ -29,43 +32,51 @@ class Identity(BaseModel):
     sectors: Optional[List[str]] = Field(default=None, description="List of industry sectors that this Identity belongs to")
     contact_information: Optional[str] = Field(default=None, description="Contact information for this Identity")
 
-# Sample data as examples
-examples = [
-    {"example": """Type: identity, Name: John Smith, Identity Class: individual, Roles: [employee, developer], Sectors: [technology], Contact Information: john.smith@example.com"""},
-    {"example": """Type: identity, Name: ACME Widget, Inc., Identity Class: organization, Sectors: [manufacturing, retail], Contact Information: info@acmewidget.com, Description: A leading manufacturer of innovative widgets"""},
-    {"example": """Type: identity, Name: Healthcare Professionals Association, Identity Class: group, Roles: [medical professionals], Sectors: [healthcare], Contact Information: contact@healthcareprofessionals.org, Description: An association representing healthcare professionals across various disciplines"""},
-]
 
 OPENAI_TEMPLATE = PromptTemplate(input_variables=["example"], template="{example}")
 
-prompt_template = FewShotPromptTemplate(
-    prefix=SYNTHETIC_FEW_SHOT_PREFIX,
-    examples=examples,
-    suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
-    input_variables=["subject", "extra"],
-    example_prompt=OPENAI_TEMPLATE,
-)
+def build_generator():
+    """
+    Build the LangChain data generator for identity entries.
 
-# Create a LangChain data generator
-synthetic_data_generator = create_openai_data_generator(
-    output_schema=Identity,
-    llm=ChatOpenAI(temperature=1, model='gpt-4o'),
-    prompt=prompt_template,
-)
+    Called once by the StixObjectLang registry on first use, so importing this
+    module does not construct an LLM client.
+    """
+    prompt_template = FewShotPromptTemplate(
+        prefix=SYNTHETIC_FEW_SHOT_PREFIX,
+        example_selector=few_shot.build_selector(STIX_TYPE),
+        suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
+        input_variables=["subject", "extra"],
+        example_prompt=OPENAI_TEMPLATE,
+    )
+
+    # Create a LangChain data generator
+    return create_openai_data_generator(
+        output_schema=Identity,
+        llm=replay.chat_model(temperature=1, model='gpt-4o'),
+        prompt=prompt_template,
+    )
 
-def generate_identities(count: int) -> List[Identity]:
+def generate_identities(count: int, max_concurrency: Optional[int] = None,
+                        batch_size: Optional[int] = None) -> List[Identity]:
     """
     Generate synthetic identity entries.
     
     Args:
         count (int): Number of identity entries to generate.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight. Defaults to STIX_GEN_MAX_CONCURRENCY.
+        batch_size (Optional[int]): Records requested per LLM call. Defaults to STIX_GEN_BATCH_SIZE.
     
     Returns:
         List[Identity]: List of generated identity entries.
     """
-    synthetic_results = synthetic_data_generator.generate(
+    synthetic_results = engine.generate(
+        registry.get_generator(STIX_TYPE),
         subject="identity",
         extra="Create diverse identities including individuals, organizations, and groups. Ensure a mix of different sectors, roles, and identity classes. Use realistic but fictional names and contact information. Always include ID, Created, and Modified fields. Do not use John Doe or Jane Doe as names.",
         runs=count,
+        max_concurrency=max_concurrency,
+        batch_size=batch_size,
+        output_schema=Identity,
     )
     return synthetic_results
\ No newline at end of file
@@ -11,10 +11,13 @@ from langchain_experimental.tabular_synthetic_data.prompts import (
     SYNTHETIC_FEW_SHOT_PREFIX,
     SYNTHETIC_FEW_SHOT_SUFFIX,
 )
-from langchain_community.chat_models import ChatOpenAI
+
+from StixObjectLang import engine, few_shot, registry, replay
 
 dotenv.load_dotenv()
 
+STIX_TYPE = "infrastructure"
+
 # Define the Infrastructure schema
 class Infrastructure(BaseModel):
     type: str = Field(default="infrastructure")
@@ -30,43 +33,51 @@ class Infrastructure(BaseModel):
     first_seen: Optional[str] = Field(default=None, description="Time that this Infrastructure was first seen performing malicious activities")
     last_seen: Optional[str] = Field(default=None, description="Time that this Infrastructure was last seen performing malicious activities")
 
-# Sample data as examples
-examples = [
-    {"example": """Type: infrastructure, Name: Poison Ivy C2, Infrastructure Types: [command-and-control], Description: Command and control infrastructure for Poison Ivy malware, First Seen: 2016-01-01T00:00:00Z, Last Seen: 2016-12-31T23:59:59Z, Kill Chain Phases: [{kill_chain_name: lockheed-martin-cyber-kill-chain, phase_name: command-and-control}]"""},
-    {"example": """Type: infrastructure, Name: Botnet Distribution Network, Infrastructure Types: [botnet, hosting-malware], Description: A network of compromised machines used to distribute malware, Aliases: [MalNet, DistroBot], First Seen: 2018-03-15T00:00:00Z, Last Seen: 2019-06-30T00:00:00Z, Kill Chain Phases: [{kill_chain_name: lockheed-martin-cyber-kill-chain, phase_name: delivery}, {kill_chain_name: lockheed-martin-cyber-kill-chain, phase_name: installation}]"""},
-    {"example": """Type: infrastructure, Name: Phishing Campaign Servers, Infrastructure Types: [hosting-target-lists, hosting-malicious-content], Description: Servers used to host phishing pages and store stolen credentials, First Seen: 2020-09-01T00:00:00Z, Last Seen: 2021-03-31T00:00:00Z, Kill Chain Phases: [{kill_chain_name: lockheed-martin-cyber-kill-chain, phase_name: weaponization}, {kill_chain_name: lockheed-martin-cyber-kill-chain, phase_name: delivery}]"""},
-]
 
 OPENAI_TEMPLATE = PromptTemplate(input_variables=["example"], template="{example}")
 
-prompt_template = FewShotPromptTemplate(
-    prefix=SYNTHETIC_FEW_SHOT_PREFIX,
-    examples=examples,
-    suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
-    input_variables=["subject", "extra"],
-    example_prompt=OPENAI_TEMPLATE,
-)
+def build_generator():
+    """
+    Build the LangChain data generator for infrastructure entries.
 
-# Create a LangChain data generator
-synthetic_data_generator = create_openai_data_generator(
-    output_schema=Infrastructure,
-    llm=ChatOpenAI(temperature=1, model='gpt-4o'),
-    prompt=prompt_template,
-)
+    Called once by the StixObjectLang registry on first use, so importing this
+    module does not construct an LLM client.
+    """
+    prompt_template = FewShotPromptTemplate(
+        prefix=SYNTHETIC_FEW_SHOT_PREFIX,
+        example_selector=few_shot.build_selector(STIX_TYPE),
+        suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
+        input_variables=["subject", "extra"],
+        example_prompt=OPENAI_TEMPLATE,
+    )
+
+    # Create a LangChain data generator
+    return create_openai_data_generator(
+        output_schema=Infrastructure,
+        llm=replay.chat_model(temperature=1, model='gpt-4o'),
+        prompt=prompt_template,
+    )
 
-def generate_infrastructures(count: int) -> List[Infrastructure]:
+def generate_infrastructures(count: int, max_concurrency: Optional[int] = None,
+                             batch_size: Optional[int] = None) -> List[Infrastructure]:
     """
     Generate synthetic infrastructure entries.
     
     Args:
         count (int): Number of infrastructure entries to generate.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight. Defaults to STIX_GEN_MAX_CONCURRENCY.
+        batch_size (Optional[int]): Records requested per LLM call. Defaults to STIX_GEN_BATCH_SIZE.
     
     Returns:
         List[Infrastructure]: List of generated infrastructure entries.
     """
-    synthetic_results = synthetic_data_generator.generate(
+    synthetic_results = engine.generate(
+        registry.get_generator(STIX_TYPE),
         subject="infrastructure",
         extra="Create diverse infrastructure entries with various types, purposes, and associated kill chain phases. Ensure realistic timeframes for first_seen and last_seen dates.",
         runs=count,
+        max_concurrency=max_concurrency,
+        batch_size=batch_size,
+        output_schema=Infrastructure,
     )
     return synthetic_results
\ No newline at end of file
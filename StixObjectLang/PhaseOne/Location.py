@@ -11,10 +11,13 @@ from langchain_experimental.tabular_synthetic_data.prompts import (
     SYNTHETIC_FEW_SHOT_PREFIX,
     SYNTHETIC_FEW_SHOT_SUFFIX,
 )
-from langchain_community.chat_models import ChatOpenAI
+
+from StixObjectLang import engine, few_shot, registry, replay
 
 dotenv.load_dotenv()
 
+STIX_TYPE = "location"
+
 # Define the Location schema
 class Location(BaseModel):
     type: str = Field(default="location")
@@ -51,42 +54,51 @@ class Location(BaseModel):
             raise ValueError('Latitude and longitude must be present if precision is specified')
         return v
 
-# Sample data as examples
-examples = [
-    {"example": """Type: location, Spec Version: 2.1, ID: loc-002, Created: 2024-07-10T09:15:00Z, Modified: 2024-07-10T09:15:00Z, Name: Chiang Mai Old City, Description: Historic center of Chiang Mai, Thailand, Latitude: 18.7883, Longitude: 98.9853, Precision: 100, Region: south-eastern-asia, Country: th, Administrative Area: Chiang Mai Province, City: Chiang Mai, Postal Code: 50200"""},
-    {"example": """Type: location, Spec Version: 2.1, ID: loc-003, Created: 2024-07-10T09:30:00Z, Modified: 2024-07-10T09:30:00Z, Name: Eiffel Tower, Description: Iconic iron lattice tower on the Champ de Mars in Paris, Latitude: 48.8584, Longitude: 2.2945, Precision: 5, Region: western-europe, Country: fr, Administrative Area: Île-de-France, City: Paris, Street Address: Champ de Mars, 5 Avenue Anatole France, Postal Code: 75007"""}
-]
 
 OPENAI_TEMPLATE = PromptTemplate(input_variables=["example"], template="{example}")
 
-prompt_template = FewShotPromptTemplate(
-    prefix=SYNTHETIC_FEW_SHOT_PREFIX,
-    examples=examples,
-    suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
-    input_variables=["subject", "extra"],
-    example_prompt=OPENAI_TEMPLATE,
-)
+def build_generator():
+    """
+    Build the LangChain data generator for location entries.
 
-# Create a LangChain data generator
-synthetic_data_generator = create_openai_data_generator(
-    output_schema=Location,
-    llm=ChatOpenAI(temperature=1, model='gpt-4o'),
-    prompt=prompt_template,
-)
+    Called once by the StixObjectLang registry on first use, so importing this
+    module does not construct an LLM client.
+    """
+    prompt_template = FewShotPromptTemplate(
+        prefix=SYNTHETIC_FEW_SHOT_PREFIX,
+        example_selector=few_shot.build_selector(STIX_TYPE),
+        suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
+        input_variables=["subject", "extra"],
+        example_prompt=OPENAI_TEMPLATE,
+    )
+
+    # Create a LangChain data generator
+    return create_openai_data_generator(
+        output_schema=Location,
+        llm=replay.chat_model(temperature=1, model='gpt-4o'),
+        prompt=prompt_template,
+    )
 
-def generate_locations(count: int) -> List[Location]:
+def generate_locations(count: int, max_concurrency: Optional[int] = None,
+                       batch_size: Optional[int] = None) -> List[Location]:
     """
     Generate synthetic location entries.
     
     Args:
         count (int): Number of location entries to generate.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight. Defaults to STIX_GEN_MAX_CONCURRENCY.
+        batch_size (Optional[int]): Records requested per LLM call. Defaults to STIX_GEN_BATCH_SIZE.
     
     Returns:
         List[Location]: List of generated location entries.
     """
-    synthetic_results = synthetic_data_generator.generate(
+    synthetic_results = engine.generate(
+        registry.get_generator(STIX_TYPE),
         subject="location",
         extra="Create diverse location entries with a mix of regional, country-level, and precise coordinate-based locations. No landmarks. Ensure realistic values for all fields and adherence to specified formats (e.g., ISO 3166-1 ALPHA-2 for country codes).",
         runs=count,
+        max_concurrency=max_concurrency,
+        batch_size=batch_size,
+        output_schema=Location,
     )
     return synthetic_results
\ No newline at end of file
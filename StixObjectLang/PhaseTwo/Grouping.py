@@ -10,10 +10,13 @@ from langchain_experimental.tabular_synthetic_data.prompts import (
     SYNTHETIC_FEW_SHOT_PREFIX,
     SYNTHETIC_FEW_SHOT_SUFFIX,
 )
-from langchain_community.chat_models import ChatOpenAI
+
+from StixObjectLang import engine, few_shot, registry, replay
 
 dotenv.load_dotenv()
 
+STIX_TYPE = "grouping"
+
 class Grouping(BaseModel):
     type: str = Field(default="grouping")
     spec_version: str = Field(default="2.1")
@@ -35,44 +38,51 @@ class Grouping(BaseModel):
     object_marking_refs: Optional[List[str]] = Field(default=None, description="List of marking definitions to be applied to this grouping")
     granular_markings: Optional[List[dict]] = Field(default=None, description="List of granular markings applied to this grouping")
 
-examples = [
-    {"example": """Type: grouping, Name: APT29 Campaign Analysis, Context: campaign, Description: A collection of STIX objects related to the APT29 campaign targeting government entities, Object Refs: ["indicator--8e2e2d2b-17d4-4cbf-938f-98ee46b3cd3f", "malware--31b940d4-6f7f-459a-80ea-9c1f17b5891b", "attack-pattern--7e33a43e-e34b-40ec-89da-36c9bb2cacd5"]"""},
-    {"example": """Type: grouping, Name: Ransomware Incident Response, Context: incident, Description: Grouping of artifacts and observables related to a recent ransomware attack on a financial institution, Object Refs: ["indicator--a932fcc6-e032-476c-826f-cb970a5a1ade", "observed-data--b67d30ff-02ac-498a-92f9-32f845f448cf", "course-of-action--8e2e2d2b-17d4-4cbf-938f-98ee46b3cd3f"]"""},
-    {"example": """Type: grouping, Name: Threat Intel Report: Emerging Cyber Espionage Group, Context: suspicious-activity, Description: A compilation of threat intelligence related to a newly identified cyber espionage group targeting the energy sector, Object Refs: ["threat-actor--56f3f0db-b5d5-431c-ae56-c18f02caf500", "indicator--f81f319c-f26c-4ec0-b81f-1c4df743f03f", "relationship--57b56a43-b8b0-4cba-9deb-34e3e1faed9e"]"""},
-    {"example": """Type: grouping, Name: Malware Analysis: ZeuS Variant, Context: malware-analysis, Description: Detailed analysis of a new ZeuS banking trojan variant, including indicators and observed behaviors, Object Refs: ["malware--162d917e-766f-4611-b5d6-652791454fca", "indicator--e73b3dfd-9b8d-45f0-8456-da3d85ef5db7", "observed-data--b67d30ff-02ac-498a-92f9-32f845f448cf"]"""},
-    {"example": """Type: grouping, Name: Phishing Campaign Detection, Context: suspicious-activity, Description: Collection of indicators and observables related to an ongoing phishing campaign targeting healthcare organizations, Object Refs: ["indicator--26ffb872-1dd9-446e-b6f5-d58527e5b5d2", "campaign--83422c77-904c-4dc1-aff5-5c38f3a2c55c", "infrastructure--38c47d93-d984-4fd9-b87b-d69d0841628d"]"""}
-]
 
 OPENAI_TEMPLATE = PromptTemplate(input_variables=["example"], template="{example}")
 
-prompt_template = FewShotPromptTemplate(
-    prefix=SYNTHETIC_FEW_SHOT_PREFIX,
-    examples=examples,
-    suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
-    input_variables=["subject", "extra"],
-    example_prompt=OPENAI_TEMPLATE,
-)
+def build_generator():
+    """
+    Build the LangChain data generator for groupings.
 
-# Create a LangChain data generator
-synthetic_data_generator = create_openai_data_generator(
-    output_schema=Grouping,
-    llm=ChatOpenAI(temperature=1, model='gpt-4'),
-    prompt=prompt_template,
-)
+    Called once by the StixObjectLang registry on first use, so importing this
+    module does not construct an LLM client.
+    """
+    prompt_template = FewShotPromptTemplate(
+        prefix=SYNTHETIC_FEW_SHOT_PREFIX,
+        example_selector=few_shot.build_selector(STIX_TYPE),
+        suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
+        input_variables=["subject", "extra"],
+        example_prompt=OPENAI_TEMPLATE,
+    )
+
+    # Create a LangChain data generator
+    return create_openai_data_generator(
+        output_schema=Grouping,
+        llm=replay.chat_model(temperature=1, model='gpt-4'),
+        prompt=prompt_template,
+    )
 
-def generate_grouping(count: int) -> List[Grouping]:
+def generate_grouping(count: int, max_concurrency: Optional[int] = None,
+                      batch_size: Optional[int] = None) -> List[Grouping]:
     """
     Generate synthetic groupings.
     
     Args:
         count (int): Number of groupings to generate.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight. Defaults to STIX_GEN_MAX_CONCURRENCY.
+        batch_size (Optional[int]): Records requested per LLM call. Defaults to STIX_GEN_BATCH_SIZE.
     
     Returns:
         List[Grouping]: List of generated groupings.
     """
-    synthetic_results = synthetic_data_generator.generate(
+    synthetic_results = engine.generate(
+        registry.get_generator(STIX_TYPE),
         subject="grouping",
         extra="Create diverse groupings with realistic contexts and object references. Ensure that the object references are plausible STIX object identifiers.",
         runs=count,
+        max_concurrency=max_concurrency,
+        batch_size=batch_size,
+        output_schema=Grouping,
     )
     return synthetic_results
\ No newline at end of file
@@ -11,10 +11,13 @@ from langchain_experimental.tabular_synthetic_data.prompts import (
     SYNTHETIC_FEW_SHOT_PREFIX,
     SYNTHETIC_FEW_SHOT_SUFFIX,
 )
-from langchain_community.chat_models import ChatOpenAI
+
+from StixObjectLang import engine, few_shot, registry, replay
 
 dotenv.load_dotenv()
 
+STIX_TYPE = "report"
+
 class ReportTypeEnum(str, Enum):
     threat_report = "threat-report"
     attack_pattern = "attack-pattern"
@@ -48,44 +51,51 @@ class Report(BaseModel):
     object_marking_refs: Optional[List[str]] = Field(default=None, description="List of marking definitions to be applied to this report")
     granular_markings: Optional[List[dict]] = Field(default=None, description="List of granular markings applied to this report")
 
-examples = [
-    {"example": """Type: report, Name: The Black Vine Cyberespionage Group, Description: A comprehensive analysis of the Black Vine threat actor group, their TTPs, and recent campaigns, Report Types: ["threat-actor", "campaign"], Published: 2023-05-15T10:00:00Z, Object Refs: ["threat-actor--56f3f0db-b5d5-431c-ae56-c18f02caf500", "campaign--83422c77-904c-4dc1-aff5-5c38f3a2c55c", "malware--c7d1e135-8b34-549a-bb47-302f5cf998ed"]"""},
-    {"example": """Type: report, Name: Analysis of CVE-2023-1234 Exploitation in the Wild, Description: Detailed report on the exploitation of a critical vulnerability (CVE-2023-1234) by multiple threat actors, Report Types: ["vulnerability", "threat-report"], Published: 2023-06-01T14:30:00Z, Object Refs: ["vulnerability--f81f319c-f26c-4ec0-b81f-1c4df743f03f", "attack-pattern--7e33a43e-e34b-40ec-89da-36c9bb2cacd5", "indicator--26ffb872-1dd9-446e-b6f5-d58527e5b5d2"]"""},
-    {"example": """Type: report, Name: Q2 2023 Cybersecurity Landscape Overview, Description: A comprehensive review of major cyber incidents, emerging threats, and trend analysis for Q2 2023, Report Types: ["situation-report"], Published: 2023-07-05T09:00:00Z, Object Refs: ["incident--26ffb872-1dd9-446e-b6f5-d58527e5b5d2", "indicator--8e2e2d2b-17d4-4cbf-938f-98ee46b3cd3f", "observed-data--b67d30ff-02ac-498a-92f9-32f845f448cf"]"""},
-    {"example": """Type: report, Name: Emerging Ransomware Variant: CryptoLock Analysis, Description: Technical deep-dive into the CryptoLock ransomware, including its infection chain, encryption methods, and mitigation strategies, Report Types: ["malware", "attack-pattern"], Published: 2023-05-20T16:45:00Z, Object Refs: ["malware--c7d1e135-8b34-549a-bb47-302f5cf998ed", "attack-pattern--7e33a43e-e34b-40ec-89da-36c9bb2cacd5", "course-of-action--8e2e2d2b-17d4-4cbf-938f-98ee46b3cd3f"]"""},
-    {"example": """Type: report, Name: APT42: Tactics, Techniques, and Procedures, Description: Comprehensive analysis of APT42, including their typical targets, preferred malware, and recent campaigns, Report Types: ["threat-actor", "campaign", "attack-pattern"], Published: 2023-06-10T11:15:00Z, Object Refs: ["threat-actor--56f3f0db-b5d5-431c-ae56-c18f02caf500", "malware--31b940d4-6f7f-459a-80ea-9c1f17b5891b", "campaign--83422c77-904c-4dc1-aff5-5c38f3a2c55c"]"""}
-]
 
 OPENAI_TEMPLATE = PromptTemplate(input_variables=["example"], template="{example}")
 
-prompt_template = FewShotPromptTemplate(
-    prefix=SYNTHETIC_FEW_SHOT_PREFIX,
-    examples=examples,
-    suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
-    input_variables=["subject", "extra"],
-    example_prompt=OPENAI_TEMPLATE,
-)
+def build_generator():
+    """
+    Build the LangChain data generator for reports.
 
-# Create a LangChain data generator
-synthetic_data_generator = create_openai_data_generator(
-    output_schema=Report,
-    llm=ChatOpenAI(temperature=1, model='gpt-4'),
-    prompt=prompt_template,
-)
+    Called once by the StixObjectLang registry on first use, so importing this
+    module does not construct an LLM client.
+    """
+    prompt_template = FewShotPromptTemplate(
+        prefix=SYNTHETIC_FEW_SHOT_PREFIX,
+        example_selector=few_shot.build_selector(STIX_TYPE),
+        suffix=SYNTHETIC_FEW_SHOT_SUFFIX,
+        input_variables=["subject", "extra"],
+        example_prompt=OPENAI_TEMPLATE,
+    )
+
+    # Create a LangChain data generator
+    return create_openai_data_generator(
+        output_schema=Report,
+        llm=replay.chat_model(temperature=1, model='gpt-4'),
+        prompt=prompt_template,
+    )
 
-def generate_reports(count: int) -> List[Report]:
+def generate_reports(count: int, max_concurrency: Optional[int] = None,
+                     batch_size: Optional[int] = None) -> List[Report]:
     """
     Generate synthetic reports.
     
     Args:
         count (int): Number of reports to generate.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight. Defaults to STIX_GEN_MAX_CONCURRENCY.
+        batch_size (Optional[int]): Records requested per LLM call. Defaults to STIX_GEN_BATCH_SIZE.
     
     Returns:
         List[Report]: List of generated reports.
     """
-    synthetic_results = synthetic_data_generator.generate(
+    synthetic_results = engine.generate(
+        registry.get_generator(STIX_TYPE),
         subject="report",
         extra="Create diverse reports covering various cybersecurity topics. Include realistic names, descriptions, report types, and object references. Ensure that the object references are plausible STIX object identifiers. The reports should cover a range of subjects such as threat actors, campaigns, vulnerabilities, malware analysis, and situational overviews.",
         runs=count,
+        max_concurrency=max_concurrency,
+        batch_size=batch_size,
+        output_schema=Report,
     )
     return synthetic_results
\ No newline at end of file
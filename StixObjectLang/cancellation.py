@@ -0,0 +1,52 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+# Cancellation event of the job the current code runs for, if any. Context variables follow
+# asyncio tasks automatically; thread pools need `submit` below to carry them over.
+_current_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "stix_gen_cancel_event", default=None
+)
+
+
+class Cancelled(Exception):
+    """
+    Raised before an LLM call when the surrounding job has been cancelled.
+    """
+
+
+@contextmanager
+def scope(event: threading.Event):
+    """
+    Make `event` the cancellation signal for everything run inside the block.
+
+    Args:
+        event (threading.Event): Set this event to cancel the work.
+    """
+    token = _current_event.set(event)
+    try:
+        yield event
+    finally:
+        _current_event.reset(token)
+
+
+def is_cancelled() -> bool:
+    event = _current_event.get()
+    return event is not None and event.is_set()
+
+
+def check() -> None:
+    """
+    Raise Cancelled if the current scope has been cancelled; call this before each LLM request.
+    """
+    if is_cancelled():
+        raise Cancelled("Generation was cancelled")
+
+
+def submit(executor, fn, *args, **kwargs):
+    """
+    Submit `fn` to a concurrent.futures executor, running it in a copy of the caller's context
+    so the cancellation scope reaches worker threads.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,250 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, List, Optional
+
+from StixObjectLang import cancellation, metrics, replay
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on LLM requests in flight per generate call; override with STIX_GEN_MAX_CONCURRENCY
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("STIX_GEN_MAX_CONCURRENCY", "8"))
+# Records requested per LLM call; 1 keeps the one-record-per-run function calling path
+DEFAULT_BATCH_SIZE = int(os.getenv("STIX_GEN_BATCH_SIZE", "1"))
+# Extra rounds used to top up a batch run when some records fail validation
+MAX_BATCH_ROUNDS = 3
+
+BATCH_INSTRUCTION = """
+Return a JSON array containing exactly {size} distinct {subject} records.
+Each element must be a JSON object with the following fields:
+{fields}
+
+IMPORTANT: Your response must be a valid JSON array. Do not include any text before or after the array, and do not wrap it in code blocks.
+"""
+
+
+def remember_example(synthetic_data_generator, result) -> None:
+    """
+    Offer a generated record to the prompt's example selector as a candidate for later
+    prompts, or keep the rolling few-shot window of templates with a fixed example list.
+    Generated records can contain braces (nested dicts), which the few-shot template would
+    read as variables.
+    """
+    template = synthetic_data_generator.template
+    if template.example_selector is not None:
+        text = synthetic_data_generator._format_dict_to_string(result.dict())
+        template.example_selector.add_example({synthetic_data_generator.example_input_key: text})
+        return
+    synthetic_data_generator._update_examples(result)
+    examples = template.examples
+    if examples:
+        key = synthetic_data_generator.example_input_key
+        examples[-1][key] = examples[-1][key].replace("{", "{{").replace("}", "}}")
+
+
+async def agenerate(synthetic_data_generator, subject: str, extra: str, runs: int,
+                    max_concurrency: Optional[int] = None) -> List[Any]:
+    """
+    Run `runs` generations of a synthetic data generator concurrently.
+
+    Args:
+        synthetic_data_generator: Generator built by `create_openai_data_generator`.
+        subject (str): Subject passed to the few-shot prompt.
+        extra (str): Extra steering instructions passed to the few-shot prompt.
+        runs (int): Number of records to generate.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight.
+
+    Returns:
+        List[Any]: Generated records in run order. Failed runs are logged and dropped.
+    """
+    if runs <= 0:
+        return []
+
+    limit = max(1, max_concurrency or DEFAULT_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(limit)
+    chain = synthetic_data_generator.llm_chain
+
+    async def run_once(index: int):
+        async with semaphore:
+            cancellation.check()
+            # Prompts change with the rolling few-shot window, so recordings are keyed by run
+            with replay.call_key(f"{subject}/run/{index}"):
+                result = await chain.arun(subject=subject, extra=extra)
+            remember_example(synthetic_data_generator, result)
+            return result
+
+    outcomes = await asyncio.gather(*(run_once(i) for i in range(runs)), return_exceptions=True)
+
+    results = []
+    errors = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, cancellation.Cancelled):
+            raise outcome
+        if isinstance(outcome, BaseException):
+            logger.error(f"Generation run {index} for {subject} failed: {outcome}")
+            metrics.record_failure("generate_run", outcome)
+            errors.append(outcome)
+        else:
+            results.append(outcome)
+
+    if errors and not results:
+        raise errors[0]
+    return results
+
+
+def describe_schema_fields(output_schema) -> str:
+    """
+    Render the fields of a pydantic schema as one line per field for batch prompts.
+    """
+    schema = output_schema.schema()
+    required = set(schema.get("required", []))
+    lines = []
+    for name, prop in schema.get("properties", {}).items():
+        field_type = prop.get("type")
+        if field_type == "array":
+            field_type = f"array of {prop.get('items', {}).get('type', 'object')}"
+        elif field_type is None:
+            field_type = "string" if "enum" in prop or "allOf" in prop else "object"
+        qualifier = "required" if name in required else "optional"
+        line = f"- {name} ({field_type}, {qualifier})"
+        if prop.get("description"):
+            line += f": {prop['description']}"
+        if prop.get("default") is not None:
+            line += f" [default: {prop['default']}]"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_batch_prompt(synthetic_data_generator, output_schema, subject: str, extra: str, size: int) -> str:
+    """
+    Build one prompt asking for `size` records: the few-shot prefix is sent once per batch.
+    """
+    few_shot = synthetic_data_generator.template.format(subject=subject, extra=extra)
+    return few_shot + BATCH_INSTRUCTION.format(
+        size=size,
+        subject=subject,
+        fields=describe_schema_fields(output_schema),
+    )
+
+
+def parse_batch_response(content: str, output_schema) -> List[Any]:
+    """
+    Parse a JSON array response and keep the elements that validate against the schema.
+    """
+    cleaned = re.sub(r'```json\s*|\s*```', '', content).strip()
+    data = json.loads(cleaned)
+    if isinstance(data, dict):
+        # Accept {"records": [...]} style wrappers as well as a single bare record
+        lists = [value for value in data.values() if isinstance(value, list)]
+        data = lists[0] if len(lists) == 1 else [data]
+
+    records = []
+    for index, element in enumerate(data):
+        try:
+            records.append(output_schema.parse_obj(element))
+        except Exception as e:
+            logger.warning(f"Dropping invalid {output_schema.__name__} record {index}: {e}")
+    return records
+
+
+async def agenerate_batched(synthetic_data_generator, output_schema, subject: str, extra: str, runs: int,
+                            batch_size: int, max_concurrency: Optional[int] = None) -> List[Any]:
+    """
+    Generate `runs` records by asking the model for JSON arrays of `batch_size` records per call.
+
+    Args:
+        synthetic_data_generator: Generator built by `create_openai_data_generator`.
+        output_schema: Pydantic schema every element is validated against.
+        subject (str): Subject passed to the few-shot prompt.
+        extra (str): Extra steering instructions passed to the few-shot prompt.
+        runs (int): Number of records to generate.
+        batch_size (int): Number of records requested per LLM call.
+        max_concurrency (Optional[int]): Maximum number of LLM calls in flight.
+
+    Returns:
+        List[Any]: Up to `runs` validated records in batch order.
+    """
+    if runs <= 0:
+        return []
+
+    limit = max(1, max_concurrency or DEFAULT_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(limit)
+    llm = synthetic_data_generator.llm_chain.llm
+
+    async def run_batch(round_index: int, index: int, size: int):
+        async with semaphore:
+            cancellation.check()
+            prompt = build_batch_prompt(synthetic_data_generator, output_schema, subject, extra, size)
+            with replay.call_key(f"{subject}/batch/{round_index}/{index}"):
+                message = await llm.ainvoke(prompt)
+            records = parse_batch_response(message.content, output_schema)
+            for record in records:
+                remember_example(synthetic_data_generator, record)
+            return records
+
+    results = []
+    errors = []
+    for round_index in range(MAX_BATCH_ROUNDS):
+        missing = runs - len(results)
+        if missing <= 0:
+            break
+        sizes = [min(batch_size, missing - start) for start in range(0, missing, batch_size)]
+        outcomes = await asyncio.gather(*(run_batch(round_index, index, size) for index, size in enumerate(sizes)),
+                                        return_exceptions=True)
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, cancellation.Cancelled):
+                raise outcome
+            if isinstance(outcome, BaseException):
+                logger.error(f"Batch {index} for {subject} failed: {outcome}")
+                metrics.record_failure("generate_batch", outcome)
+                errors.append(outcome)
+            else:
+                results.extend(outcome)
+
+    if errors and not results:
+        raise errors[0]
+    if len(results) < runs:
+        logger.warning(f"Batch generation for {subject} produced {len(results)} of {runs} records")
+    return results[:runs]
+
+
+def generate(synthetic_data_generator, subject: str, extra: str, runs: int,
+             max_concurrency: Optional[int] = None, batch_size: Optional[int] = None,
+             output_schema=None) -> List[Any]:
+    """
+    Synchronous entry point for the engine, safe to call from Flask worker threads.
+
+    With a `batch_size` above 1 (or STIX_GEN_BATCH_SIZE) and an `output_schema`, records are
+    requested as JSON arrays instead of one function call per record.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    if batch_size > 1 and output_schema is not None:
+        coro = agenerate_batched(synthetic_data_generator, output_schema, subject, extra, runs,
+                                 batch_size, max_concurrency)
+    else:
+        coro = agenerate(synthetic_data_generator, subject, extra, runs, max_concurrency)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # Already inside an event loop: run on a helper thread with its own loop
+    outcome = {}
+
+    def runner():
+        try:
+            outcome["results"] = asyncio.run(coro)
+        except BaseException as e:
+            outcome["error"] = e
+
+    # Run in a copy of this context so the caller's cancellation scope still applies
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(runner,))
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["results"]
@@ -0,0 +1,234 @@
+import abc
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.example_selectors import BaseExampleSelector
+
+from StixObjectLang import seeding
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "example_corpus")
+# Directory of <stix-type>.jsonl files, one {"example": "..."} per line; types it does not
+# cover fall back to the bundled corpus
+CORPUS_DIR = os.getenv("STIX_GEN_EXAMPLE_CORPUS", BUNDLED_CORPUS_DIR)
+# Selection strategy, examples per prompt and the token budget they share
+DEFAULT_SELECTOR = os.getenv("STIX_GEN_EXAMPLE_SELECTOR", "mmr")
+DEFAULT_K = int(os.getenv("STIX_GEN_EXAMPLES_K", "3"))
+DEFAULT_TOKEN_BUDGET = int(os.getenv("STIX_GEN_EXAMPLE_TOKENS", "600"))
+# Recently generated records kept as candidates, like the generators' old rolling window
+RECENT_EXAMPLES = 8
+# Latest records of that window added to the ranking query, so it follows what is being generated
+QUERY_RECENT = 2
+# MMR trade-off between relevance to the request (1.0) and diversity (0.0)
+MMR_LAMBDA = 0.5
+# Random jitter added to MMR scores so consecutive calls do not all get the same examples
+EXPLORATION = 0.1
+
+EXAMPLE_KEY = "example"
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-.]*[a-z0-9]|[a-z0-9]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token for English and JSON-ish text).
+    """
+    return max(1, len(text) // 4)
+
+
+def load_corpus(stix_type: str) -> List[Dict[str, str]]:
+    """
+    Read the example corpus of `stix_type` from CORPUS_DIR, or from the bundled corpus.
+    """
+    for directory in dict.fromkeys((CORPUS_DIR, BUNDLED_CORPUS_DIR)):
+        path = os.path.join(directory, f"{stix_type}.jsonl")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return [{EXAMPLE_KEY: json.loads(line)[EXAMPLE_KEY]} for line in f if line.strip()]
+    raise FileNotFoundError(f"No example corpus for {stix_type} in {CORPUS_DIR}")
+
+
+def escape_braces(text: str) -> str:
+    # Examples are joined into the few-shot template before it is formatted
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class TfidfIndex:
+    """
+    In-memory TF-IDF index over the corpus. Vectors are L2-normalised, so a dot product is
+    the cosine similarity. Text added later is embedded with the corpus vocabulary.
+    """
+
+    def __init__(self, texts: List[str]):
+        documents = [Counter(self.tokenize(text)) for text in texts]
+        frequency = Counter(term for document in documents for term in document)
+        self.vocabulary = {term: index for index, term in enumerate(sorted(frequency))}
+        self.idf = np.array([math.log((1 + len(texts)) / (1 + frequency[term])) + 1.0
+                             for term in sorted(frequency)])
+        self.matrix = np.vstack([self._vector(document) for document in documents]) if documents else \
+            np.zeros((0, len(self.vocabulary)))
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return _TOKEN_PATTERN.findall(text.lower())
+
+    def _vector(self, terms: Counter) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary))
+        for term, count in terms.items():
+            index = self.vocabulary.get(term)
+            if index is not None:
+                vector[index] = (1 + math.log(count)) * self.idf[index]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, text: str) -> np.ndarray:
+        return self._vector(Counter(self.tokenize(text)))
+
+
+class CorpusExampleSelector(BaseExampleSelector, abc.ABC):
+    """
+    Picks the few-shot examples of one prompt from an on-disk corpus plus the most recent
+    generated records, keeping the picks within `token_budget` estimated tokens.
+
+    Subclasses implement `rank`, which orders candidate indices by preference for a query
+    made of the prompt's input variables and the latest generated records.
+    """
+
+    def __init__(self, corpus: List[Dict[str, str]], k: Optional[int] = None,
+                 token_budget: Optional[int] = None, recent: int = RECENT_EXAMPLES):
+        self.corpus = [example[EXAMPLE_KEY] for example in corpus]
+        self.k = k or DEFAULT_K
+        self.token_budget = token_budget or DEFAULT_TOKEN_BUDGET
+        self.index = TfidfIndex(self.corpus)
+        self.recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def add_example(self, example: Dict[str, str]) -> None:
+        text = example[EXAMPLE_KEY]
+        with self._lock:
+            self.recent.append((text, self.index.embed(text)))
+
+    async def aadd_example(self, example: Dict[str, str]) -> None:
+        self.add_example(example)
+
+    def candidates(self):
+        with self._lock:
+            recent = list(self.recent)
+        texts = self.corpus + [text for text, _ in recent]
+        vectors = np.vstack([self.index.matrix] + [vector for _, vector in recent]) if recent else self.index.matrix
+        return texts, vectors
+
+    @abc.abstractmethod
+    def rank(self, texts: List[str], vectors: np.ndarray, query: str) -> List[int]:
+        """
+        Return candidate indices (into `texts`, the corpus followed by the recent records)
+        in order of preference for `query`.
+        """
+
+    def query(self, input_variables: Dict[str, str], recent: List[str]) -> str:
+        # The input variables alone are the same for every call of a generator
+        return " ".join([str(value) for value in input_variables.values()] + recent[-QUERY_RECENT:])
+
+    def select_examples(self, input_variables: Dict[str, str]) -> List[Dict[str, str]]:
+        texts, vectors = self.candidates()
+        if not texts:
+            return []
+        query = self.query(input_variables, texts[len(self.corpus):])
+        selected = []
+        remaining = self.token_budget
+        for index in self.rank(texts, vectors, query):
+            if len(selected) == self.k:
+                break
+            cost = estimate_tokens(texts[index])
+            if cost <= remaining:
+                selected.append(index)
+                remaining -= cost
+        if not selected:
+            # Nothing fits the budget: still show the model one (the shortest) example of the format
+            selected = [min(range(len(texts)), key=lambda index: len(texts[index]))]
+        return [{EXAMPLE_KEY: escape_braces(texts[index])} for index in selected]
+
+    async def aselect_examples(self, input_variables: Dict[str, str]) -> List[Dict[str, str]]:
+        # Cheap enough to run on the event loop rather than in an executor
+        return self.select_examples(input_variables)
+
+
+class MMRExampleSelector(CorpusExampleSelector):
+    """
+    Maximal marginal relevance: each pick trades relevance to the request against
+    similarity to the examples already picked.
+    """
+
+    def rank(self, texts: List[str], vectors: np.ndarray, query: str) -> List[int]:
+        relevance = vectors @ self.index.embed(query)
+        jitter = np.array([seeding.rng.random() for _ in texts]) * EXPLORATION
+        redundancy = np.zeros(len(texts))
+        ranked = []
+        available = np.ones(len(texts), dtype=bool)
+        while available.any():
+            scores = MMR_LAMBDA * relevance - (1 - MMR_LAMBDA) * redundancy + jitter
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            ranked.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, vectors @ vectors[best])
+        return ranked
+
+
+class RandomExampleSelector(CorpusExampleSelector):
+    """
+    Uniform random picks, drawn from the seeded run's stream.
+    """
+
+    def rank(self, texts: List[str], vectors: np.ndarray, query: str) -> List[int]:
+        return seeding.rng.sample(range(len(texts)), len(texts))
+
+
+class AllExamplesSelector(CorpusExampleSelector):
+    """
+    Every corpus example and recent record in order, ignoring k and the token budget
+    (the behaviour of the original fixed example lists).
+    """
+
+    def rank(self, texts: List[str], vectors: np.ndarray, query: str) -> List[int]:
+        return list(range(len(texts)))
+
+    def select_examples(self, input_variables: Dict[str, str]) -> List[Dict[str, str]]:
+        texts, _ = self.candidates()
+        return [{EXAMPLE_KEY: escape_braces(text)} for text in texts]
+
+
+SELECTORS = {
+    "mmr": MMRExampleSelector,
+    "random": RandomExampleSelector,
+    "all": AllExamplesSelector,
+}
+
+
+def build_selector(stix_type: str, strategy: Optional[str] = None, k: Optional[int] = None,
+                   token_budget: Optional[int] = None) -> CorpusExampleSelector:
+    """
+    Build the example selector for a generator's FewShotPromptTemplate.
+
+    Args:
+        stix_type (str): STIX type whose corpus is loaded.
+        strategy (Optional[str]): Key of SELECTORS. Defaults to STIX_GEN_EXAMPLE_SELECTOR.
+        k (Optional[int]): Examples per prompt. Defaults to STIX_GEN_EXAMPLES_K.
+        token_budget (Optional[int]): Estimated tokens the examples may use. Defaults to STIX_GEN_EXAMPLE_TOKENS.
+
+    Returns:
+        CorpusExampleSelector: The selector.
+    """
+    strategy = strategy or DEFAULT_SELECTOR
+    if strategy not in SELECTORS:
+        raise ValueError(f"Unknown example selector {strategy!r}; expected one of {', '.join(SELECTORS)}")
+    corpus = load_corpus(stix_type)
+    logger.debug(f"Loaded {len(corpus)} {stix_type} examples for the {strategy} selector")
+    return SELECTORS[strategy](corpus, k=k, token_budget=token_budget)
@@ -0,0 +1,249 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from StixObjectLang import cancellation
+
+logger = logging.getLogger(__name__)
+
+# Stage latencies range from milliseconds (bundling) to minutes (LLM relationship runs)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter per label combination, rendered in the Prometheus text format.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value:g}" for key, value in values]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label combination, rendered in the Prometheus text format.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in values:
+            for bound, count in zip(self.buckets, state):
+                labels = _format_labels(self.labelnames, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {count:g}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {state[-2]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-2]:g}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("stix_gen_stage_duration_seconds", "Wall time of pipeline stages",
+                          ("stage", "object_type"))
+OBJECTS = Counter("stix_gen_objects_generated_total", "Synthetic records generated", ("object_type", "backend"))
+LLM_CALLS = Counter("stix_gen_llm_calls_total", "LLM calls by outcome (ok, error or replayed)", ("model", "outcome"))
+LLM_SECONDS = Histogram("stix_gen_llm_call_duration_seconds", "Latency of LLM calls", ("model",))
+LLM_TOKENS = Counter("stix_gen_llm_tokens_total", "Tokens reported by the LLM API", ("model", "kind"))
+FAILURES = Counter("stix_gen_failures_total", "Failures by stage and exception type", ("stage", "error"))
+METRICS = (STAGE_SECONDS, OBJECTS, LLM_CALLS, LLM_SECONDS, LLM_TOKENS, FAILURES)
+
+
+def render() -> str:
+    """
+    Render every metric in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+class RunMetrics:
+    """
+    Per-request summary of the same measurements, returned to the client with its results.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.llm: Dict[str, Dict[str, float]] = {}
+        self.failures: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, {"count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += seconds
+
+    def add_llm_call(self, model: str, seconds: float, outcome: str, usage: Dict[str, Any]) -> None:
+        with self._lock:
+            calls = self.llm.setdefault(model, {"calls": 0, "errors": 0, "replayed": 0, "seconds": 0.0,
+                                                "prompt_tokens": 0, "completion_tokens": 0})
+            calls["calls"] += 1
+            calls["seconds"] += seconds
+            if outcome == "error":
+                calls["errors"] += 1
+            elif outcome == "replayed":
+                calls["replayed"] += 1
+            calls["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            calls["completion_tokens"] += usage.get("completion_tokens", 0)
+
+    def add_failure(self, stage: str, error: str) -> None:
+        with self._lock:
+            errors = self.failures.setdefault(stage, {})
+            errors[error] = errors.get(error, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self.started, 4),
+                "stages": {name: {"count": stage["count"], "seconds": round(stage["seconds"], 4)}
+                           for name, stage in self.stages.items()},
+                "llm": {model: {key: round(value, 4) if key == "seconds" else value for key, value in calls.items()}
+                        for model, calls in self.llm.items()},
+                "failures": {stage: dict(errors) for stage, errors in self.failures.items()},
+            }
+
+
+# Like the cancellation scope, the summary follows asyncio tasks and reaches thread pools
+# through cancellation.submit
+_current_summary: contextvars.ContextVar[Optional[RunMetrics]] = contextvars.ContextVar(
+    "stix_gen_run_metrics", default=None
+)
+
+
+@contextmanager
+def request_summary(stage_name: str = "request"):
+    """
+    Collect a RunMetrics summary of everything measured inside the block, which is itself
+    recorded as the `stage_name` stage.
+    """
+    summary = RunMetrics()
+    token = _current_summary.set(summary)
+    try:
+        with stage(stage_name):
+            yield summary
+    finally:
+        _current_summary.reset(token)
+
+
+def current_summary() -> Optional[RunMetrics]:
+    return _current_summary.get()
+
+
+def observe_stage(name: str, seconds: float, object_type: str = "") -> None:
+    STAGE_SECONDS.observe(seconds, stage=name, object_type=object_type)
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.add_stage(f"{name}:{object_type}" if object_type else name, seconds)
+
+
+def record_failure(stage_name: str, error: BaseException) -> None:
+    """
+    Count `error` as a failure of `stage_name`. An exception is only counted once, at the
+    innermost stage it escapes, however many enclosing stages it passes through.
+    """
+    if getattr(error, "_stix_gen_counted", False):
+        return
+    try:
+        error._stix_gen_counted = True
+    except AttributeError:
+        pass
+    FAILURES.inc(stage=stage_name, error=type(error).__name__)
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.add_failure(stage_name, type(error).__name__)
+
+
+@contextmanager
+def stage(name: str, object_type: str = ""):
+    """
+    Time the block as pipeline stage `name` and count an exception escaping it as a failure
+    of that stage. Also usable as a function decorator.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except cancellation.Cancelled:
+        raise
+    except Exception as e:
+        record_failure(f"{name}:{object_type}" if object_type else name, e)
+        raise
+    finally:
+        observe_stage(name, time.perf_counter() - start, object_type)
+
+
+def record_objects(object_type: str, backend: str, count: int) -> None:
+    OBJECTS.inc(count, object_type=object_type, backend=backend)
+
+
+def record_llm_call(model: str, seconds: float, outcome: str, usage: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Count one LLM call. `usage` is the API's token_usage block; replayed calls spend no
+    tokens, so theirs is not added to the token counters.
+    """
+    usage = usage if outcome == "ok" and usage else {}
+    LLM_CALLS.inc(model=model, outcome=outcome)
+    LLM_SECONDS.observe(seconds, model=model)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], model=model, kind=kind.split("_")[0])
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.add_llm_call(model, seconds, outcome, usage)
@@ -0,0 +1,435 @@
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from faker import Faker
+
+from StixObjectLang import registry, seeding
+# Module-`random` stand-in that follows the current seeded run, if any
+from StixObjectLang.seeding import rng as random
+
+# STIX 2.1 open vocabularies used to fill the schemas without an LLM
+THREAT_ACTOR_TYPES = ["activist", "competitor", "crime-syndicate", "criminal", "hacker", "insider-accidental",
+                      "insider-disgruntled", "nation-state", "sensationalist", "spy", "terrorist", "unknown"]
+THREAT_ACTOR_ROLES = ["agent", "director", "independent", "infrastructure-architect", "infrastructure-operator",
+                      "malware-author", "sponsor"]
+SOPHISTICATION_LEVELS = ["none", "minimal", "intermediate", "advanced", "expert", "innovator", "strategic"]
+RESOURCE_LEVELS = ["individual", "club", "contest", "team", "organization", "government"]
+MOTIVATIONS = ["accidental", "coercion", "dominance", "ideology", "notoriety", "organizational-gain",
+               "personal-gain", "personal-satisfaction", "revenge", "unpredictable"]
+MALWARE_TYPES = ["adware", "backdoor", "bot", "bootkit", "ddos", "downloader", "dropper", "exploit-kit", "keylogger",
+                 "ransomware", "remote-access-trojan", "resource-exploitation", "rogue-security-software", "rootkit",
+                 "screen-capture", "spyware", "trojan", "virus", "webshell", "wiper", "worm"]
+MALWARE_CAPABILITIES = ["accesses-remote-machines", "anti-debugging", "anti-sandbox", "anti-vm",
+                        "captures-input-peripherals", "captures-system-state-data", "cleans-traces-of-infection",
+                        "communicates-with-c2", "compromises-data-integrity", "escalates-privileges", "evades-av",
+                        "exfiltrates-data", "fingerprints-host", "hides-artifacts", "installs-other-components",
+                        "persists-after-system-reboot", "probes-network-environment", "self-modifies",
+                        "steals-authentication-credentials"]
+PROCESSOR_ARCHITECTURES = ["alpha", "arm", "ia-64", "mips", "powerpc", "sparc", "x86", "x86-64"]
+IMPLEMENTATION_LANGUAGES = ["applescript", "bash", "c", "c++", "c#", "go", "java", "javascript", "lua", "perl",
+                            "php", "powershell", "python", "ruby", "rust", "visual-basic"]
+TOOL_TYPES = ["denial-of-service", "exploitation", "information-gathering", "network-capture",
+              "credential-exploitation", "remote-access", "vulnerability-scanning", "unknown"]
+INDICATOR_TYPES = ["anomalous-activity", "anonymization", "benign", "compromised", "malicious-activity",
+                   "attribution", "unknown"]
+INFRASTRUCTURE_TYPES = ["amplification", "anonymization", "botnet", "command-and-control", "control-system",
+                        "exfiltration", "firewall", "hosting-malware", "hosting-target-lists", "phishing",
+                        "reconnaissance", "routers-switches", "staging", "workstation", "unknown"]
+IDENTITY_CLASSES = ["individual", "group", "system", "organization", "class", "unknown"]
+INDUSTRY_SECTORS = ["agriculture", "aerospace", "automotive", "chemical", "commercial", "communications",
+                    "construction", "defense", "education", "energy", "entertainment", "financial-services",
+                    "government", "healthcare", "hospitality-leisure", "infrastructure", "insurance",
+                    "manufacturing", "mining", "non-profit", "pharmaceuticals", "retail", "technology",
+                    "telecommunications", "transportation", "utilities"]
+REGIONS = ["africa", "eastern-africa", "middle-africa", "northern-africa", "southern-africa", "western-africa",
+           "americas", "caribbean", "central-america", "latin-america-caribbean", "northern-america",
+           "south-america", "asia", "central-asia", "eastern-asia", "southern-asia", "south-eastern-asia",
+           "western-asia", "europe", "eastern-europe", "northern-europe", "southern-europe", "western-europe",
+           "oceania", "australia-new-zealand", "melanesia", "micronesia", "polynesia", "antarctica"]
+GROUPING_CONTEXTS = ["suspicious-activity", "malware-analysis", "unspecified"]
+REPORT_TYPES = ["threat-report", "attack-pattern", "campaign", "incident", "malware", "threat-actor", "tool",
+                "vulnerability"]
+OPINIONS = ["strongly-disagree", "disagree", "neutral", "agree", "strongly-agree"]
+AV_RESULTS = ["malicious", "suspicious", "benign", "unknown"]
+KILL_CHAIN_PHASES = ["reconnaissance", "weaponization", "delivery", "exploitation", "installation",
+                     "command-and-control", "actions-on-objectives"]
+GOALS = ["Steal intellectual property", "Collect intelligence", "Disrupt critical infrastructure",
+         "Generate profit", "Extort victims", "Expose corruption", "Sabotage operations", "Harvest credentials",
+         "Establish long-term access", "Launder money"]
+ADJECTIVES = ["Crimson", "Silent", "Obsidian", "Phantom", "Iron", "Azure", "Shadow", "Velvet", "Frozen", "Rogue",
+              "Golden", "Hollow", "Scarlet", "Neon", "Ashen", "Cobalt", "Midnight", "Emerald", "Savage", "Quiet"]
+NOUNS = ["Viper", "Falcon", "Kraken", "Wolf", "Mantis", "Hydra", "Jackal", "Raven", "Spider", "Lynx", "Tempest",
+         "Harbor", "Lotus", "Cyclone", "Badger", "Specter", "Comet", "Anvil", "Orchid", "Serpent"]
+PATTERN_TEMPLATES = [
+    "[ipv4-addr:value = '{ip}']",
+    "[domain-name:value = '{domain}']",
+    "[url:value = '{url}']",
+    "[file:hashes.'SHA-256' = '{sha256}']",
+    "[file:hashes.MD5 = '{md5}']",
+    "[email-addr:value = '{email}']",
+]
+ANALYSIS_PRODUCTS = ["Cuckoo Sandbox", "Joe Sandbox", "ANY.RUN", "VMRay Analyzer", "CAPE Sandbox",
+                     "Hybrid Analysis", "FireEye AX", "Intezer Analyze"]
+ANALYSIS_MODULES = ["static-analysis", "dynamic-analysis", "network-analysis", "memory-dump", "yara-scan",
+                    "behavioral-analysis", "string-extraction", "unpacker"]
+
+# Timestamps are drawn between these bounds (seconds since the epoch)
+EARLIEST_TIMESTAMP = datetime(2015, 1, 1, tzinfo=timezone.utc).timestamp()
+LATEST_TIMESTAMP = datetime(2024, 6, 30, tzinfo=timezone.utc).timestamp()
+
+# Faker is slow per call, so text is drawn from pools built once per process. The pools are
+# built from a fixed seed so they are identical in every process; the run seed picks from them.
+POOL_SIZE = 512
+POOL_SEED = 2024
+
+_faker = Faker()
+_faker.seed_instance(POOL_SEED)
+_pools: Dict[str, List[str]] = {}
+_pools_lock = threading.Lock()
+
+
+def _build_pools() -> Dict[str, List[str]]:
+    return {
+        "sentence": [_faker.sentence(nb_words=14) for _ in range(POOL_SIZE)],
+        "paragraph": [_faker.paragraph(nb_sentences=4) for _ in range(POOL_SIZE)],
+        "person": [_faker.name() for _ in range(POOL_SIZE)],
+        "company": [_faker.company() for _ in range(POOL_SIZE)],
+        "email": [_faker.company_email() for _ in range(POOL_SIZE)],
+        "phone": [_faker.phone_number() for _ in range(POOL_SIZE)],
+        "catch_phrase": [_faker.catch_phrase() for _ in range(POOL_SIZE)],
+        "word": [_faker.word() for _ in range(POOL_SIZE)],
+        "city": [_faker.city() for _ in range(POOL_SIZE)],
+        "street_address": [_faker.street_address() for _ in range(POOL_SIZE)],
+        "postal_code": [_faker.postcode() for _ in range(POOL_SIZE)],
+        "state": [_faker.state() for _ in range(POOL_SIZE)],
+        "country_code": [_faker.country_code().lower() for _ in range(POOL_SIZE)],
+        "ipv4": [_faker.ipv4_public() for _ in range(POOL_SIZE)],
+        "domain": [_faker.domain_name() for _ in range(POOL_SIZE)],
+        "url": [_faker.url() for _ in range(POOL_SIZE)],
+        "sha256": [_faker.sha256() for _ in range(POOL_SIZE)],
+        "md5": [_faker.md5() for _ in range(POOL_SIZE)],
+        "user_email": [_faker.free_email() for _ in range(POOL_SIZE)],
+    }
+
+
+def _pool(name: str) -> List[str]:
+    if not _pools:
+        with _pools_lock:
+            if not _pools:
+                _pools.update(_build_pools())
+    return _pools[name]
+
+
+def _pick(name: str) -> str:
+    return random.choice(_pool(name))
+
+
+def _sample(values: List[str], low: int = 1, high: int = 3) -> List[str]:
+    return random.sample(values, random.randint(low, min(high, len(values))))
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _time_window() -> tuple:
+    start = random.uniform(EARLIEST_TIMESTAMP, LATEST_TIMESTAMP)
+    end = random.uniform(start, LATEST_TIMESTAMP)
+    return _timestamp(start), _timestamp(end)
+
+
+def _codename() -> str:
+    return f"{random.choice(ADJECTIVES)} {random.choice(NOUNS)}"
+
+
+def _kill_chain_phases() -> List[dict]:
+    return [{"kill_chain_name": "lockheed-martin-cyber-kill-chain", "phase_name": phase}
+            for phase in _sample(KILL_CHAIN_PHASES, 1, 2)]
+
+
+def _stix_id(stix_type: str) -> str:
+    return seeding.new_id(stix_type)
+
+
+def _refs() -> List[str]:
+    return [_stix_id(random.choice(["malware", "indicator", "threat-actor", "campaign", "tool"]))
+            for _ in range(random.randint(1, 3))]
+
+
+def _threat_actor() -> Dict[str, Any]:
+    first_seen, last_seen = _time_window()
+    actor_types = _sample(THREAT_ACTOR_TYPES, 1, 2)
+    name = _codename()
+    return {
+        "name": name,
+        "description": f"{name} is a {actor_types[0]} threat actor. {_pick('sentence')}",
+        "threat_actor_types": actor_types,
+        "aliases": [_codename()],
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+        "roles": _sample(THREAT_ACTOR_ROLES, 1, 2),
+        "goals": _sample(GOALS, 1, 3),
+        "sophistication": random.choice(SOPHISTICATION_LEVELS),
+        "resource_level": random.choice(RESOURCE_LEVELS),
+        "primary_motivation": random.choice(MOTIVATIONS),
+        "secondary_motivations": _sample(MOTIVATIONS, 1, 2),
+        "personal_motivations": _sample(MOTIVATIONS, 1, 1),
+    }
+
+
+def _identity() -> Dict[str, Any]:
+    identity_class = random.choice(IDENTITY_CLASSES)
+    name = _pick("person") if identity_class == "individual" else _pick("company")
+    return {
+        "name": name,
+        "description": f"{name}: {_pick('catch_phrase')}. {_pick('sentence')}",
+        "roles": [_pick("word")],
+        "identity_class": identity_class,
+        "sectors": _sample(INDUSTRY_SECTORS, 1, 2),
+        "contact_information": f"{_pick('email')}, {_pick('phone')}",
+    }
+
+
+def _malware() -> Dict[str, Any]:
+    first_seen, last_seen = _time_window()
+    malware_types = _sample(MALWARE_TYPES, 1, 2)
+    name = f"{random.choice(NOUNS)}{random.choice(['Loader', 'Rat', 'Bot', 'Locker', 'Stealer', 'Wiper'])}"
+    return {
+        "name": name,
+        "description": f"{name} is a {malware_types[0]} family. {_pick('sentence')}",
+        "malware_types": malware_types,
+        "is_family": random.random() < 0.7,
+        "aliases": [f"{name}.{random.choice('ABCDEFG')}"],
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+        "architecture_execution_envs": _sample(PROCESSOR_ARCHITECTURES, 1, 2),
+        "implementation_languages": _sample(IMPLEMENTATION_LANGUAGES, 1, 2),
+        "capabilities": _sample(MALWARE_CAPABILITIES, 1, 4),
+    }
+
+
+def _tool() -> Dict[str, Any]:
+    name = f"{_pick('word').capitalize()}{random.choice(['Scan', 'Dump', 'Exec', 'Proxy', 'Cat', 'Hound'])}"
+    tool_types = _sample(TOOL_TYPES, 1, 2)
+    return {
+        "name": name,
+        "description": f"{name} is a {tool_types[0]} tool. {_pick('sentence')}",
+        "tool_types": tool_types,
+        "aliases": [name.lower()],
+        "tool_version": f"{random.randint(0, 5)}.{random.randint(0, 20)}.{random.randint(0, 9)}",
+    }
+
+
+def _indicator() -> Dict[str, Any]:
+    valid_from, valid_until = _time_window()
+    template = random.choice(PATTERN_TEMPLATES)
+    pattern = template.format(ip=_pick("ipv4"), domain=_pick("domain"), url=_pick("url"),
+                              sha256=_pick("sha256"), md5=_pick("md5"), email=_pick("user_email"))
+    indicator_types = _sample(INDICATOR_TYPES, 1, 2)
+    return {
+        "name": f"{indicator_types[0]} {pattern.split(':')[0].lstrip('[')} indicator",
+        "description": _pick("sentence"),
+        "pattern": [pattern],
+        "pattern_type": "stix",
+        "pattern_version": "2.1",
+        "valid_from": valid_from,
+        "valid_until": valid_until,
+        "indicator_types": indicator_types,
+        "kill_chain_phases": _kill_chain_phases(),
+    }
+
+
+def _infrastructure() -> Dict[str, Any]:
+    first_seen, last_seen = _time_window()
+    infrastructure_types = _sample(INFRASTRUCTURE_TYPES, 1, 2)
+    return {
+        "name": f"{_pick('domain')} {infrastructure_types[0]}",
+        "description": _pick("sentence"),
+        "infrastructure_types": infrastructure_types,
+        "aliases": [_pick("ipv4")],
+        "kill_chain_phases": _kill_chain_phases(),
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+    }
+
+
+def _intrusion_set() -> Dict[str, Any]:
+    first_seen, last_seen = _time_window()
+    name = _codename()
+    return {
+        "name": name,
+        "description": f"{name} intrusion set. {_pick('sentence')}",
+        "aliases": [_codename()],
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+        "goals": _sample(GOALS, 1, 3),
+        "resource_level": random.choice(RESOURCE_LEVELS),
+        "primary_motivation": random.choice(MOTIVATIONS),
+        "secondary_motivations": _sample(MOTIVATIONS, 1, 2),
+    }
+
+
+def _campaign() -> Dict[str, Any]:
+    first_seen, last_seen = _time_window()
+    name = f"Operation {_codename()}"
+    return {
+        "name": name,
+        "description": _pick("paragraph"),
+        "aliases": [_codename()],
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+        "objective": random.choice(GOALS),
+    }
+
+
+def _location() -> Dict[str, Any]:
+    city = _pick("city")
+    return {
+        "name": city,
+        "description": _pick("sentence"),
+        "latitude": round(random.uniform(-90.0, 90.0), 4),
+        "longitude": round(random.uniform(-180.0, 180.0), 4),
+        "precision": float(random.choice([5, 100, 1000, 10000])),
+        "region": random.choice(REGIONS),
+        "country": _pick("country_code"),
+        "administrative_area": _pick("state"),
+        "city": city,
+        "street_address": _pick("street_address"),
+        "postal_code": _pick("postal_code"),
+    }
+
+
+def _attack_pattern() -> Dict[str, Any]:
+    technique = random.randint(1001, 1659)
+    return {
+        "name": f"{_pick('catch_phrase')} ({random.choice(KILL_CHAIN_PHASES)})",
+        "description": _pick("paragraph"),
+        "external_references": [{"source_name": "capec", "external_id": f"CAPEC-{technique % 700}"}],
+        "aliases": [f"T{technique}"],
+        "kill_chain_phases": _kill_chain_phases(),
+    }
+
+
+def _course_of_action() -> Dict[str, Any]:
+    return {
+        "name": f"Mitigate {_pick('catch_phrase').lower()}",
+        "description": _pick("paragraph"),
+    }
+
+
+def _grouping() -> Dict[str, Any]:
+    return {
+        "name": f"{_codename()} activity cluster",
+        "description": _pick("sentence"),
+        "context": random.choice(GROUPING_CONTEXTS),
+        "object_refs": _refs(),
+    }
+
+
+def _malware_analysis() -> Dict[str, Any]:
+    submitted, ended = _time_window()
+    return {
+        "product": random.choice(ANALYSIS_PRODUCTS),
+        "version": f"{random.randint(1, 9)}.{random.randint(0, 30)}",
+        "configuration_version": f"{random.randint(1, 5)}.{random.randint(0, 9)}",
+        "analysis_engine_version": f"{random.randint(1, 12)}.{random.randint(0, 99)}",
+        "modules": _sample(ANALYSIS_MODULES, 1, 3),
+        "analysis_definition_version": f"{random.randint(2015, 2024)}{random.randint(1, 12):02d}",
+        "submitted": submitted,
+        "analysis_started": submitted,
+        "analysis_ended": ended,
+        "av_result": random.choice(AV_RESULTS),
+    }
+
+
+def _note() -> Dict[str, Any]:
+    return {
+        "abstract": _pick("catch_phrase"),
+        "content": _pick("paragraph"),
+        "authors": [_pick("person")],
+        "object_refs": _refs(),
+    }
+
+
+def _observed_data() -> Dict[str, Any]:
+    first_observed, last_observed = _time_window()
+    return {
+        "first_observed": first_observed,
+        "last_observed": last_observed,
+        "number_observed": random.randint(1, 500),
+        "object_refs": [_stix_id(random.choice(["ipv4-addr", "domain-name", "file", "url"]))],
+    }
+
+
+def _opinion() -> Dict[str, Any]:
+    return {
+        "explanation": _pick("sentence"),
+        "authors": [_pick("person")],
+        "opinion": random.choice(OPINIONS),
+        "object_refs": _refs(),
+    }
+
+
+def _report() -> Dict[str, Any]:
+    published, _ = _time_window()
+    report_types = _sample(REPORT_TYPES, 1, 2)
+    return {
+        "name": f"{_codename()} {report_types[0].replace('-', ' ')}",
+        "description": _pick("paragraph"),
+        "report_types": report_types,
+        "published": published,
+        "object_refs": _refs(),
+    }
+
+
+def _vulnerability() -> Dict[str, Any]:
+    cve = f"CVE-{random.randint(2010, 2024)}-{random.randint(1000, 99999)}"
+    return {
+        "name": cve,
+        "description": f"{_pick('sentence')} Affects {_pick('company')} products.",
+        "external_references": [{"source_name": "cve", "external_id": cve}],
+    }
+
+
+RECORD_FACTORIES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "threat-actor": _threat_actor,
+    "identity": _identity,
+    "malware": _malware,
+    "tool": _tool,
+    "indicator": _indicator,
+    "infrastructure": _infrastructure,
+    "intrusion-set": _intrusion_set,
+    "campaign": _campaign,
+    "location": _location,
+    "attack-pattern": _attack_pattern,
+    "course-of-action": _course_of_action,
+    "grouping": _grouping,
+    "malware-analysis": _malware_analysis,
+    "note": _note,
+    "observed-data": _observed_data,
+    "opinion": _opinion,
+    "report": _report,
+    "vulnerability": _vulnerability,
+}
+
+
+def generate(stix_type: str, count: int) -> List[Any]:
+    """
+    Generate `count` records of `stix_type` from Faker pools and STIX open vocabularies.
+
+    Records are instances of the same pydantic schema the LLM generator returns. They are
+    built with `construct()` since every value already comes from a valid vocabulary or
+    generator, which skips per-record validation on the hot path.
+    """
+    schema = registry.get_schema(stix_type)
+    factory = RECORD_FACTORIES[stix_type]
+    created = _timestamp(seeding.utcnow().replace(tzinfo=timezone.utc).timestamp())
+    records = []
+    for _ in range(count):
+        fields = factory()
+        fields["id"] = _stix_id(stix_type)
+        fields["created"] = created
+        fields["modified"] = created
+        records.append(schema.construct(**fields))
+    return records
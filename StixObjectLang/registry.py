@@ -0,0 +1,118 @@
+import importlib
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from StixObjectLang import metrics
+
+logger = logging.getLogger(__name__)
+
+# STIX type -> (module, generate function). Modules are only imported when first used.
+GENERATOR_MODULES: Dict[str, Tuple[str, str]] = {
+    "campaign": ("StixObjectLang.PhaseOne.Campaign", "generate_campaigns"),
+    "identity": ("StixObjectLang.PhaseOne.Identity", "generate_identities"),
+    "indicator": ("StixObjectLang.PhaseOne.Indicator", "generate_indicator"),
+    "infrastructure": ("StixObjectLang.PhaseOne.Infrastructure", "generate_infrastructures"),
+    "intrusion-set": ("StixObjectLang.PhaseOne.IntrusionSet", "generate_intrusion_set"),
+    "location": ("StixObjectLang.PhaseOne.Location", "generate_locations"),
+    "malware": ("StixObjectLang.PhaseOne.Malware", "generate_malware"),
+    "threat-actor": ("StixObjectLang.PhaseOne.ThreatActor", "generate_threat_actor"),
+    "tool": ("StixObjectLang.PhaseOne.Tool", "generate_tool"),
+    "attack-pattern": ("StixObjectLang.PhaseTwo.AttackPattern", "generate_attack_pattern"),
+    "course-of-action": ("StixObjectLang.PhaseTwo.CourseOfAction", "generate_course_of_action"),
+    "grouping": ("StixObjectLang.PhaseTwo.Grouping", "generate_grouping"),
+    "malware-analysis": ("StixObjectLang.PhaseTwo.MalwareAnalysis", "generate_malware_analysis"),
+    "note": ("StixObjectLang.PhaseTwo.Note", "generate_notes"),
+    "observed-data": ("StixObjectLang.PhaseTwo.ObservedData", "generate_observed_data"),
+    "opinion": ("StixObjectLang.PhaseTwo.Opinion", "generate_opinions"),
+    "report": ("StixObjectLang.PhaseTwo.Report", "generate_reports"),
+    "vulnerability": ("StixObjectLang.PhaseTwo.Vulnerability", "generate_vulnerabilities"),
+}
+
+# "llm" calls the few-shot LangChain generators, "faker" fills the same schemas offline
+BACKENDS = ("llm", "faker")
+DEFAULT_BACKEND = os.getenv("STIX_GEN_BACKEND", "llm")
+
+_generators: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_module(stix_type: str):
+    """
+    Import and return the StixObjectLang module that generates `stix_type` objects.
+    """
+    if stix_type not in GENERATOR_MODULES:
+        raise KeyError(f"No synthetic generator registered for STIX type '{stix_type}'")
+    module_name, _ = GENERATOR_MODULES[stix_type]
+    return importlib.import_module(module_name)
+
+
+def get_schema(stix_type: str):
+    """
+    Return the pydantic schema class for `stix_type`; it is named after its module.
+    """
+    module = get_module(stix_type)
+    return getattr(module, module.__name__.rsplit(".", 1)[1])
+
+
+def resolve_backend(stix_type: str, backend: Optional[str] = None) -> str:
+    """
+    Pick the backend for `stix_type`: the explicit argument, then STIX_GEN_BACKEND_<TYPE>
+    (e.g. STIX_GEN_BACKEND_THREAT_ACTOR), then STIX_GEN_BACKEND.
+    """
+    env_name = "STIX_GEN_BACKEND_" + stix_type.upper().replace("-", "_")
+    backend = backend or os.getenv(env_name) or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown generation backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def get_generator(stix_type: str):
+    """
+    Return the cached LangChain data generator for `stix_type`, building it on first use.
+    """
+    generator = _generators.get(stix_type)
+    if generator is not None:
+        return generator
+
+    with _lock:
+        generator = _generators.get(stix_type)
+        if generator is None:
+            logger.info(f"Building synthetic data generator for {stix_type}")
+            generator = get_module(stix_type).build_generator()
+            _generators[stix_type] = generator
+    return generator
+
+
+def generate(stix_type: str, count: int, backend: Optional[str] = None, **kwargs) -> List[Any]:
+    """
+    Generate `count` synthetic records of `stix_type` with the selected backend.
+    """
+    backend = resolve_backend(stix_type, backend)
+    with metrics.stage("generate", stix_type):
+        if backend == "faker":
+            # Imported here so Faker is only loaded when the offline backend is used
+            from StixObjectLang import offline
+            records = offline.generate(stix_type, count)
+        else:
+            _, function_name = GENERATOR_MODULES[stix_type]
+            records = getattr(get_module(stix_type), function_name)(count, **kwargs)
+    metrics.record_objects(stix_type, backend, len(records))
+    return records
+
+
+def build_all() -> None:
+    """
+    Eagerly build every registered generator, e.g. to warm a long-running worker.
+    """
+    for stix_type in GENERATOR_MODULES:
+        get_generator(stix_type)
+
+
+def clear() -> None:
+    """
+    Drop all cached generators so the next use rebuilds them.
+    """
+    with _lock:
+        _generators.clear()
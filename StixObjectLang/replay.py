@@ -0,0 +1,279 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_community.chat_models import ChatOpenAI
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from StixObjectLang import metrics
+
+logger = logging.getLogger(__name__)
+
+# "off" calls the model, "record" calls it and saves every response to a cassette,
+# "replay" answers every call from a cassette and never touches the network
+MODES = ("off", "record", "replay")
+DEFAULT_MODE = os.getenv("STIX_LLM_REPLAY", "off")
+CASSETTE_DIR = os.getenv("STIX_LLM_CASSETTE_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "cassettes"))
+
+
+class ReplayMiss(LookupError):
+    """
+    Raised in replay mode when the cassette has no response for a call.
+    """
+
+
+class Cassette:
+    """
+    Recorded LLM responses of one run, stored as JSON: {call key: [response, ...]}.
+
+    A call's key is the explicit key set with `call_key` (used where prompts are not
+    reproducible, e.g. the generators' rolling few-shot examples) or else a hash of the
+    model parameters and messages. Repeated keys are answered in call order.
+    """
+
+    def __init__(self, path: str, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}', expected record or replay")
+        self.path = path
+        self.mode = mode
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No LLM cassette at {path}; record one first")
+            with open(path) as f:
+                self.entries = json.load(f)["entries"]
+
+    def next_index(self, key: str) -> int:
+        with self._lock:
+            index = self._positions.get(key, 0)
+            self._positions[key] = index + 1
+            return index
+
+    def get(self, key: str, index: int) -> Dict[str, Any]:
+        responses = self.entries.get(key, [])
+        if index >= len(responses):
+            raise ReplayMiss(f"Cassette {self.path} has no response {index} for {key}")
+        return responses[index]
+
+    def put(self, key: str, index: int, response: Dict[str, Any]) -> None:
+        with self._lock:
+            responses = self.entries.setdefault(key, [])
+            responses.extend([None] * (index + 1 - len(responses)))
+            responses[index] = response
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            # Calls that failed leave gaps; drop them rather than replay a None
+            entries = {key: [r for r in responses if r is not None] for key, responses in self.entries.items()}
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"version": 1, "entries": entries}, f, sort_keys=True)
+        os.replace(temporary, self.path)
+        logger.info(f"Recorded {sum(len(r) for r in entries.values())} LLM responses to {self.path}")
+
+
+_current_cassette: contextvars.ContextVar[Optional[Cassette]] = contextvars.ContextVar(
+    "stix_gen_cassette", default=None
+)
+_current_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "stix_gen_llm_call_key", default=None
+)
+
+
+def cassette_path(name: str) -> str:
+    """
+    Path of the named cassette in CASSETTE_DIR; names may use letters, digits, '.', '_' and '-'.
+    """
+    if not re.fullmatch(r"[A-Za-z0-9._-]+", name) or name.startswith("."):
+        raise ValueError(f"Invalid cassette name '{name}'")
+    return os.path.join(CASSETTE_DIR, f"{name}.json")
+
+
+@contextmanager
+def scope(mode: Optional[str], path: Optional[str] = None):
+    """
+    Record or replay every LLM call made in this context (and in work submitted with
+    `cancellation.submit`). A recorded cassette is written when the block exits.
+    """
+    mode = mode or "off"
+    if mode not in MODES:
+        raise ValueError(f"Unknown replay mode '{mode}', expected one of {', '.join(MODES)}")
+    if mode == "off":
+        yield None
+        return
+    if not path:
+        raise ValueError(f"Replay mode '{mode}' needs a cassette")
+    cassette = Cassette(path, mode)
+    token = _current_cassette.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _current_cassette.reset(token)
+        if mode == "record":
+            cassette.save()
+
+
+@contextmanager
+def call_key(key: str):
+    """
+    Key the LLM calls made in this block by `key` instead of by their prompt.
+    """
+    token = _current_key.set(key)
+    try:
+        yield
+    finally:
+        _current_key.reset(token)
+
+
+def active() -> bool:
+    return _current_cassette.get() is not None
+
+
+def _dump_result(result: ChatResult) -> Dict[str, Any]:
+    return {
+        "generations": [{"message": message_to_dict(generation.message),
+                         "generation_info": generation.generation_info}
+                        for generation in result.generations],
+        "llm_output": result.llm_output,
+    }
+
+
+def _load_result(response: Dict[str, Any]) -> ChatResult:
+    generations = [ChatGeneration(message=messages_from_dict([generation["message"]])[0],
+                                  generation_info=generation.get("generation_info"))
+                   for generation in response["generations"]]
+    return ChatResult(generations=generations, llm_output=response.get("llm_output"))
+
+
+class RecordReplayChatModel(BaseChatModel):
+    """
+    Chat model wrapper that passes calls to `inner`, records them, or replays them,
+    depending on the cassette of the current `scope`.
+    """
+    inner: BaseChatModel
+
+    @property
+    def _llm_type(self) -> str:
+        return f"record-replay-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.inner, "model_name", type(self.inner).__name__)
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+        explicit = _current_key.get()
+        if explicit is not None:
+            return explicit
+        payload = json.dumps({
+            "model": self.inner._identifying_params,
+            "messages": [message_to_dict(message) for message in messages],
+            "stop": stop,
+            "kwargs": kwargs,
+        }, sort_keys=True, default=str)
+        return "prompt:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _record_call(self, start: float, result: Optional[ChatResult], replayed: bool = False) -> None:
+        outcome = "error" if result is None else "replayed" if replayed else "ok"
+        usage = (result.llm_output or {}).get("token_usage") if result is not None else None
+        metrics.record_llm_call(self.model_name, time.perf_counter() - start, outcome, usage)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        cassette = _current_cassette.get()
+        key = index = result = None
+        replayed = cassette is not None and cassette.mode == "replay"
+        try:
+            if cassette is not None:
+                key = self._key(messages, stop, kwargs)
+                index = cassette.next_index(key)
+            if replayed:
+                result = _load_result(cassette.get(key, index))
+            else:
+                result = self.inner._generate(messages, stop=stop, **kwargs)
+                if cassette is not None:
+                    cassette.put(key, index, _dump_result(result))
+            return result
+        finally:
+            self._record_call(start, result, replayed)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        cassette = _current_cassette.get()
+        key = index = result = None
+        replayed = cassette is not None and cassette.mode == "replay"
+        try:
+            if cassette is not None:
+                key = self._key(messages, stop, kwargs)
+                index = cassette.next_index(key)
+            if replayed:
+                result = _load_result(cassette.get(key, index))
+            else:
+                result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+                if cassette is not None:
+                    cassette.put(key, index, _dump_result(result))
+            return result
+        finally:
+            self._record_call(start, result, replayed)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        cassette = _current_cassette.get()
+        streams = type(self.inner)._stream is not BaseChatModel._stream
+        outcome = "error"
+        try:
+            if cassette is not None:
+                key = self._key(messages, stop, kwargs)
+                index = cassette.next_index(key)
+                if cassette.mode == "replay":
+                    result = _load_result(cassette.get(key, index))
+                    outcome = "replayed"
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+                    return
+            if not streams:
+                result = self.inner._generate(messages, stop=stop, **kwargs)
+                if cassette is not None:
+                    cassette.put(key, index, _dump_result(result))
+                outcome = "ok"
+                yield ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+                return
+
+            content = []
+            for chunk in self.inner._stream(messages, stop=stop, **kwargs):
+                content.append(chunk.message.content)
+                yield chunk
+            outcome = "ok"
+            if cassette is not None:
+                # Replayed streams arrive as one chunk with the whole text
+                cassette.put(key, index, {"generations": [{"message": message_to_dict(
+                    AIMessageChunk(content="".join(content))), "generation_info": None}], "llm_output": None})
+        finally:
+            # Streamed responses carry no token usage, so only the call and its duration are counted
+            metrics.record_llm_call(self.model_name, time.perf_counter() - start, outcome)
+
+
+def chat_model(**kwargs) -> RecordReplayChatModel:
+    """
+    Build a ChatOpenAI client wrapped for record/replay; use in place of `ChatOpenAI(...)`.
+    """
+    return RecordReplayChatModel(inner=ChatOpenAI(**kwargs))
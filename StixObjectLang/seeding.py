@@ -0,0 +1,149 @@
+import contextvars
+import os
+import random as _random
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+# "Now" for every timestamp a seeded run generates, so reruns produce identical objects
+SEEDED_EPOCH = datetime.fromisoformat(os.getenv("STIX_GEN_SEED_EPOCH", "2024-01-01T00:00:00"))
+
+
+class _Stream:
+    """
+    An independent random sequence within a seeded run, e.g. one per object type, so types
+    generated on different threads stay reproducible whatever order the threads run in.
+    """
+
+    def __init__(self, namespace: uuid.UUID, name: str):
+        self.namespace = namespace
+        self.name = name
+        self.random = _random.Random(f"{namespace}:{name}")
+        self.counter = 0
+        self.occurrences: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+
+class SeededRun:
+    """
+    State of one seeded run: the seed, the fixed timestamp and the named random streams.
+    """
+
+    def __init__(self, seed, now: Optional[datetime] = None):
+        self.seed = seed
+        self.namespace = uuid.uuid5(uuid.NAMESPACE_URL, f"stix-gen:{seed}")
+        self.now = now or SEEDED_EPOCH
+        self._streams: Dict[str, _Stream] = {}
+        self._lock = threading.Lock()
+
+    def stream(self, name: str) -> _Stream:
+        with self._lock:
+            stream = self._streams.get(name)
+            if stream is None:
+                stream = self._streams[name] = _Stream(self.namespace, name)
+            return stream
+
+
+# Like the cancellation scope, these follow asyncio tasks and reach thread pools through cancellation.submit
+_current_run: contextvars.ContextVar[Optional[SeededRun]] = contextvars.ContextVar(
+    "stix_gen_seeded_run", default=None
+)
+_current_stream: contextvars.ContextVar[Optional[_Stream]] = contextvars.ContextVar(
+    "stix_gen_seeded_stream", default=None
+)
+
+
+@contextmanager
+def run(seed, now: Optional[datetime] = None):
+    """
+    Make code in this context (and work submitted with `cancellation.submit`) draw random
+    values, ids and timestamps from `seed`. A `seed` of None leaves everything unseeded.
+    """
+    if seed is None:
+        yield None
+        return
+    seeded = SeededRun(seed, now)
+    run_token = _current_run.set(seeded)
+    stream_token = _current_stream.set(None)
+    try:
+        yield seeded
+    finally:
+        _current_stream.reset(stream_token)
+        _current_run.reset(run_token)
+
+
+@contextmanager
+def stream(name: str):
+    """
+    Draw from the named stream of the current seeded run; does nothing outside one.
+    """
+    seeded = _current_run.get()
+    if seeded is None:
+        yield
+        return
+    token = _current_stream.set(seeded.stream(name))
+    try:
+        yield
+    finally:
+        _current_stream.reset(token)
+
+
+def current_run() -> Optional[SeededRun]:
+    return _current_run.get()
+
+
+def _stream() -> Optional[_Stream]:
+    current = _current_stream.get()
+    if current is None:
+        seeded = _current_run.get()
+        if seeded is not None:
+            current = seeded.stream("main")
+    return current
+
+
+class _Random:
+    """
+    Stand-in for the `random` module: draws from the current seeded stream, or from the
+    global generator outside a seeded run.
+    """
+
+    def __getattr__(self, name):
+        current = _stream()
+        return getattr(current.random if current is not None else _random, name)
+
+
+rng = _Random()
+
+
+def new_id(stix_type: str, *content) -> str:
+    """
+    Return a STIX id for a new object. Outside a seeded run this is a random UUIDv4.
+
+    In a seeded run it is a UUIDv5 in the run's namespace, derived from `content` when
+    given (e.g. a relationship's source, type and target) and otherwise from the stream name
+    and a per-stream counter.
+    """
+    current = _stream()
+    if current is None:
+        return f"{stix_type}--{uuid.uuid4()}"
+    if content:
+        key = "|".join(str(part) for part in content)
+        with current.lock:
+            occurrence = current.occurrences[key] = current.occurrences.get(key, -1) + 1
+        name = f"{stix_type}|{key}|{occurrence}"
+    else:
+        with current.lock:
+            occurrence = current.counter
+            current.counter += 1
+        name = f"{current.name}|{stix_type}|{occurrence}"
+    return f"{stix_type}--{uuid.uuid5(current.namespace, name)}"
+
+
+def utcnow() -> datetime:
+    """
+    Naive UTC "now": the wall clock, or the fixed epoch of the current seeded run.
+    """
+    seeded = _current_run.get()
+    return seeded.now if seeded is not None else datetime.utcnow()
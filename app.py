@@ -1,27 +1,25 @@
-from flask import Flask, render_template, request, jsonify
-from stix_object_builder import (
-    create_threat_actors, create_identities, create_malwares,
-    create_indicators, create_tools,
-    create_intrusion_sets, create_course_of_actions, create_locations,
-    create_malware_analysis, create_attack_patterns, create_campaigns, create_vulnerabilities
-)
-from relationship_builder import create_stix_story
-from stix_bundler import create_bundle
-from langchain_community.chat_models import ChatOpenAI
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
+from generation_scheduler import OBJECT_TYPES, iter_scheduled_objects
+from relationship_builder import create_stix_story, stream_stix_story
+from relationship_cache import get_default_cache
+from dataset_store import DatasetQuery, get_default_store
+from job_queue import JobManager
+import fast_stix
+from stix_bundler import BundleWriter, bundle_dict, dumps, iter_bundle_chunks, write_sharded_zip
+from StixObjectLang import cancellation, metrics, replay, seeding
+import contextlib
 import dotenv
+import orjson
 import os
+import tempfile
+import threading
+import time
 import traceback
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
-special_cases = {
-    'identity': 'create_identities',
-    'vulnerability': 'create_vulnerabilities',
-    'malware-analysis': 'create_malware_analysis'
-}
-
 dotenv.load_dotenv()
 
 # Set up logging
@@ -36,16 +34,83 @@ def index():
 def select_objects():
     return render_template('select_objects.html')
 
-def create_objects(object_type, count):
-    if object_type in special_cases:
-        function_name = special_cases[object_type]
-    else:
-        function_name = f"create_{object_type.replace('-', '_')}s"
-    
-    creation_function = globals()[function_name]
-    objects = creation_function(count)
-    logger.debug(f"Created {len(objects)} {object_type} objects")
-    return objects
+GRAPH_OBJECT_TYPES = OBJECT_TYPES
+
+@contextlib.contextmanager
+def reproducible_run(data):
+    """
+    Apply a form's `seed` (random values, ids and timestamps) and `llm-replay` mode
+    (off, record or replay) to everything generated inside the block. The cassette is
+    named by `cassette`, or after the seed.
+    """
+    seed = data.get('seed') or os.getenv('STIX_GEN_SEED') or None
+    mode = data.get('llm-replay') or replay.DEFAULT_MODE
+    cassette = data.get('cassette') or (f"seed-{seed}" if seed is not None else None)
+    path = replay.cassette_path(cassette) if mode != 'off' and cassette else None
+    with seeding.run(seed), replay.scope(mode, path):
+        yield
+
+
+def iter_generated_objects(data):
+    """
+    Generate the requested object types, yielding (object_type, objects, error) for each type
+    as soon as it finishes. Phase-two types start as soon as the phase-one types they
+    reference are done (see generation_scheduler).
+    """
+    counts = {object_type: int(data.get(f'{object_type}-count', 0) or 0) for object_type in GRAPH_OBJECT_TYPES}
+    backends = {object_type: data.get(f'{object_type}-backend') or data.get('backend') or None
+                for object_type in GRAPH_OBJECT_TYPES}
+    yield from iter_scheduled_objects(counts, backends)
+
+def in_type_order(objects_by_type):
+    """
+    Flatten {object_type: objects} in GRAPH_OBJECT_TYPES order. Types finish in whatever
+    order their threads do; relationship candidates and prompts must not depend on it.
+    """
+    return [obj for object_type in GRAPH_OBJECT_TYPES for obj in objects_by_type.get(object_type, ())]
+
+def persist_run(data, stix_objects, relationships, story, evaluation):
+    """
+    Save a finished run to the dataset store, unless the store is disabled or the form posts
+    persist=0. Returns the dataset run id, or None when nothing was stored.
+    """
+    store = get_default_store()
+    if store is None or data.get('persist', '1').lower() in ('0', 'false', 'off'):
+        return None
+    params = data.to_dict() if hasattr(data, 'to_dict') else dict(data)
+    try:
+        with metrics.stage("dataset"):
+            return store.save_run(stix_objects, relationships, params, story, evaluation)
+    except Exception as e:
+        # The generated graph is still returned; only its reuse is lost
+        logger.error(f"Could not store the run in the dataset: {str(e)}")
+        return None
+
+@contextlib.contextmanager
+def deferred_validation(stix_objects):
+    """
+    With fast records and STIX_GEN_VALIDATION=deferred, check the records against stix2 on
+    the process pool while the body of the block runs (relationship generation). Yields a
+    callable that waits for the check and returns its summary, or None when nothing is checked.
+    """
+    if not (fast_stix.OBJECT_MODE == "fast" and fast_stix.VALIDATION_MODE == "deferred" and stix_objects):
+        yield None
+        return
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(fast_stix.validate_records, list(stix_objects))
+
+    def summary():
+        errors = future.result()
+        return {
+            "checked": len(stix_objects),
+            "failed": len(errors),
+            "errors": [{"id": object_id, "error": error} for object_id, error in errors[:100]],
+        }
+
+    try:
+        yield summary
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 @app.route('/generate-graph', methods=['POST'])
 def generate_graph():
@@ -53,44 +118,354 @@ def generate_graph():
         data = request.form
         logger.debug(f"Received form data: {data}")
 
-        stix_objects = []
-        object_types = ['threat-actor', 'identity', 'malware', 'indicator', 'attack-pattern', 'tool', 'campaign', 'intrusion-set', 'vulnerability', 'course-of-action', 'location', 'malware-analysis']
-        
-        # Use ThreadPoolExecutor for parallel object generation
-        with ThreadPoolExecutor(max_workers=min(len(object_types), os.cpu_count() or 1)) as executor:
-            future_to_object_type = {
-                executor.submit(create_objects, object_type, int(data.get(f'{object_type}-count', 0))): object_type
-                for object_type in object_types
-                if int(data.get(f'{object_type}-count', 0)) > 0
-            }
-
-            for future in as_completed(future_to_object_type):
-                object_type = future_to_object_type[future]
-                try:
-                    objects = future.result()
-                    stix_objects.extend(objects)
-                except Exception as exc:
-                    logger.error(f'{object_type} generated an exception: {exc}')
-
-        logger.info(f"Total STIX objects created: {len(stix_objects)}")
-
-        # Use the STIXRelationshipAgent to generate relationships, story, and evaluation
-        agent_result = create_stix_story(stix_objects)
-
-        # Create the STIX bundle
-        stix_bundle = create_bundle(stix_objects, agent_result['relationships'])
-        logger.debug("STIX bundle created successfully")
-        
-        return jsonify({
-            "stix_bundle": stix_bundle,
-            "relationships": [{"source": r.source_ref, "type": r.relationship_type, "target": r.target_ref, "description": r.description} for r in agent_result['relationships']],
-            "story": agent_result['story'],
-            "evaluation": agent_result['evaluation']
-        })
+        with reproducible_run(data), metrics.request_summary() as summary:
+            with metrics.stage("objects"):
+                stix_objects = in_type_order({object_type: objects
+                                              for object_type, objects, _ in iter_generated_objects(data)})
+
+            logger.info(f"Total STIX objects created: {len(stix_objects)}")
+
+            # Generate relationships, story, and evaluation with the selected engine (LLM agent or rules)
+            with deferred_validation(stix_objects) as validation:
+                agent_result = create_stix_story(stix_objects, data.get('relationship-engine') or None)
+                validation_summary = validation() if validation is not None else None
+
+            # The bundle stays a structure and the whole response is encoded once; pretty-printing is opt-in
+            pretty = request.args.get('pretty', type=int) or data.get('pretty') in ('1', 'true')
+            with metrics.stage("bundle"):
+                response_body = {
+                    "stix_bundle": bundle_dict(stix_objects, agent_result['relationships']),
+                    "relationships": [{"source": r.source_ref, "type": r.relationship_type, "target": r.target_ref, "description": r.description} for r in agent_result['relationships']],
+                    "story": agent_result['story'],
+                    "evaluation": agent_result['evaluation']
+                }
+            if validation_summary is not None:
+                response_body["validation"] = validation_summary
+            response_body["dataset_run_id"] = persist_run(data, stix_objects, agent_result['relationships'],
+                                                          agent_result['story'], agent_result['evaluation'])
+            # The summary covers everything up to the final encoding
+            response_body["metrics"] = summary.to_dict()
+            body = dumps(response_body, pretty=pretty)
+        return Response(body, mimetype='application/json')
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
+def format_stream_event(event, payload, sse=False):
+    """
+    Encode one event as an NDJSON line, or as an SSE message when `sse` is set.
+
+    STIX objects and plain payloads are encoded once, compactly.
+    """
+    if sse:
+        return b"event: " + event.encode() + b"\ndata: " + dumps(payload) + b"\n\n"
+    return dumps({"event": event, "data": payload}) + b"\n"
+
+def iter_graph_events(data):
+    """
+    Run the whole generation pipeline for a /generate-graph form, yielding (event, payload)
+    pairs: a "stage" event as each stage begins, then "object", "relationship", "story"
+    chunk, "evaluation" and per-type "error" events as they are produced, and finally a
+    "dataset" event with the id the run was stored under.
+    """
+    yield "stage", {"stage": "objects"}
+    # Includes the time the consumer spends on each event, like the streamed agent stages
+    start = time.perf_counter()
+    objects_by_type = {}
+    for object_type, objects, error in iter_generated_objects(data):
+        if error is not None:
+            yield "error", {"object_type": object_type, "message": str(error)}
+        for obj in objects:
+            yield "object", obj
+        objects_by_type[object_type] = objects
+    stix_objects = in_type_order(objects_by_type)
+    metrics.observe_stage("objects", time.perf_counter() - start)
+
+    logger.info(f"Total STIX objects created: {len(stix_objects)}")
+
+    relationships, story, evaluation = [], [], None
+    with deferred_validation(stix_objects) as validation:
+        yield "stage", {"stage": "relationships"}
+        stage = "relationships"
+        for event, payload in stream_stix_story(stix_objects, data.get('relationship-engine') or None):
+            if event in ("story", "evaluation") and event != stage:
+                stage = event
+                yield "stage", {"stage": stage}
+            if event == "relationship":
+                relationships.append(payload)
+            elif event == "story":
+                story.append(payload)
+                payload = {"delta": payload}
+            elif event == "evaluation":
+                evaluation = payload
+            yield event, payload
+
+        if validation is not None:
+            yield "validation", validation()
+
+    run_id = persist_run(data, stix_objects, relationships, "".join(story), evaluation)
+    if run_id is not None:
+        yield "dataset", {"run_id": run_id}
+
+@app.route('/generate-graph/stream', methods=['POST'])
+def generate_graph_stream():
+    """
+    Streaming variant of /generate-graph. Emits a "start" event with the bundle id, then each
+    "object" and "relationship" as it is produced, "story" chunks as the LLM writes them, the
+    "evaluation", the "dataset" run id it was stored under, and a closing "done" event.
+    Responds with NDJSON, or with Server-Sent Events when the client accepts
+    text/event-stream or posts format=sse.
+    """
+    data = request.form
+    sse = data.get('format') == 'sse' or request.accept_mimetypes.best == 'text/event-stream'
+    logger.debug(f"Received form data for streaming: {data}")
+
+    def events():
+        counts = {"object": 0, "relationship": 0}
+        summary = None
+        try:
+            with reproducible_run(data), metrics.request_summary("stream") as summary:
+                yield format_stream_event("start", {"bundle_id": seeding.new_id("bundle")}, sse)
+                for event, payload in iter_graph_events(data):
+                    if event in counts:
+                        counts[event] += 1
+                    yield format_stream_event(event, payload, sse)
+        except Exception as e:
+            logger.error(f"An error occurred while streaming: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield format_stream_event("error", {"message": str(e)}, sse)
+        yield format_stream_event("done", {"objects": counts["object"], "relationships": counts["relationship"],
+                                           "metrics": summary.to_dict() if summary is not None else None}, sse)
+
+    mimetype = 'text/event-stream' if sse else 'application/x-ndjson'
+    return Response(stream_with_context(events()), mimetype=mimetype,
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def iter_job_events(data):
+    with reproducible_run(data), metrics.request_summary("job"):
+        yield from iter_graph_events(data)
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """
+    Return the process-wide job manager, created (and its SQLite store opened) on first use.
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(iter_job_events)
+        return _job_manager
+
+def job_status(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "created": job["created"],
+        "updated": job["updated"],
+    }
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a graph generation job for the same form fields as /generate-graph.
+    """
+    job_id = get_job_manager().submit(request.form.to_dict())
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "results_url": f"/jobs/{job_id}/results",
+        "cancel_url": f"/jobs/{job_id}/cancel",
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = get_job_manager().store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job_status(job))
+
+def page_args(default_limit=500):
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', default_limit, type=int)), 5000)
+    return offset, limit
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """
+    Page through the objects and relationships a job has produced so far (optionally only
+    one `kind`), along with the story written so far and the evaluation once available.
+    """
+    store = get_job_manager().store
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    offset, limit = page_args()
+    items = store.items(job_id, offset, limit, request.args.get('kind'))
+    # Stored payloads are already JSON; embed them as-is instead of decoding and re-encoding
+    return Response(dumps({
+        **job_status(job),
+        "offset": offset,
+        "limit": limit,
+        "objects": [orjson.Fragment(payload) for kind, payload in items if kind == "object"],
+        "relationships": [orjson.Fragment(payload) for kind, payload in items if kind == "relationship"],
+        "next_offset": offset + len(items) if len(items) == limit else None,
+        "story": job["story"],
+        "evaluation": job["evaluation"],
+    }), mimetype='application/json')
+
+def bundle_response(payloads, name):
+    """
+    Answer a bundle download for stored JSON payloads: streamed as one bundle (format=json,
+    the default) or NDJSON (format=ndjson), or, when max_objects and/or max_bytes is given,
+    split with shard_bundle into a zip of bundles and a cross-reference manifest.
+    """
+    bundle_format = request.args.get('format', 'json')
+    if bundle_format not in BundleWriter.FORMATS:
+        return jsonify({"error": f"Unknown bundle format '{bundle_format}'"}), 400
+    max_objects = request.args.get('max_objects', type=int)
+    max_bytes = request.args.get('max_bytes', type=int)
+    if max_objects is None and max_bytes is None:
+        mimetype = 'application/x-ndjson' if bundle_format == 'ndjson' else 'application/json'
+        return Response(iter_bundle_chunks(payloads, bundle_format), mimetype=mimetype,
+                        headers={"Content-Disposition": f"attachment; filename={name}.{bundle_format}"})
+    if (max_objects is not None and max_objects < 1) or (max_bytes is not None and max_bytes < 1):
+        return jsonify({"error": "max_objects and max_bytes must be positive"}), 400
+    # Sharding needs every object up front to place relationships next to their endpoints
+    archive = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+    write_sharded_zip((orjson.loads(payload) for payload in payloads), archive, max_objects, max_bytes,
+                      bundle_format, prefix=name)
+    archive.seek(0)
+    return send_file(archive, mimetype='application/zip', as_attachment=True, download_name=f"{name}.zip")
+
+@app.route('/jobs/<job_id>/bundle', methods=['GET'])
+def download_job_bundle(job_id):
+    """
+    Stream every object and relationship a job has produced as a STIX bundle (format=json,
+    the default) or as NDJSON (format=ndjson), without holding the dataset in memory.
+    max_objects and/or max_bytes return the bundle sharded into a zip instead.
+    """
+    store = get_job_manager().store
+    if store.get(job_id) is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return bundle_response(store.iter_payloads(job_id), job_id)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job_status(job))
+
+@app.route('/dataset', methods=['GET'])
+def dataset_stats():
+    store = get_default_store()
+    if store is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **store.stats()})
+
+@app.route('/dataset/objects', methods=['GET'])
+def query_dataset_objects():
+    """
+    Page through stored objects and relationships, oldest first. Filters: type (repeatable),
+    run_id, name, name_prefix, created_after, created_before, source_ref, target_ref, ref
+    (either end), relationship_type and prop.<property>=<value> for any top-level property
+    (list properties match when they contain the value). Pass a page's next_cursor as
+    `cursor` to fetch the page after it.
+    """
+    store = get_default_store()
+    if store is None:
+        return jsonify({"error": "The dataset store is disabled"}), 404
+    try:
+        query = DatasetQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    _, limit = page_args()
+    cursor = request.args.get('cursor')
+    try:
+        payloads, next_cursor = store.query(query, cursor, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(dumps({
+        "cursor": cursor,
+        "limit": limit,
+        "objects": [orjson.Fragment(payload) for payload in payloads],
+        "next_cursor": next_cursor,
+    }), mimetype='application/json')
+
+@app.route('/dataset/objects/<stix_id>', methods=['GET'])
+def get_dataset_object(stix_id):
+    """
+    A stored object: the copy saved by `run_id` when given, otherwise the latest one.
+    """
+    store = get_default_store()
+    payload = store.get(stix_id, request.args.get('run_id')) if store is not None else None
+    if payload is None:
+        return jsonify({"error": f"Unknown object {stix_id}"}), 404
+    return Response(payload, mimetype='application/json')
+
+@app.route('/dataset/bundle', methods=['GET'])
+def download_dataset_bundle():
+    """
+    Stream the stored objects matching the /dataset/objects filters as a STIX bundle
+    (format=json, the default) or as NDJSON (format=ndjson), or as a zip of shards when
+    max_objects and/or max_bytes is given.
+    """
+    store = get_default_store()
+    if store is None:
+        return jsonify({"error": "The dataset store is disabled"}), 404
+    try:
+        query = DatasetQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return bundle_response(store.iter_payloads(query), "dataset")
+
+@app.route('/dataset/runs', methods=['GET'])
+def list_dataset_runs():
+    store = get_default_store()
+    if store is None:
+        return jsonify({"error": "The dataset store is disabled"}), 404
+    offset, limit = page_args(100)
+    runs = store.runs(offset, limit)
+    return jsonify({
+        "offset": offset,
+        "limit": limit,
+        "runs": runs,
+        "next_offset": offset + len(runs) if len(runs) == limit else None,
+    })
+
+@app.route('/dataset/runs/<run_id>', methods=['GET'])
+def get_dataset_run(run_id):
+    """
+    A stored run's parameters, story and evaluation; its objects are at
+    /dataset/objects?run_id=<run_id>.
+    """
+    store = get_default_store()
+    run = store.get_run(run_id) if store is not None else None
+    if run is None:
+        return jsonify({"error": f"Unknown dataset run {run_id}"}), 404
+    return jsonify({**run, "objects_url": f"/dataset/objects?run_id={run_id}",
+                    "bundle_url": f"/dataset/bundle?run_id={run_id}"})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Stage latency, LLM call, token and failure metrics in the Prometheus text format.
+    """
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/relationship-cache', methods=['GET'])
+def relationship_cache_stats():
+    cache = get_default_cache()
+    if cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **cache.stats()})
+
 if __name__ == '__main__':
     app.run(debug=True)
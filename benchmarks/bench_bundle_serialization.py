@@ -0,0 +1,125 @@
+"""
+Bundle serialization benchmark: cost of turning generated objects into the /generate-graph
+response body.
+
+Three paths are measured for each bundle size:
+
+    legacy   stix2.Bundle(...).serialize(pretty=True), then the resulting string embedded
+             in the response with json.dumps (what jsonify did), as before
+    compact  the same with serialize(pretty=False), to separate the cost of stix2's
+             spec-order pretty printing from the double encoding
+    orjson   stix_bundler.bundle_dict encoded once with stix_bundler.dumps, compact
+
+stix2's pretty printer grows much faster than linearly with bundle size (about 5 s for
+200 objects), so the legacy path is skipped above --legacy-max objects.
+
+Objects come from the offline Faker backend. A pool of distinct objects is generated once
+and repeated to reach each size, since serialization cost does not depend on id uniqueness.
+
+Usage:
+    python benchmarks/bench_bundle_serialization.py [--sizes 1000 10000 100000] [--runs 3]
+        [--legacy-max 500] [--output serialization.json]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# ChatOpenAI refuses to construct without a key; no request is ever sent
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+logging.disable(logging.INFO)
+
+import stix_object_builder  # noqa: E402
+from stix2 import Bundle  # noqa: E402
+from stix_bundler import bundle_dict, dumps  # noqa: E402
+
+POOL_CREATORS = [
+    stix_object_builder.create_threat_actors,
+    stix_object_builder.create_malwares,
+    stix_object_builder.create_tools,
+    stix_object_builder.create_identities,
+    stix_object_builder.create_campaigns,
+    stix_object_builder.create_infrastructures,
+    stix_object_builder.create_intrusion_sets,
+    stix_object_builder.create_locations,
+    stix_object_builder.create_indicators,
+]
+
+
+def build_pool(size):
+    per_type = max(1, size // len(POOL_CREATORS))
+    pool = []
+    for create in POOL_CREATORS:
+        pool.extend(create(per_type, backend="faker"))
+    return pool
+
+
+def legacy(objects):
+    bundle = Bundle(objects=objects, allow_custom=True).serialize(pretty=True)
+    return json.dumps({"stix_bundle": bundle}).encode()
+
+
+def compact(objects):
+    bundle = Bundle(objects=objects, allow_custom=True).serialize()
+    return json.dumps({"stix_bundle": bundle}).encode()
+
+
+def fast(objects):
+    return dumps({"stix_bundle": bundle_dict(objects)})
+
+
+PATHS = {"legacy": legacy, "compact": compact, "orjson": fast}
+
+
+def measure(path, objects, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = path(objects)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    path(objects)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "runs": runs,
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "bytes": len(body),
+        "peak_mb": peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--pool", type=int, default=2000, help="Distinct objects generated before repeating")
+    parser.add_argument("--legacy-max", type=int, default=500, help="Largest size the legacy path is run at")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    pool = build_pool(args.pool)
+    results = {}
+    for size in args.sizes:
+        objects = (pool * (size // len(pool) + 1))[:size]
+        results[size] = {name: measure(path, objects, args.runs) for name, path in PATHS.items()
+                         if name != "legacy" or size <= args.legacy_max}
+        for name, stats in results[size].items():
+            print(f"{size:>7} {name:6s} median {stats['median_s'] * 1000:9.1f} ms  "
+                  f"{stats['bytes'] / 1e6:8.2f} MB body  peak {stats['peak_mb']:8.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "bundle_serialization", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Streaming bundle writer benchmark: peak Python memory and throughput of
+stix_bundler.BundleWriter against encoding the whole bundle in memory.
+
+    stream     objects pulled lazily from a generator and written with BundleWriter
+               (json and ndjson) to a temporary file
+    in-memory  the same objects collected into a list and encoded with
+               dumps(bundle_dict(...)), as /generate-graph does
+
+Objects come from the offline Faker backend; a fixed pool is cycled to reach each size,
+so the pool itself is the only memory that does not depend on the writer. Peak memory is
+measured with tracemalloc and reported above that baseline.
+
+Usage:
+    python benchmarks/bench_bundle_writer.py [--sizes 1000 100000 1000000]
+        [--in-memory-max 100000] [--output writer.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import cycle, islice
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# ChatOpenAI refuses to construct without a key; no request is ever sent
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+logging.disable(logging.INFO)
+
+import stix_object_builder  # noqa: E402
+from stix_bundler import BundleWriter, bundle_dict, dumps  # noqa: E402
+
+
+def build_pool(size):
+    creators = [stix_object_builder.create_threat_actors, stix_object_builder.create_malwares,
+                stix_object_builder.create_tools, stix_object_builder.create_indicators,
+                stix_object_builder.create_locations]
+    pool = []
+    for create in creators:
+        pool.extend(create(max(1, size // len(creators)), backend="faker"))
+    return pool
+
+
+def stream(pool, size, path, bundle_format):
+    with BundleWriter(path, bundle_format) as writer:
+        writer.write_all(islice(cycle(pool), size))
+    return writer.bytes_written
+
+
+def in_memory(pool, size, path, bundle_format):
+    body = dumps(bundle_dict(list(islice(cycle(pool), size))))
+    with open(path, "wb") as f:
+        f.write(body)
+    return len(body)
+
+
+def measure(function, pool, size, bundle_format):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bundle")
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        written = function(pool, size, path, bundle_format)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "seconds": elapsed,
+        "objects_per_s": size / elapsed,
+        "bytes": written,
+        "peak_mb": (peak - baseline) / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--pool", type=int, default=1000, help="Distinct objects generated before cycling")
+    parser.add_argument("--in-memory-max", type=int, default=100000,
+                        help="Largest size the in-memory path is run at")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    pool = build_pool(args.pool)
+    results = {}
+    for size in args.sizes:
+        results[size] = {
+            "stream-json": measure(stream, pool, size, "json"),
+            "stream-ndjson": measure(stream, pool, size, "ndjson"),
+        }
+        if size <= args.in_memory_max:
+            results[size]["in-memory"] = measure(in_memory, pool, size, "json")
+        for name, stats in results[size].items():
+            print(f"{size:>9} {name:13s} {stats['seconds']:8.2f} s  {stats['objects_per_s']:9.0f} obj/s  "
+                  f"{stats['bytes'] / 1e6:9.1f} MB written  peak {stats['peak_mb']:8.2f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "bundle_writer", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
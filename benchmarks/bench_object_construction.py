@@ -0,0 +1,118 @@
+"""
+Object construction benchmark: per-type cost of building STIX objects with stix2 versus
+fast_stix records, under each validation mode.
+
+    stix2        stix2 class constructor (full validation, immutable object)
+    fast         fast_stix.build with validation skipped
+    fast-sample  fast_stix.build validating a STIX_GEN_VALIDATION_SAMPLE fraction (5%)
+    fast-full    fast_stix.build validating every record inline
+    deferred     fast_stix.validate_records over all records on a process pool, reported
+                 as throughput of the separate pass
+
+Property values are taken from Faker-generated objects, serialized to JSON first so
+timestamps arrive as strings the way the create_* functions pass them. Every fast record
+is also checked to serialize byte for byte like its stix2 counterpart.
+
+Usage:
+    python benchmarks/bench_object_construction.py [--count 500] [--workers 4] [--output construction.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# ChatOpenAI refuses to construct without a key; no request is ever sent
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+logging.disable(logging.INFO)
+
+import fast_stix  # noqa: E402
+import generation_scheduler  # noqa: E402
+import stix_object_builder as builder  # noqa: E402
+from stix2.registry import class_for_type  # noqa: E402
+from stix_bundler import dumps  # noqa: E402
+
+PHASE_ONE = [builder.create_threat_actors, builder.create_malwares, builder.create_tools,
+             builder.create_infrastructures, builder.create_identities, builder.create_campaigns,
+             builder.create_intrusion_sets, builder.create_locations, builder.create_indicators]
+PHASE_TWO = [builder.create_attack_patterns, builder.create_vulnerabilities, builder.create_course_of_actions,
+             builder.create_malware_analysis, builder.create_observed_datas, builder.create_notes,
+             builder.create_reports, builder.create_groupings, builder.create_opinions]
+
+
+def sample_properties(count):
+    """
+    Return {stix type: [property dicts]} taken from Faker-generated objects.
+    """
+    phase_1_objects = []
+    for create in PHASE_ONE:
+        phase_1_objects.extend(create(count, backend="faker"))
+    objects = list(phase_1_objects)
+    for create in PHASE_TWO:
+        objects.extend(create(count, phase_1_objects, backend="faker"))
+
+    by_type = {}
+    for obj in objects:
+        by_type.setdefault(obj["type"], []).append(json.loads(obj.serialize()))
+    return by_type
+
+
+def time_per_object(function, items):
+    start = time.perf_counter()
+    for kwargs in items:
+        function(kwargs)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="Objects per type")
+    parser.add_argument("--workers", type=int, default=4, help="Processes for the deferred validation pass")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    samples = sample_properties(args.count)
+    results = {}
+    all_records = []
+    print(f"{'type':18s} {'stix2':>9s} {'fast':>9s} {'sample':>9s} {'full':>9s}   us/object")
+    for stix_type, items in samples.items():
+        stix_class = class_for_type(stix_type, "2.1", "objects")
+        timings = {"stix2": time_per_object(lambda kwargs: stix_class(**kwargs), items)}
+        for name, mode in (("fast", "none"), ("fast-sample", "sample"), ("fast-full", "full")):
+            fast_stix.VALIDATION_MODE = mode
+            timings[name] = time_per_object(lambda kwargs: fast_stix.build(stix_class, **kwargs), items)
+
+        fast_stix.VALIDATION_MODE = "none"
+        records = [fast_stix.build(stix_class, **kwargs) for kwargs in items]
+        mismatches = sum(dumps(record) != dumps(stix_class(**kwargs)) for record, kwargs in zip(records, items))
+        all_records.extend(records)
+
+        results[stix_type] = {"objects": len(items), "us_per_object": timings, "byte_mismatches": mismatches}
+        print(f"{stix_type:18s} {timings['stix2']:9.1f} {timings['fast']:9.1f} {timings['fast-sample']:9.1f} "
+              f"{timings['fast-full']:9.1f}   {mismatches} mismatches")
+
+    # Deferred validation runs on the scheduler's shared pool, sized by PROCESS_WORKERS
+    generation_scheduler.PROCESS_WORKERS = args.workers
+    start = time.perf_counter()
+    errors = fast_stix.validate_records(all_records, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    results["deferred_validation"] = {
+        "records": len(all_records),
+        "workers": args.workers,
+        "seconds": elapsed,
+        "records_per_s": len(all_records) / elapsed,
+        "errors": len(errors),
+    }
+    print(f"deferred validation: {len(all_records)} records in {elapsed:.2f} s on {args.workers} processes "
+          f"({len(errors)} errors)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "object_construction", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Pipeline benchmark: generation, relationships, bundling and the /generate-graph endpoint,
+run against the local mock LLM server (mock_llm_server.py) so no request leaves the machine.
+
+For each size (total objects, split evenly over the 18 object types) it measures:
+
+    create         objects/s of every create_* function, per type, with the faker backend
+                   and with the llm backend talking to the mock
+    relationships  wall time of STIXRelationshipAgent.generate_relationships over the
+                   llm-generated objects (cache disabled)
+    bundle         create_bundle (stix2, pretty-printed) time and peak memory, next to
+                   dumps(bundle_dict(...)) which /generate-graph uses
+    end_to_end     latency of one POST /generate-graph with the llm backend and engine
+
+LLM-backed sections are skipped above --llm-max objects and create_bundle above
+--create-bundle-max (stix2's pretty printer grows much faster than linearly). Runs are
+seeded, so the same commit generates the same objects and prompts; results are written
+with the commit hash, and --baseline prints the change against an earlier results file.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10 1000 100000] [--latency-ms 0]
+        [--llm-max 1000] [--create-bundle-max 100] [--output pipeline.json] [--baseline old.json]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# Every LLM call goes to the mock; the key only has to be present
+os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+os.environ["STIX_RELATIONSHIP_CACHE"] = "off"
+logging.disable(logging.WARNING)
+
+from mock_llm_server import MockConfig, MockServer  # noqa: E402
+
+
+def commit_hash():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def per_type_counts(size, object_types):
+    per_type, remainder = divmod(size, len(object_types))
+    return {object_type: per_type + (index < remainder) for index, object_type in enumerate(object_types)}
+
+
+def bench_create(counts, backend):
+    """
+    Create every type in dependency order; returns ({type: stats}, all objects).
+    """
+    from generation_scheduler import PHASE_ONE_CREATORS, create_objects
+    from object_pool import ObjectPool
+
+    results = {}
+    phase_one = ObjectPool()
+    objects = []
+    for object_type, count in counts.items():
+        if not count:
+            continue
+        references = None if object_type in PHASE_ONE_CREATORS else phase_one
+        start = time.perf_counter()
+        created = create_objects(object_type, count, backend, references)
+        elapsed = time.perf_counter() - start
+        if object_type in PHASE_ONE_CREATORS:
+            phase_one.extend(created)
+        objects.extend(created)
+        results[object_type] = {"objects": len(created), "seconds": elapsed,
+                                "objects_per_s": len(created) / elapsed if elapsed else None}
+    return results, objects
+
+
+def bench_relationships(objects):
+    from relationship_builder import STIXRelationshipAgent
+
+    agent = STIXRelationshipAgent(use_cache=False)
+    start = time.perf_counter()
+    relationships = agent.generate_relationships(objects)
+    elapsed = time.perf_counter() - start
+    return {"objects": len(objects), "relationships": len(relationships), "seconds": elapsed}, relationships
+
+
+def bench_bundle(objects, relationships, runs, include_create_bundle):
+    from stix_bundler import bundle_dict, create_bundle, dumps
+
+    paths = {"orjson": lambda: dumps(bundle_dict(objects, relationships))}
+    if include_create_bundle:
+        paths["create_bundle"] = lambda: create_bundle(list(objects), list(relationships))
+    results = {}
+    for name, path in paths.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            body = path()
+            samples.append(time.perf_counter() - start)
+        # Traced separately: tracemalloc slows allocation-heavy code down
+        tracemalloc.start()
+        path()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {"objects": len(objects) + len(relationships), "median_s": statistics.median(samples),
+                         "bytes": len(body), "peak_mb": peak / 1e6}
+    return results
+
+
+def bench_end_to_end(counts, runs):
+    import app
+
+    client = app.app.test_client()
+    form = {f"{object_type}-count": str(count) for object_type, count in counts.items() if count}
+    form.update({"backend": "llm", "relationship-engine": "llm"})
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.post("/generate-graph", data=form)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/generate-graph returned {response.status_code}: {response.data[:200]}")
+    bundle = response.get_json()["stix_bundle"]
+    return {"runs": runs, "median_s": statistics.median(samples), "min_s": min(samples),
+            "bundle_objects": len(bundle["objects"])}
+
+
+def flatten(results, prefix=""):
+    """
+    {"1000": {"create": {...}}} -> {"1000.create....seconds": value} for the timing metrics.
+    """
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif key in ("seconds", "median_s", "peak_mb") and isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = flatten(baseline["results"])
+    print(f"\nchange against {baseline_path} ({baseline.get('commit') or 'unknown commit'}):")
+    for name, value in flatten(results).items():
+        if before.get(name):
+            print(f"  {name:60s} {before[name]:10.4f} -> {value:10.4f}  {(value / before[name] - 1) * 100:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000], help="Total objects per run")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions for bundle and end-to-end timings")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mock LLM latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-max", type=int, default=1000, help="Largest size LLM-backed sections run at")
+    parser.add_argument("--create-bundle-max", type=int, default=100,
+                        help="Largest size create_bundle (stix2 pretty printing) runs at")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    args = parser.parse_args()
+
+    config = MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        seed=args.seed)
+    with MockServer(config) as server:
+        # Read when the ChatOpenAI clients are built, i.e. on first use below
+        os.environ["OPENAI_API_BASE"] = server.base_url
+        from generation_scheduler import OBJECT_TYPES
+        from StixObjectLang import seeding
+
+        # Warm up: Faker pools, schema imports and LLM clients are built on first use
+        warm_up = per_type_counts(len(OBJECT_TYPES), OBJECT_TYPES)
+        bench_create(warm_up, "faker")
+        if min(args.sizes) <= args.llm_max:
+            bench_create(warm_up, "llm")
+
+        results = {}
+        for size in args.sizes:
+            counts = per_type_counts(size, OBJECT_TYPES)
+            use_llm = size <= args.llm_max
+            result = results[str(size)] = {}
+            with seeding.run(args.seed):
+                result["create"] = {}
+                result["create"]["faker"], objects = bench_create(counts, "faker")
+                relationships = []
+                if use_llm:
+                    server.mock.reset()
+                    result["create"]["llm"], objects = bench_create(counts, "llm")
+                    result["create"]["llm_requests"] = server.mock.stats["requests"]
+                    server.mock.reset()
+                    result["relationships"], relationships = bench_relationships(objects)
+                    result["relationships"]["llm_requests"] = server.mock.stats["requests"]
+                # Above --llm-max the faker objects are bundled without relationships
+                result["bundle"] = bench_bundle(objects, relationships, args.runs,
+                                                size <= args.create_bundle_max)
+                if use_llm:
+                    result["end_to_end"] = bench_end_to_end(counts, args.runs)
+
+            faker_total = sum(stats["objects"] for stats in result["create"]["faker"].values())
+            faker_seconds = sum(stats["seconds"] for stats in result["create"]["faker"].values())
+            line = f"{size:>7} objects  faker {faker_total / faker_seconds:9.0f} obj/s"
+            if use_llm:
+                llm_seconds = sum(stats["seconds"] for stats in result["create"]["llm"].values())
+                line += (f"  llm {faker_total / llm_seconds:7.0f} obj/s"
+                         f"  relationships {result['relationships']['seconds']:7.2f} s"
+                         f"  end-to-end {result['end_to_end']['median_s']:7.2f} s")
+            for name, stats in result["bundle"].items():
+                line += f"  {name} {stats['median_s'] * 1000:.1f} ms / {stats['peak_mb']:.1f} MB"
+            print(line)
+
+    report = {"benchmark": "pipeline", "commit": commit_hash(), "config": vars(args), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Sharding benchmark: faker-backed generation throughput in the "threads" execution mode
+against the "processes" mode at increasing worker counts (STIX_GEN_EXECUTION).
+
+Every run builds --count objects of each of the 18 types through
+generation_scheduler.iter_scheduled_objects in one seeded run, after a warm-up run that
+starts the worker pool. Processes runs are checked to produce the same objects whatever
+the worker count.
+
+Usage:
+    python benchmarks/bench_sharding.py [--count 2000] [--workers 1 2 4 8] [--shard-size 500]
+        [--output sharding.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# ChatOpenAI refuses to construct without a key; no request is ever sent
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+logging.disable(logging.INFO)
+
+import generation_scheduler as scheduler  # noqa: E402
+from stix_bundler import dumps  # noqa: E402
+from StixObjectLang import seeding  # noqa: E402
+
+
+def generate(count, seed):
+    counts = {object_type: count for object_type in scheduler.OBJECT_TYPES}
+    backends = {object_type: "faker" for object_type in scheduler.OBJECT_TYPES}
+    objects = []
+    with seeding.run(seed):
+        for object_type, created, error in scheduler.iter_scheduled_objects(counts, backends):
+            if error is not None:
+                raise error
+            objects.extend(created)
+    return objects
+
+
+def timed(count, seed):
+    generate(count, seed)
+    start = time.perf_counter()
+    objects = generate(count, seed)
+    elapsed = time.perf_counter() - start
+    return objects, {"objects": len(objects), "seconds": elapsed, "objects_per_s": len(objects) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="Objects per type")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Process counts to try")
+    parser.add_argument("--shard-size", type=int, default=scheduler.SHARD_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    scheduler.SHARD_SIZE = args.shard_size
+    scheduler.EXECUTION_MODE = "threads"
+    _, baseline = timed(args.count, args.seed)
+    results = {"cpu_count": os.cpu_count(), "threads": baseline, "processes": {}}
+    print(f"threads            {baseline['objects_per_s']:9.0f} obj/s")
+
+    reference = None
+    scheduler.EXECUTION_MODE = "processes"
+    for workers in args.workers:
+        scheduler.PROCESS_WORKERS = workers
+        objects, stats = timed(args.count, args.seed)
+        scheduler.get_process_pool().shutdown()
+        scheduler._process_pool = None
+
+        encoded = dumps(objects)
+        stats["matches_first_run"] = reference is None or encoded == reference
+        reference = reference or encoded
+        stats["speedup"] = stats["objects_per_s"] / baseline["objects_per_s"]
+        results["processes"][str(workers)] = stats
+        print(f"processes x{workers:<3d}     {stats['objects_per_s']:9.0f} obj/s  "
+              f"{stats['speedup']:5.2f}x threads  {'same objects' if stats['matches_first_run'] else 'DIFFERENT'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "sharding", "config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
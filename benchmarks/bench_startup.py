@@ -0,0 +1,66 @@
+"""
+Startup benchmark: wall-clock cost of importing app.py.
+
+Each sample runs in a fresh interpreter so module caches do not leak between runs.
+Two scenarios are measured:
+
+    lazy   import app only (generators are built on first use)
+    eager  import app and build every StixObjectLang generator, which is what
+           importing stix_object_builder used to do at import time
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "lazy": "import app",
+    "eager": "import app\nfrom StixObjectLang import registry\nregistry.build_all()",
+}
+
+
+def time_scenario(code, runs):
+    env = dict(os.environ)
+    # ChatOpenAI refuses to construct without a key; no request is ever sent
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=REPO_ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return {
+        "runs": runs,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "max_s": max(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {name: time_scenario(code, args.runs) for name, code in SCENARIOS.items()}
+    for name, stats in results.items():
+        print(f"{name:6s} median {stats['median_s'] * 1000:8.1f} ms  "
+              f"(min {stats['min_s'] * 1000:.1f}, max {stats['max_s'] * 1000:.1f})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "startup", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+import base64
+import datetime as dt
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from stix2.utils import format_datetime
+
+from stix_bundler import dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "dataset.sqlite3")
+# Set STIX_DATASET_DB=off to stop persisting generated runs
+DATASET_PATH = os.getenv("STIX_DATASET_DB", DEFAULT_DATASET_PATH)
+MAX_PAGE_SIZE = 5000
+
+_PROPERTY_NAME = re.compile(r"[a-z0-9_]+")
+# Upper bound for name prefix ranges, so prefix queries can use the name index
+_MAX_CHAR = "\U0010ffff"
+
+
+def _timestamp(value) -> Optional[str]:
+    if isinstance(value, dt.datetime):
+        return format_datetime(value)
+    return value
+
+
+def encode_cursor(position: Sequence[Any]) -> str:
+    """
+    An opaque page cursor for a (created, id, run_id) position in the store's sort order.
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(position)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    if not isinstance(position, list) or len(position) != 3:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    return tuple(position)
+
+
+def _candidates(value: str) -> List[Any]:
+    """
+    A query string value and the JSON scalars it may stand for: "true" also matches JSON
+    true (1 in SQLite), "5" also matches the number 5.
+    """
+    candidates: List[Any] = [value]
+    if value in ("true", "false"):
+        candidates.append(int(value == "true"))
+    else:
+        for convert in (int, float):
+            try:
+                candidates.append(convert(value))
+                break
+            except ValueError:
+                continue
+    return candidates
+
+
+class DatasetQuery:
+    """
+    Filters for DatasetStore.query. Every filter is optional; they are combined with AND.
+
+    `types` matches any of the given STIX types, `ref` either end of a relationship, and
+    `properties` maps a top-level property to a value it must equal, or contain when the
+    property is a list (e.g. {"malware_types": "ransomware"}).
+    """
+
+    def __init__(self, types: Sequence[str] = (), run_id: Optional[str] = None, name: Optional[str] = None,
+                 name_prefix: Optional[str] = None, created_after: Optional[str] = None,
+                 created_before: Optional[str] = None, source_ref: Optional[str] = None,
+                 target_ref: Optional[str] = None, ref: Optional[str] = None,
+                 relationship_type: Optional[str] = None, properties: Optional[Dict[str, str]] = None):
+        self.types = list(types)
+        self.run_id = run_id
+        self.name = name
+        self.name_prefix = name_prefix
+        self.created_after = created_after
+        self.created_before = created_before
+        self.source_ref = source_ref
+        self.target_ref = target_ref
+        self.ref = ref
+        self.relationship_type = relationship_type
+        self.properties = dict(properties or {})
+        for prop in self.properties:
+            if not _PROPERTY_NAME.fullmatch(prop):
+                raise ValueError(f"Invalid property name '{prop}'")
+
+    @classmethod
+    def from_args(cls, args) -> "DatasetQuery":
+        """
+        Build a query from request arguments: type (repeatable), run_id, name, name_prefix,
+        created_after, created_before, source_ref, target_ref, ref, relationship_type and
+        prop.<property>=<value>.
+        """
+        return cls(
+            types=args.getlist("type"),
+            run_id=args.get("run_id"),
+            name=args.get("name"),
+            name_prefix=args.get("name_prefix"),
+            created_after=args.get("created_after"),
+            created_before=args.get("created_before"),
+            source_ref=args.get("source_ref"),
+            target_ref=args.get("target_ref"),
+            ref=args.get("ref"),
+            relationship_type=args.get("relationship_type"),
+            properties={key[len("prop."):]: value for key, value in args.items() if key.startswith("prop.")},
+        )
+
+    def where(self) -> Tuple[str, List[Any]]:
+        clauses = []
+        params: List[Any] = []
+
+        def add(clause, *values):
+            clauses.append(clause)
+            params.extend(values)
+
+        if self.types:
+            add(f"type IN ({', '.join('?' for _ in self.types)})", *self.types)
+        if self.run_id:
+            add("run_id = ?", self.run_id)
+        if self.name:
+            add("name = ?", self.name)
+        if self.name_prefix:
+            add("name >= ? AND name < ?", self.name_prefix, self.name_prefix + _MAX_CHAR)
+        if self.created_after:
+            add("created >= ?", self.created_after)
+        if self.created_before:
+            add("created < ?", self.created_before)
+        if self.source_ref:
+            add("source_ref = ?", self.source_ref)
+        if self.target_ref:
+            add("target_ref = ?", self.target_ref)
+        if self.ref:
+            add("(source_ref = ? OR target_ref = ?)", self.ref, self.ref)
+        if self.relationship_type:
+            add("relationship_type = ?", self.relationship_type)
+        for prop, value in self.properties.items():
+            candidates = _candidates(value)
+            # json_each yields a scalar property itself, or each element of a list property
+            add(f"EXISTS (SELECT 1 FROM json_each(payload, ?) WHERE json_each.value IN "
+                f"({', '.join('?' for _ in candidates)}))", f"$.{prop}", *candidates)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class DatasetStore:
+    """
+    SQLite store of generated datasets, so earlier runs can be queried and reused instead of
+    regenerated.
+
+    `dataset_runs` holds one row per run (request parameters, story, evaluation, counts);
+    `stix_objects` holds every SDO and relationship as its JSON serialization, with the
+    columns queries filter on (type, created, name, relationship refs) indexed. Objects are
+    keyed by run and STIX id: a run that regenerates an id (e.g. a seeded rerun) stores its
+    own copy, so earlier runs keep every object they were saved with. Queries spanning runs
+    return each run's copy.
+    """
+
+    def __init__(self, path: str = DATASET_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS dataset_runs (
+                id TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                story TEXT NOT NULL DEFAULT '',
+                evaluation TEXT,
+                object_count INTEGER NOT NULL,
+                relationship_count INTEGER NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS stix_objects (
+                id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                created TEXT,
+                modified TEXT,
+                name TEXT,
+                relationship_type TEXT,
+                source_ref TEXT,
+                target_ref TEXT,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (run_id, id)
+            )
+        """)
+        # The sort order (created, id, run_id) is unique, so pages can continue after a position
+        for name, columns in (("type_created", "type, created, id, run_id"), ("created", "created, id, run_id"),
+                              ("id", "id"), ("name", "name"), ("source_ref", "source_ref"),
+                              ("target_ref", "target_ref")):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_stix_objects_{name} ON stix_objects ({columns})")
+        self._conn.commit()
+
+    @staticmethod
+    def _row(obj, run_id: str) -> Tuple:
+        return (
+            obj["id"],
+            obj["type"],
+            run_id,
+            _timestamp(obj.get("created")),
+            _timestamp(obj.get("modified")),
+            obj.get("name"),
+            obj.get("relationship_type"),
+            obj.get("source_ref"),
+            obj.get("target_ref"),
+            dumps(obj).decode("utf-8"),
+        )
+
+    def save_run(self, stix_objects: Iterable[Any], relationships: Iterable[Any] = (),
+                 params: Optional[Dict[str, Any]] = None, story: str = "",
+                 evaluation: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Store a run's objects and relationships (stix2 objects or StixRecords) in one
+        transaction; returns the new run id.
+        """
+        run_id = str(uuid.uuid4())
+        objects = [self._row(obj, run_id) for obj in stix_objects]
+        relationship_rows = [self._row(relationship, run_id) for relationship in relationships]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO dataset_runs (id, params, story, evaluation, object_count, relationship_count, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, json.dumps(params or {}), story or "", json.dumps(evaluation) if evaluation else None,
+                 len(objects), len(relationship_rows), time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO stix_objects (id, type, run_id, created, modified, name, relationship_type, "
+                "source_ref, target_ref, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                objects + relationship_rows
+            )
+            self._conn.commit()
+        logger.info(f"Stored dataset run {run_id}: {len(objects)} objects, {len(relationship_rows)} relationships")
+        return run_id
+
+    def _page(self, query: Optional[DatasetQuery], after: Optional[Sequence[Any]], limit: int) -> List[Tuple]:
+        """
+        Up to `limit` matching (created, id, run_id, payload) rows following the `after`
+        position. Pages continue after a position rather than by offset, so each page is an
+        index seek however deep it is. Every SDO and relationship has a created timestamp.
+        """
+        where, params = (query or DatasetQuery()).where()
+        if after is not None:
+            where += (" AND " if where else " WHERE ") + "(created, id, run_id) > (?, ?, ?)"
+            params += list(after)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT created, id, run_id, payload FROM stix_objects{where} "
+                "ORDER BY created, id, run_id LIMIT ?", (*params, limit)
+            ).fetchall()
+
+    def query(self, query: Optional[DatasetQuery] = None, cursor: Optional[str] = None,
+              limit: int = 500) -> Tuple[List[str], Optional[str]]:
+        """
+        Return the JSON payloads of matching objects, ordered by created timestamp, id and run,
+        and the cursor of the next page (None on the last page). Raises ValueError for a
+        malformed cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        limit = min(limit, MAX_PAGE_SIZE)
+        rows = self._page(query, after, limit)
+        next_cursor = encode_cursor(rows[-1][:3]) if len(rows) == limit else None
+        return [row[3] for row in rows], next_cursor
+
+    def iter_payloads(self, query: Optional[DatasetQuery] = None, page_size: int = 1000) -> Iterator[bytes]:
+        """
+        Yield every matching payload as JSON bytes, `page_size` rows at a time.
+        """
+        after = None
+        while True:
+            rows = self._page(query, after, page_size)
+            for row in rows:
+                yield row[3].encode("utf-8")
+            if len(rows) < page_size:
+                return
+            after = rows[-1][:3]
+
+    def get(self, stix_id: str, run_id: Optional[str] = None) -> Optional[str]:
+        """
+        The payload stored for `stix_id` by `run_id`, or by the latest run that stored it.
+        """
+        with self._lock:
+            if run_id:
+                row = self._conn.execute("SELECT payload FROM stix_objects WHERE run_id = ? AND id = ?",
+                                         (run_id, stix_id)).fetchone()
+            else:
+                row = self._conn.execute("SELECT payload FROM stix_objects WHERE id = ? ORDER BY rowid DESC LIMIT 1",
+                                         (stix_id,)).fetchone()
+        return row[0] if row else None
+
+    def _run_dict(self, row) -> Dict[str, Any]:
+        return {
+            "run_id": row[0],
+            "params": json.loads(row[1]),
+            "story": row[2],
+            "evaluation": json.loads(row[3]) if row[3] else None,
+            "objects": row[4],
+            "relationships": row[5],
+            "created": row[6],
+        }
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, params, story, evaluation, object_count, relationship_count, created "
+                "FROM dataset_runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        return self._run_dict(row) if row else None
+
+    def runs(self, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Stored runs, newest first, without their stories.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, params, '', evaluation, object_count, relationship_count, created "
+                "FROM dataset_runs ORDER BY created DESC LIMIT ? OFFSET ?", (min(limit, MAX_PAGE_SIZE), offset)
+            ).fetchall()
+        runs = [self._run_dict(row) for row in rows]
+        for run in runs:
+            del run["story"]
+        return runs
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = self._conn.execute("SELECT type, COUNT(*) FROM stix_objects GROUP BY type").fetchall()
+            (runs,) = self._conn.execute("SELECT COUNT(*) FROM dataset_runs").fetchone()
+        return {"runs": runs, "objects_by_type": dict(counts), "path": self.path}
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> Optional[DatasetStore]:
+    """
+    Return the process-wide store configured from the environment, or None when disabled.
+    """
+    global _default_store
+    if DATASET_PATH.lower() in ("", "off", "none"):
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DatasetStore(DATASET_PATH)
+        return _default_store
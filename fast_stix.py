@@ -0,0 +1,248 @@
+import functools
+import logging
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import stix2
+from stix2 import properties
+from stix2.base import _STIXBase
+from stix2.utils import format_datetime, get_timestamp, parse_into_datetime
+
+from StixObjectLang import seeding
+from stix_bundler import dumps
+
+logger = logging.getLogger(__name__)
+
+# "stix2" builds full stix2 objects; "fast" builds StixRecord dicts with the same serialization
+OBJECT_MODES = ("stix2", "fast")
+OBJECT_MODE = os.getenv("STIX_GEN_OBJECTS", "stix2")
+# How fast records are checked against stix2: every record inline ("full"), a random sample
+# inline ("sample"), in a separate process-pool pass ("deferred", see validate_records) or not at all
+VALIDATION_MODES = ("full", "sample", "deferred", "none")
+VALIDATION_MODE = os.getenv("STIX_GEN_VALIDATION", "sample")
+VALIDATION_SAMPLE_RATE = float(os.getenv("STIX_GEN_VALIDATION_SAMPLE", "0.05"))
+
+
+class StixRecord(dict):
+    """
+    A STIX object as a plain dict in stix2's property order, with attribute access so code
+    written against stix2 objects (`obj.id`, `getattr(obj, 'name', None)`) keeps working.
+
+    Values are stored exactly as stix2 serializes them (timestamps as STIX strings, embedded
+    objects as dicts), so `dumps(record)` matches `dumps(stix2_object)` byte for byte.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def serialize(self, pretty=False):
+        return dumps(self, pretty=pretty).decode("utf-8")
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            # Let stix2 parse the formats fromisoformat does not accept
+            return value
+    return value
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_timestamp(value, precision, constraint) -> str:
+    # Objects built in one run mostly share a timestamp (seeded runs always do), so most
+    # conversions are cache hits instead of a parse and a format
+    return format_datetime(parse_into_datetime(_to_datetime(value), precision, constraint))
+
+
+def _embedded(value):
+    if isinstance(value, _STIXBase):
+        return {key: item for key, item in value._inner.items() if key not in value._defaulted_optional_properties}
+    return value
+
+
+def _boolean(prop):
+    def convert(value):
+        return value if isinstance(value, bool) else prop.clean(value, False)[0]
+    return convert
+
+
+def _converter(prop) -> Optional[Callable[[Any], Any]]:
+    """
+    Return the value conversion stix2 would apply for `prop`, without its validation,
+    or None when values are stored unchanged.
+    """
+    if isinstance(prop, properties.TimestampProperty):
+        precision, constraint = prop.precision, prop.precision_constraint
+        return lambda value: _format_timestamp(value, precision, constraint)
+    if isinstance(prop, (properties.StringProperty, properties.ReferenceProperty, properties.IDProperty)):
+        return lambda value: value if isinstance(value, str) else str(value)
+    if isinstance(prop, properties.BooleanProperty):
+        return _boolean(prop)
+    if isinstance(prop, properties.IntegerProperty):
+        return int
+    if isinstance(prop, properties.FloatProperty):
+        return float
+    if isinstance(prop, properties.ListProperty):
+        contained = prop.contained
+        if isinstance(contained, type) or isinstance(contained, properties.EmbeddedObjectProperty):
+            return lambda value: [_embedded(item) for item in value]
+        item_converter = _converter(contained)
+        if item_converter is None:
+            return list
+        return lambda value: [item_converter(item) for item in value]
+    if isinstance(prop, properties.EmbeddedObjectProperty):
+        return _embedded
+    return None
+
+
+class _TypeSpec:
+    """
+    Per-class build plan derived once from a stix2 class's property definitions.
+    """
+
+    def __init__(self, stix_class):
+        self.stix_class = stix_class
+        self.stix_type = stix_class._type
+        self.order = list(stix_class._properties)
+        self.names = set(self.order)
+        self.converters = {name: _converter(prop) for name, prop in stix_class._properties.items()}
+        self.required = {name for name, prop in stix_class._properties.items() if prop.required}
+        # Optional properties equal to their default are left out of stix2's serialization
+        self.omitted_defaults = {
+            name: prop.default() for name, prop in stix_class._properties.items()
+            if not prop.required and not hasattr(prop, "_fixed_value") and hasattr(prop, "default")
+        }
+        self.timestamp_defaults = [
+            name for name, prop in stix_class._properties.items()
+            if isinstance(prop, properties.TimestampProperty) and hasattr(prop, "default")
+        ]
+
+
+_specs: Dict[type, _TypeSpec] = {}
+_specs_lock = threading.Lock()
+
+
+def _spec_for(stix_class) -> _TypeSpec:
+    spec = _specs.get(stix_class)
+    if spec is None:
+        with _specs_lock:
+            spec = _specs.setdefault(stix_class, _TypeSpec(stix_class))
+    return spec
+
+
+def build(stix_class, **kwargs) -> StixRecord:
+    """
+    Build the StixRecord stix2 would serialize for `stix_class(**kwargs)`, skipping stix2's
+    property validation, object constraints and immutability machinery.
+
+    Only value conversions are applied (timestamp precision, str/int/float coercion,
+    embedded objects to dicts). Unknown and missing required properties still raise
+    ValueError; everything else is left to `validate`.
+    """
+    spec = _spec_for(stix_class)
+    unknown = kwargs.keys() - spec.names
+    if unknown:
+        raise ValueError(f"Unexpected properties for {spec.stix_type}: {', '.join(sorted(unknown))}")
+
+    values = {name: value for name, value in kwargs.items() if value is not None and value != []}
+    values.setdefault("type", spec.stix_type)
+    values.setdefault("spec_version", "2.1")
+    if "id" not in values:
+        values["id"] = seeding.new_id(spec.stix_type)
+    if spec.timestamp_defaults and not all(name in values for name in spec.timestamp_defaults):
+        # stix2 uses one timestamp for every defaulted datetime of an object
+        now = get_timestamp() if seeding.current_run() is None else seeding.utcnow()
+        for name in spec.timestamp_defaults:
+            values.setdefault(name, now)
+    if spec.stix_type == "indicator" and values.get("pattern_type") == "stix":
+        values.setdefault("pattern_version", "2.1")
+
+    missing = spec.required - values.keys()
+    if missing:
+        raise ValueError(f"Missing required properties for {spec.stix_type}: {', '.join(sorted(missing))}")
+
+    record = StixRecord()
+    for name in spec.order:
+        if name not in values:
+            continue
+        value = values[name]
+        converter = spec.converters[name]
+        if converter is not None:
+            value = converter(value)
+        if name in spec.omitted_defaults and value == spec.omitted_defaults[name]:
+            continue
+        record[name] = value
+
+    if VALIDATION_MODE == "full" or (VALIDATION_MODE == "sample" and _sampled()):
+        validate(record)
+    return record
+
+
+def _sampled() -> bool:
+    # Its own stream, so sampling follows the seed without shifting the values objects draw
+    with seeding.stream("validation"):
+        return seeding.rng.random() < VALIDATION_SAMPLE_RATE
+
+
+def validate(record) -> None:
+    """
+    Parse `record` with stix2 and check it serializes to the same bytes; raises on any difference.
+    """
+    parsed = stix2.parse(dict(record), allow_custom=False)
+    if dumps(parsed) != dumps(record):
+        raise ValueError(f"{record.get('id')} does not match its stix2 serialization")
+
+
+def _validate_chunk(records: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    errors = []
+    for record in records:
+        try:
+            validate(record)
+        except Exception as e:
+            errors.append((record.get("id"), str(e)))
+    return errors
+
+
+def validate_records(records: Iterable[Dict[str, Any]], workers: Optional[int] = None,
+                     chunk_size: int = 500) -> List[Tuple[str, str]]:
+    """
+    Validate records in a separate pass; returns (id, error) for each failure.
+
+    Chunks run on generation_scheduler's shared process pool, unless `workers` is 1 or there
+    is only one chunk, in which case they are checked inline.
+    """
+    # Imported here: generation_scheduler builds on this module
+    import generation_scheduler
+
+    records = [dict(record) for record in records]
+    chunks = [records[start:start + chunk_size] for start in range(0, len(records), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        errors = [error for chunk in chunks for error in _validate_chunk(chunk)]
+    else:
+        executor = generation_scheduler.get_process_pool()
+        try:
+            errors = [error for chunk_errors in executor.map(_validate_chunk, chunks) for error in chunk_errors]
+        except BrokenProcessPool:
+            generation_scheduler._discard_process_pool(executor)
+            raise
+    if errors:
+        logger.warning(f"{len(errors)} of {len(records)} records failed deferred validation")
+    return errors
+
+
+def build_object(stix_class, **kwargs):
+    """
+    Build a STIX object in the configured STIX_GEN_OBJECTS mode: a stix2 object, or a StixRecord.
+    """
+    if OBJECT_MODE == "fast":
+        return build(stix_class, **kwargs)
+    return stix_class(**kwargs)
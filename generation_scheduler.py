@@ -0,0 +1,245 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+import stix_object_builder as builder
+from fast_stix import StixRecord
+from object_pool import ObjectPool
+from stix_bundler import dumps
+from StixObjectLang import cancellation, metrics, registry, seeding
+
+logger = logging.getLogger(__name__)
+
+# "threads" builds every type's objects in this process; "processes" shards the CPU-bound
+# (faker backend) create_* work of large requests over a pool of worker processes
+EXECUTION_MODES = ("threads", "processes")
+EXECUTION_MODE = os.getenv("STIX_GEN_EXECUTION", "threads")
+PROCESS_WORKERS = int(os.getenv("STIX_GEN_PROCESS_WORKERS", "0")) or os.cpu_count() or 1
+# Objects per shard. Fixed rather than derived from the worker count, so a seeded run
+# generates the same objects on any machine.
+SHARD_SIZE = int(os.getenv("STIX_GEN_SHARD_SIZE", "500"))
+
+# Phase-one types only need a count; phase-two types also reference phase-one objects
+PHASE_ONE_CREATORS = {
+    "threat-actor": builder.create_threat_actors,
+    "identity": builder.create_identities,
+    "malware": builder.create_malwares,
+    "indicator": builder.create_indicators,
+    "tool": builder.create_tools,
+    "campaign": builder.create_campaigns,
+    "intrusion-set": builder.create_intrusion_sets,
+    "infrastructure": builder.create_infrastructures,
+    "location": builder.create_locations,
+}
+PHASE_TWO_CREATORS = {
+    "attack-pattern": builder.create_attack_patterns,
+    "vulnerability": builder.create_vulnerabilities,
+    "course-of-action": builder.create_course_of_actions,
+    "malware-analysis": builder.create_malware_analysis,
+    "observed-data": builder.create_observed_datas,
+    "note": builder.create_notes,
+    "report": builder.create_reports,
+    "grouping": builder.create_groupings,
+    "opinion": builder.create_opinions,
+}
+OBJECT_TYPES = list(PHASE_ONE_CREATORS) + list(PHASE_TWO_CREATORS)
+
+# Phase-one types each phase-two type draws references from. A phase-two type starts as soon
+# as the requested types it references are done; types that reference nothing start right away.
+PHASE_TWO_REFERENCES = {
+    "attack-pattern": (),
+    "vulnerability": ("identity",),
+    "course-of-action": (),
+    "malware-analysis": (),
+    "observed-data": (),
+    "note": ("malware", "indicator", "threat-actor", "tool", "intrusion-set"),
+    "report": ("threat-actor", "campaign", "malware", "tool"),
+    "grouping": ("threat-actor", "campaign", "malware", "tool"),
+    "opinion": ("threat-actor", "campaign", "malware", "tool"),
+}
+# Types whose object_refs must not be empty: when none of their preferred types was requested
+# they wait for, and reference, every requested phase-one type instead
+REQUIRES_REFERENCES = {"note", "report", "grouping", "opinion"}
+
+
+def _create(object_type: str, count: int, backend: Optional[str], pool: Optional[ObjectPool]) -> List:
+    if object_type in PHASE_TWO_CREATORS:
+        return PHASE_TWO_CREATORS[object_type](count, pool, backend=backend)
+    return PHASE_ONE_CREATORS[object_type](count, backend=backend)
+
+
+def create_objects(object_type: str, count: int, backend: Optional[str] = None,
+                   phase_1_objects=None) -> List:
+    """
+    Create `count` objects of `object_type`; phase-two types reference `phase_1_objects`
+    (a list or an ObjectPool).
+
+    In the "processes" execution mode, faker-backed requests larger than SHARD_SIZE are
+    built on the process pool and returned as StixRecords (see create_objects_sharded).
+    """
+    pool = None
+    if object_type in PHASE_TWO_CREATORS:
+        pool = ObjectPool.of(phase_1_objects)
+        if object_type in REQUIRES_REFERENCES and not len(pool):
+            # Fail before spending any generation calls
+            raise ValueError(f"{object_type} objects need phase-one objects to reference; "
+                             "generate at least one phase-one type")
+    if (EXECUTION_MODE == "processes" and count > SHARD_SIZE
+            and registry.resolve_backend(object_type, backend) == "faker"):
+        objects = create_objects_sharded(object_type, count, backend, pool)
+    else:
+        # Each type draws from its own seeded stream, so thread timing cannot change the output
+        with seeding.stream(f"objects/{object_type}"):
+            objects = _create(object_type, count, backend, pool)
+    logger.debug(f"Created {len(objects)} {object_type} objects")
+    return objects
+
+
+def _create_shard(object_type: str, count: int, backend: Optional[str], pool: Optional[ObjectPool],
+                  seed, now: Optional[datetime], shard: int) -> bytes:
+    """
+    Process-pool entry point: build one shard and return it as compact JSON.
+    """
+    with seeding.run(seed, now), seeding.stream(f"objects/{object_type}/{shard}"):
+        return dumps(_create(object_type, count, backend, pool))
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the process-wide worker pool, started on first use and shared by every request.
+
+    Uses the spawn start method so it is safe to start from a threaded server.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def _discard_process_pool(executor: ProcessPoolExecutor) -> None:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is executor:
+            _process_pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_objects_sharded(object_type: str, count: int, backend: Optional[str] = None,
+                           pool: Optional[ObjectPool] = None) -> List[StixRecord]:
+    """
+    Build `count` objects in SHARD_SIZE shards on the process pool and merge them in shard
+    order. Each shard runs the regular create_* function (stix2 construction and validation
+    included) and sends its objects back as JSON, which is loaded into StixRecords here.
+
+    Shards draw from their own seeded streams, so a seeded run is reproducible whatever
+    the number of workers. Phase-two shards receive a copy of the reference pool reduced to
+    ids and types, which is all reference sampling reads.
+    """
+    if pool is not None:
+        pool = pool.ids_only()
+    seeded = seeding.current_run()
+    seed, now = (seeded.seed, seeded.now) if seeded is not None else (None, None)
+    sizes = [min(SHARD_SIZE, count - start) for start in range(0, count, SHARD_SIZE)]
+
+    executor = get_process_pool()
+    futures = [executor.submit(_create_shard, object_type, size, backend, pool, seed, now, shard)
+               for shard, size in enumerate(sizes)]
+    objects = []
+    try:
+        with metrics.stage("create", object_type):
+            for future in futures:
+                while True:
+                    cancellation.check()
+                    done, _ = wait([future], timeout=0.5)
+                    if done:
+                        break
+                objects.extend(StixRecord(record) for record in orjson.loads(future.result()))
+    except BrokenProcessPool:
+        # A worker died (killed, out of memory); start a fresh pool for the next request
+        _discard_process_pool(executor)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+    # Counted here: the workers' own metrics stay in their processes
+    metrics.record_objects(object_type, "faker", len(objects))
+    logger.info(f"Built {len(objects)} {object_type} objects in {len(sizes)} shards on "
+                f"{PROCESS_WORKERS} worker processes")
+    return objects
+
+
+def dependencies(object_type: str, requested) -> Tuple[str, ...]:
+    """
+    Return the requested phase-one types `object_type` has to wait for.
+    """
+    if object_type not in PHASE_TWO_REFERENCES:
+        return ()
+    depends_on = tuple(t for t in PHASE_TWO_REFERENCES[object_type] if t in requested)
+    if not depends_on and object_type in REQUIRES_REFERENCES:
+        depends_on = tuple(t for t in PHASE_ONE_CREATORS if t in requested)
+    return depends_on
+
+
+def iter_scheduled_objects(counts: Dict[str, int], backends: Optional[Dict[str, Optional[str]]] = None,
+                           max_workers: Optional[int] = None) -> Iterator[Tuple[str, List, Optional[Exception]]]:
+    """
+    Generate objects for {object type: count}, yielding (object_type, objects, error) for each
+    type as soon as it finishes.
+
+    All phase-one types start at once. Each phase-two type starts the moment the phase-one
+    types it references have finished (successfully or not) and is given their objects, so it
+    never waits on unrelated types.
+    """
+    requested = {object_type: count for object_type, count in counts.items() if count > 0}
+    unknown = requested.keys() - set(OBJECT_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown object types: {', '.join(sorted(unknown))}")
+    if not requested:
+        return
+    backends = backends or {}
+    waiting = {object_type: dependencies(object_type, requested) for object_type in requested}
+    finished: Dict[str, List] = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(requested), os.cpu_count() or 1)) as executor:
+        def start_ready():
+            for object_type, depends_on in list(waiting.items()):
+                if all(t in finished for t in depends_on):
+                    del waiting[object_type]
+                    # Indexed once per phase-two type and shared by all of its objects
+                    references = ObjectPool(obj for t in depends_on for obj in finished[t])
+                    future = cancellation.submit(executor, create_objects, object_type, requested[object_type],
+                                                 backends.get(object_type), references)
+                    running[future] = object_type
+
+        start_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            results = []
+            for future in done:
+                object_type = running.pop(future)
+                try:
+                    objects, error = future.result(), None
+                except cancellation.Cancelled:
+                    raise
+                except Exception as exc:
+                    logger.error(f'{object_type} generated an exception: {exc}')
+                    objects, error = [], exc
+                finished[object_type] = objects
+                results.append((object_type, objects, error))
+            # Start dependants before handing results to a possibly slow consumer
+            start_ready()
+            yield from results
@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from StixObjectLang import cancellation
+from stix_bundler import dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "jobs.sqlite3")
+JOB_DB_PATH = os.getenv("STIX_JOB_DB", DEFAULT_JOB_DB_PATH)
+# Graph generation jobs run concurrently; each one still bounds its own LLM concurrency
+JOB_WORKERS = int(os.getenv("STIX_JOB_WORKERS", "2"))
+# Buffered result rows are written at least this often while a job runs
+FLUSH_INTERVAL_SECONDS = 0.5
+
+STAGES = ("objects", "relationships", "story", "evaluation")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+def new_progress() -> Dict[str, Dict[str, Any]]:
+    return {stage: {"status": "pending", "count": 0} for stage in STAGES}
+
+
+class JobStore:
+    """
+    SQLite persistence for graph generation jobs.
+
+    `jobs` holds one row per job with its status, current stage, per-stage progress, story
+    and evaluation; `job_items` holds the objects and relationships produced so far, in
+    order, so partial results can be paged while the job is still running.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                params TEXT NOT NULL,
+                progress TEXT NOT NULL,
+                story TEXT NOT NULL DEFAULT '',
+                evaluation TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            )
+        """)
+        self._conn.commit()
+
+    def create(self, params: Dict[str, Any]) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, params, progress, created, updated) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(params), json.dumps(new_progress()), now, now)
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields) -> None:
+        """
+        Set columns on a job; dict values (progress, evaluation) are stored as JSON.
+        """
+        fields = {key: json.dumps(value) if isinstance(value, dict) else value for key, value in fields.items()}
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def append_items(self, job_id: str, first_seq: int, items: List[Tuple[str, str]], **fields) -> None:
+        """
+        Append (kind, payload) result rows numbered from `first_seq` and update the job in one transaction.
+        """
+        fields = {key: json.dumps(value) if isinstance(value, dict) else value for key, value in fields.items()}
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, seq, kind, payload) VALUES (?, ?, ?, ?)",
+                [(job_id, first_seq + offset, kind, payload) for offset, (kind, payload) in enumerate(items)]
+            )
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, stage, params, progress, story, evaluation, error, created, updated "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "stage": row[2],
+            "params": json.loads(row[3]),
+            "progress": json.loads(row[4]),
+            "story": row[5],
+            "evaluation": json.loads(row[6]) if row[6] else None,
+            "error": row[7],
+            "created": row[8],
+            "updated": row[9],
+        }
+
+    def items(self, job_id: str, offset: int = 0, limit: int = 500,
+              kind: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        Return (kind, payload) rows in production order; payloads are JSON text.
+        """
+        query = "SELECT kind, payload FROM job_items WHERE job_id = ?"
+        params: List[Any] = [job_id]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY seq LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return rows
+
+    def iter_payloads(self, job_id: str, page_size: int = 1000) -> Iterator[bytes]:
+        """
+        Yield every stored payload of a job as JSON bytes, reading `page_size` rows at a time
+        so exporting a job never loads all of its results at once.
+        """
+        next_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, payload FROM job_items WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                    (job_id, next_seq, page_size)
+                ).fetchall()
+            for _, payload in rows:
+                yield payload.encode("utf-8")
+            if len(rows) < page_size:
+                return
+            next_seq = rows[-1][0] + 1
+
+    def fail_unfinished(self) -> int:
+        """
+        Mark jobs left queued or running by a previous process as failed; returns how many.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by a server restart', updated = ? "
+                "WHERE status IN ('queued', 'running')", (time.time(),)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class JobManager:
+    """
+    Runs graph generation jobs on a local worker pool and records their progress in a JobStore.
+
+    `pipeline(params)` must yield (event, payload) pairs in the shape produced by
+    app.iter_graph_events. Per-stage progress counts objects and relationships produced,
+    and characters for the story. Cancelling a job sets its event; the pipeline runs inside that
+    cancellation scope, so no further LLM request is started once it is set.
+    """
+
+    def __init__(self, pipeline: Callable[[Dict[str, Any]], Iterator[Tuple[str, Any]]],
+                 store: Optional[JobStore] = None, max_workers: int = JOB_WORKERS):
+        self.pipeline = pipeline
+        self.store = store or JobStore()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="stix-job")
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+        interrupted = self.store.fail_unfinished()
+        if interrupted:
+            logger.warning(f"Marked {interrupted} unfinished jobs from a previous run as failed")
+
+    def submit(self, params: Dict[str, Any]) -> str:
+        job_id = self.store.create(params)
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id, params)
+        logger.info(f"Queued graph generation job {job_id}")
+        return job_id
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Request cancellation; returns the job as it stands, or None if it does not exist.
+        """
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        if job["status"] == "queued":
+            # Not started yet: the worker sees the event and skips it
+            self.store.update(job_id, status="cancelled")
+        return self.store.get(job_id)
+
+    def _run(self, job_id: str, params: Dict[str, Any]) -> None:
+        with self._lock:
+            event = self._cancel_events[job_id]
+        try:
+            if event.is_set():
+                return
+            with cancellation.scope(event):
+                self._execute(job_id, params, event)
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+
+    def _execute(self, job_id: str, params: Dict[str, Any], event: threading.Event) -> None:
+        progress = new_progress()
+        story = []
+        pending: List[Tuple[str, str]] = []
+        state = {"seq": 0, "flushed": time.monotonic(), "stage": None}
+        self.store.update(job_id, status="running")
+
+        def flush(**fields):
+            fields.update(progress=progress, story="".join(story))
+            if state["stage"] is not None:
+                fields["stage"] = state["stage"]
+            self.store.append_items(job_id, state["seq"], pending, **fields)
+            state["seq"] += len(pending)
+            pending.clear()
+            state["flushed"] = time.monotonic()
+
+        events = self.pipeline(params)
+        try:
+            for event_name, payload in events:
+                if event.is_set():
+                    raise cancellation.Cancelled("Generation was cancelled")
+                if event_name == "stage":
+                    if state["stage"] is not None:
+                        progress[state["stage"]]["status"] = "completed"
+                    state["stage"] = payload["stage"]
+                    progress[state["stage"]]["status"] = "running"
+                    flush()
+                elif event_name in ("object", "relationship"):
+                    pending.append((event_name, dumps(payload).decode()))
+                    progress[state["stage"]]["count"] += 1
+                elif event_name == "story":
+                    story.append(payload["delta"])
+                    progress["story"]["count"] += len(payload["delta"])
+                elif event_name == "evaluation":
+                    progress["evaluation"]["count"] = 1
+                    flush(evaluation=payload)
+                elif event_name == "error":
+                    progress[state["stage"]].setdefault("errors", []).append(payload)
+
+                if time.monotonic() - state["flushed"] >= FLUSH_INTERVAL_SECONDS:
+                    flush()
+
+            if state["stage"] is not None:
+                progress[state["stage"]]["status"] = "completed"
+            flush(status="completed")
+            logger.info(f"Graph generation job {job_id} completed")
+        except cancellation.Cancelled:
+            if state["stage"] is not None:
+                progress[state["stage"]]["status"] = "cancelled"
+            flush(status="cancelled")
+            logger.info(f"Graph generation job {job_id} cancelled")
+        except Exception as e:
+            logger.error(f"Graph generation job {job_id} failed: {e}")
+            if state["stage"] is not None:
+                progress[state["stage"]]["status"] = "failed"
+            flush(status="failed", error=str(e))
+        finally:
+            # Closing the pipeline early lets it cancel work it has queued but not started
+            close = getattr(events, "close", None)
+            if close is not None:
+                close()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            for event in self._cancel_events.values():
+                event.set()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,417 @@
+"""
+Local stand-in for the OpenAI chat-completions API, for load and latency testing without
+network access or API spend.
+
+It answers the requests the ChatOpenAI clients in this repo send:
+
+    function calls   StixObjectLang generators (one record per run): a record of the schema
+                     named in the function, filled from the offline Faker factories
+    batch prompts    StixObjectLang batch generation: a JSON array of `size` records
+    relationships    single-pair and batched pair classification, picking from each pair's
+                     valid relationships
+    story            a few paragraphs built from the listed relationships (streamed or not)
+    evaluation       a {"score", "justification"} object
+
+Latency, server errors and 429s are injected per request, and /mock/stats counts what was
+served, so throughput and client retry behaviour can be measured offline.
+
+Usage:
+    python mock_llm_server.py --port 8001 --latency-ms 300 --jitter-ms 100 --error-rate 0.02 --rpm 600
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock python app.py
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+from StixObjectLang import offline, registry
+
+logger = logging.getLogger(__name__)
+
+MODELS = ("gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo")
+# Rough chars per token, used for the usage block and per-token latency
+CHARS_PER_TOKEN = 4
+
+
+class MockConfig:
+    """
+    Fault and latency settings; every field can be changed at runtime with POST /mock/config.
+
+    Args:
+        latency_ms (float): Base delay before a response starts.
+        jitter_ms (float): Standard deviation of the delay, drawn from a normal distribution.
+        per_token_ms (float): Extra delay per completion token (spread over chunks when streaming).
+        error_rate (float): Fraction of requests answered with a 500 server error.
+        rate_limit_rate (float): Fraction of requests answered with a 429 regardless of load.
+        rpm (int): Requests per minute accepted before answering 429; 0 disables the limit.
+        retry_after (float): Seconds sent in the Retry-After header of a 429.
+        no_relationship_rate (float): Fraction of pairs classified as NO_RELATIONSHIP.
+        seed (Optional[int]): Seed for the fault and latency draws.
+    """
+    FIELDS = ("latency_ms", "jitter_ms", "per_token_ms", "error_rate", "rate_limit_rate", "rpm",
+              "retry_after", "no_relationship_rate", "seed")
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, per_token_ms: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, rpm: int = 0,
+                 retry_after: float = 1.0, no_relationship_rate: float = 0.1, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_token_ms = per_token_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.no_relationship_rate = no_relationship_rate
+        self.seed = seed
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        """
+        Read MOCK_LLM_<FIELD> variables, e.g. MOCK_LLM_LATENCY_MS=250.
+        """
+        values = {}
+        for field in cls.FIELDS:
+            value = os.getenv(f"MOCK_LLM_{field.upper()}")
+            if value is not None:
+                values[field] = int(value) if field in ("rpm", "seed") else float(value)
+        return cls(**values)
+
+    def update(self, values: Dict[str, Any]) -> None:
+        unknown = set(values) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown mock settings: {', '.join(sorted(unknown))}")
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _fill_schema(schema: Dict[str, Any], definitions: Dict[str, Any]) -> Any:
+    """
+    Minimal value for a JSON schema of an unknown type: required fields and defaults only.
+    """
+    if "$ref" in schema:
+        schema = definitions[schema["$ref"].rsplit("/", 1)[1]]
+    if "allOf" in schema:
+        return _fill_schema(schema["allOf"][0], definitions)
+    if "default" in schema:
+        return schema["default"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    field_type = schema.get("type")
+    if field_type == "object" or "properties" in schema:
+        return {name: _fill_schema(prop, definitions) for name, prop in schema.get("properties", {}).items()
+                if name in schema.get("required", []) or "default" in prop}
+    return {"array": [], "integer": 0, "number": 0.0, "boolean": False}.get(field_type, "synthetic")
+
+
+def _schema_stix_type(schema: Dict[str, Any]) -> Optional[str]:
+    """
+    Find the STIX type a function schema generates: the default of its `type` property.
+    """
+    definitions = list(schema.get("definitions", {}).values())
+    for candidate in [schema] + definitions + list(schema.get("properties", {}).values()):
+        default = candidate.get("properties", {}).get("type", {}).get("default")
+        if default in registry.GENERATOR_MODULES:
+            return default
+    return None
+
+
+def synthetic_record(stix_type: str) -> Dict[str, Any]:
+    """
+    One JSON-ready record of `stix_type` that validates against its StixObjectLang schema.
+    """
+    record = offline.generate(stix_type, 1)[0]
+    return json.loads(record.json())
+
+
+class MockLLM:
+    """
+    Builds responses and decides on injected faults; shared by every request of a server.
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None):
+        self.config = config or MockConfig()
+        self.stats: Counter = Counter()
+        self._random = random.Random(self.config.seed)
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+            self._recent.clear()
+            self._random = random.Random(self.config.seed)
+
+    def fault(self) -> Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        """
+        Return (status, body, headers) for an injected failure, or None to serve the request.
+        """
+        config = self.config
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            limited = (config.rpm and len(self._recent) >= config.rpm) or self._random.random() < config.rate_limit_rate
+            failed = not limited and self._random.random() < config.error_rate
+            if not limited:
+                self._recent.append(now)
+        if limited:
+            self.count("rate_limited")
+            return 429, {"error": {"message": "Rate limit reached for requests (mock)", "type": "requests",
+                                   "param": None, "code": "rate_limit_exceeded"}}, \
+                {"Retry-After": str(config.retry_after)}
+        if failed:
+            self.count("server_errors")
+            return 500, {"error": {"message": "The server had an error while processing your request (mock)",
+                                   "type": "server_error", "param": None, "code": None}}, {}
+        return None
+
+    def delay(self, completion_tokens: int) -> float:
+        config = self.config
+        with self._lock:
+            jitter = self._random.gauss(0, config.jitter_ms) if config.jitter_ms else 0.0
+        return max(0.0, config.latency_ms + jitter + config.per_token_ms * completion_tokens) / 1000
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def complete(self, body: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Return (kind, message) answering a chat-completions request body.
+        """
+        functions = body.get("functions") or [tool["function"] for tool in body.get("tools", [])
+                                              if tool.get("type") == "function"]
+        if functions:
+            function = functions[0]
+            parameters = function.get("parameters", {})
+            stix_type = _schema_stix_type(parameters)
+            if stix_type is not None:
+                arguments = {"output": synthetic_record(stix_type)} \
+                    if "output" in parameters.get("properties", {}) else synthetic_record(stix_type)
+            else:
+                arguments = _fill_schema(parameters, parameters.get("definitions", {}))
+            call = {"name": function["name"], "arguments": json.dumps(arguments)}
+            if body.get("tools"):
+                return "function_call", {"role": "assistant", "content": None, "tool_calls": [
+                    {"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": call}]}
+            return "function_call", {"role": "assistant", "content": None, "function_call": call}
+
+        kind, content = self.answer_prompt(_prompt_text(body.get("messages", [])))
+        return kind, {"role": "assistant", "content": content}
+
+    def answer_prompt(self, text: str) -> Tuple[str, str]:
+        batch = re.search(r"Return a JSON array containing exactly (\d+) distinct", text)
+        if batch:
+            stix_type = re.search(r"^- type \(string, \w+\).*\[default: ([a-z-]+)\]$", text, re.MULTILINE)
+            if stix_type and stix_type.group(1) in registry.GENERATOR_MODULES:
+                records = [synthetic_record(stix_type.group(1)) for _ in range(int(batch.group(1)))]
+                return "batch_records", json.dumps(records)
+
+        pairs = re.search(r"for that pair:\n\n(\[.*\])\n\nTask, for every pair", text, re.DOTALL)
+        if pairs:
+            decisions = [dict(self._classify(pair["valid_relationships"]), pair_id=pair["pair_id"])
+                         for pair in json.loads(pairs.group(1))]
+            return "relationship_batch", json.dumps(decisions)
+
+        valid = re.search(r"^- Valid relationship types: (.*)$", text, re.MULTILINE)
+        if valid:
+            return "relationship", json.dumps(self._classify([r.strip() for r in valid.group(1).split(",")]))
+
+        if '"score": your_score_here' in text:
+            with self._lock:
+                score = self._random.randint(5, 9)
+            return "evaluation", json.dumps({"score": score, "justification": "Mock evaluation: the relationships "
+                                             "are consistent with their object types and the story covers them."})
+
+        story = re.search(r"STIX relationships between those aliases:\n\n(.*?)\n\nProvide a brief analysis",
+                          text, re.DOTALL)
+        if story:
+            return "story", _story(story.group(1).splitlines())
+        return "other", "This is a mock response."
+
+    def _classify(self, valid_relationships: List[str]) -> Dict[str, str]:
+        with self._lock:
+            if not valid_relationships or self._random.random() < self.config.no_relationship_rate:
+                return {"relationship_type": "NO_RELATIONSHIP", "justification": "Mock: no plausible link."}
+            choice = self._random.choice(valid_relationships)
+        return {"relationship_type": choice, "justification": f"Mock: '{choice}' fits these object types."}
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+def _story(lines: List[str]) -> str:
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return "No relationships were provided, so there is no story to tell."
+    paragraphs = [f"The activity centres on {len(lines)} relationships between the observed objects."]
+    for start in range(0, min(len(lines), 9), 3):
+        summary = "; ".join(line.split(":", 1)[0] for line in lines[start:start + 3])
+        paragraphs.append(f"Taken together, {summary}. This suggests a coordinated campaign.")
+    return "\n\n".join(paragraphs)
+
+
+def _split_chunks(text: str, size: int = 16) -> List[str]:
+    return [text[start:start + size] for start in range(0, len(text), size)] or [""]
+
+
+def create_app(config: Optional[MockConfig] = None) -> Flask:
+    """
+    Build the mock server app; `app.config["MOCK_LLM"]` holds its MockLLM.
+    """
+    app = Flask(__name__)
+    mock = MockLLM(config)
+    app.config["MOCK_LLM"] = mock
+
+    @app.route('/v1/models', methods=['GET'])
+    def list_models():
+        return jsonify({"object": "list", "data": [{"id": model, "object": "model", "created": 0,
+                                                    "owned_by": "mock"} for model in MODELS]})
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        mock.count("requests")
+        failure = mock.fault()
+        if failure:
+            status, body, headers = failure
+            return jsonify(body), status, headers
+
+        body = request.get_json(force=True)
+        kind, message = mock.complete(body)
+        mock.count(f"kind:{kind}")
+        model = body.get("model", MODELS[0])
+        text = message.get("content") or json.dumps(message.get("function_call") or message.get("tool_calls"))
+        usage = {"prompt_tokens": estimate_tokens(_prompt_text(body.get("messages", []))),
+                 "completion_tokens": estimate_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        mock.count("prompt_tokens", usage["prompt_tokens"])
+        mock.count("completion_tokens", usage["completion_tokens"])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        finish_reason = "tool_calls" if message.get("tool_calls") else \
+            "function_call" if message.get("function_call") else "stop"
+        delay = mock.delay(usage["completion_tokens"])
+
+        if not body.get("stream"):
+            time.sleep(delay)
+            return jsonify({
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        def chunk(delta, finish=None):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        def events():
+            # Time to first token is the base latency; the per-token share is spread over the chunks
+            time.sleep(max(0.0, delay - mock.config.per_token_ms * usage["completion_tokens"] / 1000))
+            if message.get("content") is None:
+                yield chunk(dict(message))
+            else:
+                pieces = _split_chunks(message["content"])
+                pause = mock.config.per_token_ms * usage["completion_tokens"] / 1000 / len(pieces)
+                yield chunk({"role": "assistant", "content": ""})
+                for piece in pieces:
+                    time.sleep(pause)
+                    yield chunk({"content": piece})
+            yield chunk({}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return Response(stream_with_context(events()), mimetype='text/event-stream')
+
+    @app.route('/mock/stats', methods=['GET'])
+    def mock_stats():
+        return jsonify(dict(mock.stats))
+
+    @app.route('/mock/reset', methods=['POST'])
+    def mock_reset():
+        mock.reset()
+        return jsonify({"status": "reset"})
+
+    @app.route('/mock/config', methods=['GET', 'POST'])
+    def mock_config():
+        if request.method == 'POST':
+            try:
+                mock.config.update(request.get_json(force=True) or {})
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        return jsonify(mock.config.to_dict())
+
+    return app
+
+
+class MockServer:
+    """
+    Run the mock on a background thread, e.g. inside a benchmark:
+
+        with MockServer(MockConfig(latency_ms=200)) as server:
+            os.environ["OPENAI_API_BASE"] = server.base_url
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        from werkzeug.serving import make_server
+        self.app = create_app(config)
+        self.mock: MockLLM = self.app.config["MOCK_LLM"]
+        self._server = make_server(host, port, self.app, threaded=True)
+        self.base_url = f"http://{host}:{self._server.server_port}/v1"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "MockServer":
+        self._thread.start()
+        logger.info(f"Mock LLM server listening on {self.base_url}")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = MockConfig.from_env()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--per-token-ms", type=float, default=defaults.per_token_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Fraction answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate,
+                        help="Fraction answered with 429 regardless of load")
+    parser.add_argument("--rpm", type=int, default=defaults.rpm, help="Requests per minute before 429s; 0 = unlimited")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--no-relationship-rate", type=float, default=defaults.no_relationship_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = MockConfig(**{field: getattr(args, field) for field in MockConfig.FIELDS})
+    create_app(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import os
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from StixObjectLang import seeding
+
+# Zipf exponent for default reference weights: 0 samples uniformly, larger values make the
+# first objects of each type "hubs" that are referenced far more often than the rest
+DEFAULT_SKEW = float(os.getenv("STIX_GEN_REFERENCE_SKEW", "0"))
+
+Types = Optional[Union[str, Sequence[str]]]
+
+
+class ObjectPool:
+    """
+    STIX objects indexed once by id and by type, for sampling references.
+
+    Sampling k ids costs O(k log n) whatever the pool size: uniform draws pick positions from
+    the per-type index directly, weighted draws bisect running weight totals. An object's
+    weight is given to `add`, or else follows the pool's `skew` (weight 1 / rank**skew by
+    insertion order within its type).
+    """
+
+    def __init__(self, objects: Iterable[Any] = (), skew: Optional[float] = None, rng=None):
+        self.skew = DEFAULT_SKEW if skew is None else skew
+        # Defaults to the seeded run's stream at sampling time, or the global generator
+        self.rng = rng or seeding.rng
+        self.weighted = bool(self.skew)
+        self._by_id: Dict[str, Any] = {}
+        self._ids: Dict[str, List[str]] = defaultdict(list)
+        self._cumulative: Dict[str, List[float]] = defaultdict(list)
+        self.extend(objects)
+
+    @classmethod
+    def of(cls, objects) -> "ObjectPool":
+        """
+        Return `objects` if it already is a pool, otherwise index it in a new one.
+        """
+        return objects if isinstance(objects, cls) else cls(objects or ())
+
+    def add(self, obj, weight: Optional[float] = None) -> None:
+        if obj["id"] in self._by_id:
+            return
+        ids = self._ids[obj["type"]]
+        if weight is None:
+            weight = 1.0 / (len(ids) + 1) ** self.skew if self.skew else 1.0
+        elif weight != 1.0:
+            self.weighted = True
+        if weight <= 0:
+            raise ValueError(f"Weight for {obj['id']} must be positive, got {weight}")
+        cumulative = self._cumulative[obj["type"]]
+        cumulative.append((cumulative[-1] if cumulative else 0.0) + weight)
+        ids.append(obj["id"])
+        self._by_id[obj["id"]] = obj
+
+    def extend(self, objects: Iterable[Any]) -> None:
+        for obj in objects:
+            self.add(obj)
+
+    def ids_only(self) -> "ObjectPool":
+        """
+        Copy of the pool with every object reduced to its id and type, keeping the weights:
+        enough for sampling, and cheap to send to worker processes.
+        """
+        copy = ObjectPool(skew=self.skew, rng=self.rng)
+        copy.weighted = self.weighted
+        for stix_type, ids in self._ids.items():
+            copy._ids[stix_type] = list(ids)
+            copy._cumulative[stix_type] = list(self._cumulative[stix_type])
+            for object_id in ids:
+                copy._by_id[object_id] = {"id": object_id, "type": stix_type}
+        return copy
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, object_id) -> bool:
+        return object_id in self._by_id
+
+    def get(self, object_id: str, default=None):
+        return self._by_id.get(object_id, default)
+
+    def types(self) -> List[str]:
+        return [stix_type for stix_type, ids in self._ids.items() if ids]
+
+    def count(self, types: Types = None) -> int:
+        return sum(len(self._ids[stix_type]) for stix_type in self._type_list(types))
+
+    def _type_list(self, types: Types) -> List[str]:
+        if types is None:
+            return self.types()
+        if isinstance(types, str):
+            types = (types,)
+        return [stix_type for stix_type in types if self._ids.get(stix_type)]
+
+    def sample_ids(self, k: int, types: Types = None, weighted: Optional[bool] = None) -> List[str]:
+        """
+        Return min(k, available) distinct ids, optionally only of `types`.
+
+        Raises ValueError when the pool has no object of the requested types.
+        """
+        type_list = self._type_list(types)
+        total = sum(len(self._ids[stix_type]) for stix_type in type_list)
+        if not total:
+            wanted = ", ".join([types] if isinstance(types, str) else types) if types else "any type"
+            raise ValueError(f"No objects of {wanted} to reference")
+        k = min(k, total)
+        if not (self.weighted if weighted is None else weighted):
+            offsets = list(accumulate(len(self._ids[stix_type]) for stix_type in type_list))
+            ids = []
+            for index in self.rng.sample(range(total), k):
+                position = bisect_right(offsets, index)
+                ids.append(self._ids[type_list[position]][index - (offsets[position - 1] if position else 0)])
+            return ids
+        return self._weighted_sample(k, type_list)
+
+    def _weighted_sample(self, k: int, type_list: List[str]) -> List[str]:
+        type_totals = list(accumulate(self._cumulative[stix_type][-1] for stix_type in type_list))
+        chosen: Dict[str, None] = {}
+        # Draw with replacement and skip repeats; a few extra draws cover the collisions
+        for _ in range(4 * k + 8):
+            if len(chosen) == k:
+                return list(chosen)
+            point = self.rng.random() * type_totals[-1]
+            position = min(bisect_right(type_totals, point), len(type_list) - 1)
+            cumulative = self._cumulative[type_list[position]]
+            point -= type_totals[position - 1] if position else 0.0
+            chosen[self._ids[type_list[position]][min(bisect_right(cumulative, point), len(cumulative) - 1)]] = None
+
+        # Heavily skewed pools where k is close to the candidate count: finish with weighted
+        # random keys (Efraimidis-Spirakis) over the ids not drawn yet
+        keyed = []
+        for stix_type in type_list:
+            previous = 0.0
+            for object_id, running in zip(self._ids[stix_type], self._cumulative[stix_type]):
+                if object_id not in chosen:
+                    keyed.append((self.rng.random() ** (1.0 / (running - previous)), object_id))
+                previous = running
+        keyed.sort(reverse=True)
+        chosen.update((object_id, None) for _, object_id in keyed[:k - len(chosen)])
+        return list(chosen)
+
+    def sample(self, k: int, types: Types = None, weighted: Optional[bool] = None) -> List[Any]:
+        """
+        Like `sample_ids`, returning the objects.
+        """
+        return [self._by_id[object_id] for object_id in self.sample_ids(k, types, weighted)]
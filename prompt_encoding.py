@@ -0,0 +1,168 @@
+import json
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Alias prefix per STIX type; aliases are the prefix plus a per-run counter, e.g. TA1, MW3
+TYPE_PREFIXES = {
+    "threat-actor": "TA",
+    "identity": "ID",
+    "malware": "MW",
+    "indicator": "IN",
+    "tool": "TL",
+    "campaign": "CA",
+    "intrusion-set": "IS",
+    "infrastructure": "IF",
+    "location": "LO",
+    "attack-pattern": "AP",
+    "vulnerability": "VU",
+    "course-of-action": "CO",
+    "malware-analysis": "MA",
+    "observed-data": "OD",
+    "note": "NO",
+    "report": "RE",
+    "grouping": "GR",
+    "opinion": "OP",
+    "incident": "INC",
+}
+FALLBACK_PREFIX = "OBJ"
+_ALIAS_PATTERN = re.compile(r"\b(?:" + "|".join(sorted(set(TYPE_PREFIXES.values()) | {FALLBACK_PREFIX},
+                                                      key=len, reverse=True)) + r")\d+\b")
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class PromptEncoder:
+    """
+    Compact encoding of one run's STIX objects for LLM prompts.
+
+    Every object gets a short alias (TA1, MW3, ...) that prompts use instead of its
+    45-character STIX id, and is serialized to JSON once, however many pairs, batches or
+    prompts it appears in. `resolve` and `expand` map aliases in responses back to objects.
+    """
+
+    def __init__(self, stix_objects: Iterable[Any] = ()):
+        self._alias_by_id: Dict[str, str] = {}
+        self._objects: Dict[str, Any] = {}
+        self._ids: Dict[str, str] = {}
+        self._serialized: Dict[str, str] = {}
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        for obj in stix_objects:
+            self.alias(obj)
+
+    def alias(self, obj_or_id) -> str:
+        """
+        Return the alias of an object or STIX id, assigning the next one on first sight.
+        """
+        stix_id = obj_or_id if isinstance(obj_or_id, str) else obj_or_id.id
+        alias = self._alias_by_id.get(stix_id)
+        if alias is not None:
+            return alias
+        with self._lock:
+            alias = self._alias_by_id.get(stix_id)
+            if alias is None:
+                prefix = TYPE_PREFIXES.get(stix_id.split("--", 1)[0], FALLBACK_PREFIX)
+                self._counters[prefix] += 1
+                alias = f"{prefix}{self._counters[prefix]}"
+                self._alias_by_id[stix_id] = alias
+                self._ids[alias] = stix_id
+            if not isinstance(obj_or_id, str):
+                self._objects.setdefault(alias, obj_or_id)
+        return alias
+
+    def resolve(self, alias: str) -> Optional[str]:
+        """
+        Return the STIX id behind `alias`, or None for an alias this run never assigned.
+        """
+        return self._ids.get(alias.strip())
+
+    def name(self, alias: str) -> Optional[str]:
+        obj = self._objects.get(alias)
+        return getattr(obj, "name", None) if obj is not None else None
+
+    def serialize(self, obj) -> str:
+        """
+        Compact JSON of an object's type, name and description, built once per object.
+        """
+        alias = self.alias(obj)
+        serialized = self._serialized.get(alias)
+        if serialized is None:
+            payload = {"type": obj.type, "name": getattr(obj, "name", "Unknown")}
+            description = getattr(obj, "description", None)
+            if description:
+                payload["description"] = description
+            serialized = self._serialized[alias] = _json(payload)
+        return serialized
+
+    def describe_object(self, obj) -> str:
+        return f"{self.alias(obj)} {self.serialize(obj)}"
+
+    def objects_json(self, stix_objects: Iterable[Any]) -> str:
+        """
+        JSON object of {alias: object} for `stix_objects`, each listed once.
+        """
+        entries = {}
+        for obj in stix_objects:
+            alias = self.alias(obj)
+            if alias not in entries:
+                entries[alias] = self.serialize(obj)
+        return "{" + ",".join(f"{_json(alias)}:{serialized}" for alias, serialized in entries.items()) + "}"
+
+    def legend(self, stix_ids: Iterable[str]) -> str:
+        """
+        One "alias: type, name" line per distinct id, in first-seen order.
+        """
+        lines = []
+        seen = set()
+        for stix_id in stix_ids:
+            alias = self.alias(stix_id)
+            if alias in seen:
+                continue
+            seen.add(alias)
+            name = self.name(alias)
+            stix_type = stix_id.split("--", 1)[0]
+            lines.append(f"{alias}: {stix_type}, {name}" if name else f"{alias}: {stix_type}")
+        return "\n".join(lines)
+
+    def describe_relationships(self, relationships: List[Any]) -> str:
+        return "\n".join(
+            f"{self.alias(r.source_ref)} {r.relationship_type} {self.alias(r.target_ref)}: "
+            f"{getattr(r, 'description', 'No description')}"
+            for r in relationships
+        )
+
+    def relationship_legend(self, relationships: List[Any]) -> str:
+        return self.legend(ref for r in relationships for ref in (r.source_ref, r.target_ref))
+
+    def expand(self, text: str) -> str:
+        """
+        Replace the aliases in a free-text response with object names (or STIX ids when an
+        object has no name); text that merely looks like an unknown alias is left alone.
+        """
+        def replace(match):
+            alias = match.group(0)
+            if alias not in self._ids:
+                return alias
+            return self.name(alias) or self._ids[alias]
+        return _ALIAS_PATTERN.sub(replace, text)
+
+    def expand_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        `expand` for streamed text: an alias split across chunks is held back until it is
+        complete.
+        """
+        pending = ""
+        for chunk in chunks:
+            pending += chunk
+            cut = len(pending)
+            while cut and pending[cut - 1].isalnum():
+                cut -= 1
+            if cut:
+                yield self.expand(pending[:cut])
+                pending = pending[cut:]
+        if pending:
+            yield self.expand(pending)
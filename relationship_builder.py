@@ -1,13 +1,20 @@
 from stix2 import Relationship
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import numpy as np
 import re
 from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
 from langchain_core.runnables import RunnableSequence
 import random
 import dotenv
 import json
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from prompt_encoding import PromptEncoder
+from relationship_cache import RelationshipCache, get_default_cache
+from StixObjectLang import cancellation, metrics, replay, seeding
 
 dotenv.load_dotenv()
 
@@ -15,6 +22,14 @@ dotenv.load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Candidate pairs classified per LLM call; 1 sends one request per pair
+RELATIONSHIP_BATCH_SIZE = int(os.getenv("STIX_RELATIONSHIP_BATCH_SIZE", "20"))
+# Upper bound on relationship LLM calls in flight per agent, shared by all of its runs
+RELATIONSHIP_MAX_CONCURRENCY = int(os.getenv("STIX_RELATIONSHIP_MAX_CONCURRENCY", "8"))
+# "llm" classifies pairs with STIXRelationshipAgent, "rules" uses the local RuleBasedRelationshipEngine
+RELATIONSHIP_ENGINES = ("llm", "rules")
+DEFAULT_RELATIONSHIP_ENGINE = os.getenv("STIX_RELATIONSHIP_ENGINE", "llm")
+
 # Expanded relationship map (you can further expand this based on STIX guidelines)
 relationship_map = {
     "threat-actor": {
@@ -156,10 +171,76 @@ relationship_map = {
     
 }
 
+def compile_relationship_matrix(relationship_map: Dict[str, Dict[str, List[str]]]) -> Tuple[List[str], Dict[str, int], np.ndarray]:
+    """
+    Compile relationship_map into an integer type x type validity matrix.
+
+    Returns the ordered list of STIX types, a type -> index lookup and a matrix where
+    matrix[source, target] is 1 when at least one relationship type is valid for the pair.
+    """
+    stix_types = sorted(set(relationship_map) | {t for targets in relationship_map.values() for t in targets})
+    type_index = {stix_type: i for i, stix_type in enumerate(stix_types)}
+    matrix = np.zeros((len(stix_types), len(stix_types)), dtype=np.int8)
+    for source_type, targets in relationship_map.items():
+        for target_type, relationships in targets.items():
+            if relationships:
+                matrix[type_index[source_type], type_index[target_type]] = 1
+    return stix_types, type_index, matrix
+
+RELATIONSHIP_TYPES, TYPE_INDEX, VALIDITY_MATRIX = compile_relationship_matrix(relationship_map)
+
+def candidate_pair_arrays(stix_objects: List[Any], max_per_source: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Enumerate candidate pairs that relationship_map allows, as (sources, targets) index arrays.
+
+    Objects are bucketed by type once, so each source only looks at targets of types it can
+    relate to, and its budget of `max_per_source` is spent on pairs that can produce a
+    relationship. Sources of the same type start at staggered offsets in their candidate
+    list so targets are spread across the bundle. Pairs come back ordered by source index.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if max_per_source <= 0 or not stix_objects:
+        return empty, empty
+
+    codes = np.fromiter((TYPE_INDEX.get(obj.type, -1) for obj in stix_objects), dtype=np.int64, count=len(stix_objects))
+    buckets = {code: np.flatnonzero(codes == code) for code in np.unique(codes) if code >= 0}
+
+    source_chunks = []
+    target_chunks = []
+    for source_code, sources in buckets.items():
+        target_codes = [code for code in np.flatnonzero(VALIDITY_MATRIX[source_code]) if code in buckets]
+        if not target_codes:
+            continue
+        candidates = np.sort(np.concatenate([buckets[code] for code in target_codes]))
+
+        width = min(max_per_source + 1, len(candidates))
+        offsets = (np.arange(len(sources)) * max_per_source) % len(candidates)
+        window = candidates[(offsets[:, None] + np.arange(width)) % len(candidates)]
+        not_self = window != sources[:, None]
+        keep = not_self & (np.cumsum(not_self, axis=1) <= max_per_source)
+
+        rows, cols = np.nonzero(keep)
+        source_chunks.append(sources[rows])
+        target_chunks.append(window[rows, cols])
+
+    if not source_chunks:
+        return empty, empty
+    pair_sources = np.concatenate(source_chunks)
+    pair_targets = np.concatenate(target_chunks)
+    order = np.argsort(pair_sources, kind="stable")
+    return pair_sources[order], pair_targets[order]
+
+def enumerate_candidate_pairs(stix_objects: List[Any], max_per_source: int) -> List[Tuple[int, int]]:
+    """
+    List form of `candidate_pair_arrays`: (source index, target index) tuples.
+    """
+    pair_sources, pair_targets = candidate_pair_arrays(stix_objects, max_per_source)
+    return list(zip(pair_sources.tolist(), pair_targets.tolist()))
+
 def create_relationship_prompt():
     template = """You are an expert in STIX (Structured Threat Information Expression) relationships and cyber threat intelligence storytelling.
 
-Given the following information:
+Given the following information, where each object is given as a short alias followed by its JSON:
 - Source object: {source_obj}
 - Target object: {target_obj}
 - Valid relationship types: {valid_relationships}
@@ -183,6 +264,93 @@ IMPORTANT: Your response must be valid JSON. Do not include any text before or a
         template=template
     )
 
+def create_batch_relationship_prompt():
+    template = """You are an expert in STIX (Structured Threat Information Expression) relationships and cyber threat intelligence storytelling.
+
+Given the following STIX objects, as a JSON object keyed by short alias:
+
+{objects}
+
+and the following JSON list of candidate pairs, where each pair has a "pair_id", the "source" and "target" object aliases and the "valid_relationships" for that pair:
+
+{pairs}
+
+Task, for every pair:
+1. Analyze the source and target objects, considering their types and attributes.
+2. Choose the most appropriate relationship type from that pair's valid_relationships list that fits the narrative.
+3. If none of the relationships seem appropriate, use "NO_RELATIONSHIP".
+4. Provide a brief justification for your choice (1-2 sentences).
+
+Provide your answer as a JSON array with exactly one element per pair, in the following format:
+[
+    {{
+        "pair_id": pair_id_from_the_input,
+        "relationship_type": "chosen_relationship_or_NO_RELATIONSHIP",
+        "justification": "Your brief justification here"
+    }}
+]
+
+IMPORTANT: Your response must be a valid JSON array. Do not include any text before or after the array, and do not wrap it in code blocks.
+"""
+    return PromptTemplate(
+        input_variables=["objects", "pairs"],
+        template=template
+    )
+
+def parse_batch_relationship_response(content: str, valid_by_pair_id: Dict[int, List[str]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Parse a batched classification response into {pair_id: decision}.
+
+    Elements that are malformed, refer to an unknown or repeated pair_id, or pick a
+    relationship outside that pair's valid list are left out so the caller can retry
+    those pairs on their own.
+    """
+    data = json.loads(clean_llm_response(content))
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        data = lists[0] if len(lists) == 1 else [data]
+
+    decisions = {}
+    for element in data:
+        if not isinstance(element, dict):
+            continue
+        try:
+            pair_id = int(element.get("pair_id"))
+        except (TypeError, ValueError):
+            continue
+        relationship_type = element.get("relationship_type")
+        if pair_id not in valid_by_pair_id or pair_id in decisions or not isinstance(relationship_type, str):
+            continue
+        if relationship_type.upper() != "NO_RELATIONSHIP" and relationship_type not in valid_by_pair_id[pair_id]:
+            continue
+        decisions[pair_id] = {
+            "relationship_type": relationship_type,
+            "justification": element.get("justification")
+        }
+    return decisions
+
+def create_story_prompt():
+    return PromptTemplate(
+        input_variables=["objects", "relationships"],
+        template="""Given the following STIX objects, each listed as "alias: type, name":
+
+{objects}
+
+and the following STIX relationships between those aliases:
+
+{relationships}
+
+Provide a brief analysis of the cyber threat story these relationships tell. 
+Focus on key actors, their motivations, and the progression of their activities.
+Limit your response to 3-5 paragraphs."""
+    )
+
+def story_inputs(relationships: List[Relationship], encoder: PromptEncoder) -> Dict[str, str]:
+    return {
+        "objects": encoder.relationship_legend(relationships),
+        "relationships": encoder.describe_relationships(relationships),
+    }
+
 def object_to_dict(obj):
     return {
         "id": obj.id,
@@ -197,89 +365,289 @@ def clean_llm_response(response):
     return cleaned
 
 class STIXRelationshipAgent:
-    def __init__(self, stix_objects: List[Any], max_relationships_per_object: int = 5):
-        self.stix_objects = stix_objects
+    """
+    Generates relationships, a story and a self-evaluation for a set of STIX objects.
+
+    An agent built without objects can be shared: `run(stix_objects)` keeps all per-run
+    state local, so concurrent Flask requests can use the same agent and LLM client.
+    Passing objects to the constructor and calling `run()` keeps the original
+    single-use behaviour, with results also stored on the agent.
+    """
+    def __init__(self, stix_objects: Optional[List[Any]] = None, max_relationships_per_object: int = 5,
+                 cache: Optional[RelationshipCache] = None, use_cache: bool = True,
+                 batch_size: int = RELATIONSHIP_BATCH_SIZE, max_concurrency: int = RELATIONSHIP_MAX_CONCURRENCY):
+        self.stix_objects = stix_objects or []
         self.max_relationships_per_object = max_relationships_per_object
-        self.llm = ChatOpenAI(temperature=0.7, model_name='gpt-4o')
+        self.batch_size = batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self._llm_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.llm = replay.chat_model(temperature=0.7, model_name='gpt-4o')
+        self.cache = (cache or get_default_cache()) if use_cache else None
         self.relationships = []
         self.story = ""
         self.evaluation = {}
 
-    def generate_relationships(self):
+    def _classify_pair(self, chain, encoder: PromptEncoder, pair) -> Dict[str, Any]:
+        source_obj, target_obj, valid_relationships = pair
+        with self._llm_slots:
+            cancellation.check()
+            result = chain.invoke({
+                "source_obj": encoder.describe_object(source_obj),
+                "target_obj": encoder.describe_object(target_obj),
+                "valid_relationships": ", ".join(valid_relationships)
+            })
+
+        logger.info(f"LLM Response for relationship: {result.content}")
+
+        cleaned_content = clean_llm_response(result.content)
+        return json.loads(cleaned_content)
+
+    def _classify_batch(self, batch_chain, encoder: PromptEncoder, pairs) -> Dict[int, Dict[str, Any]]:
+        """
+        Classify several pairs in one call; returns decisions keyed by position in `pairs`.
+        Objects are sent once per batch and pairs refer to them by alias.
+        """
+        payload = [
+            {"pair_id": pair_id, "source": encoder.alias(source_obj), "target": encoder.alias(target_obj),
+             "valid_relationships": valid_relationships}
+            for pair_id, (source_obj, target_obj, valid_relationships) in enumerate(pairs)
+        ]
+        objects = encoder.objects_json(obj for source_obj, target_obj, _ in pairs for obj in (source_obj, target_obj))
+        with self._llm_slots:
+            cancellation.check()
+            result = batch_chain.invoke({"objects": objects, "pairs": json.dumps(payload)})
+        logger.info(f"LLM Response for {len(pairs)} relationships: {result.content}")
+        return parse_batch_relationship_response(
+            result.content, {pair_id: pair[2] for pair_id, pair in enumerate(pairs)}
+        )
+
+    def _build_relationship(self, source_obj, target_obj, response: Dict[str, Any]) -> Optional[Relationship]:
+        try:
+            relationship_type = response.get("relationship_type")
+            justification = response.get("justification")
+
+            logger.info(f"Relationship Type: {relationship_type}")
+            logger.info(f"Justification: {justification}")
+
+            if relationship_type and relationship_type.upper() != "NO_RELATIONSHIP":
+                now = seeding.utcnow()
+                return Relationship(id=seeding.new_id("relationship", source_obj.id, relationship_type, target_obj.id),
+                                    created=now,
+                                    modified=now,
+                                    relationship_type=relationship_type,
+                                    source_ref=source_obj.id,
+                                    target_ref=target_obj.id,
+                                    description=justification)
+        except Exception as e:
+            logger.error(f"Error generating relationship with LLM: {e}")
+        return None
+
+    def iter_relationships(self, stix_objects: List[Any],
+                           encoder: Optional[PromptEncoder] = None) -> Iterator[Tuple[int, Relationship]]:
+        """
+        Classify candidate pairs concurrently, yielding (pair index, relationship) as soon
+        as each pair is decided: cached pairs first, then batches as they complete, then
+        single-pair retries as they complete. Completion order varies from run to run; callers
+        that need a stable order sort by pair index. Closing the iterator cancels
+        classification calls not yet started.
+        """
         prompt = create_relationship_prompt()
         chain = prompt | self.llm
+        batch_prompt = create_batch_relationship_prompt()
+        batch_chain = batch_prompt | self.llm
+        # Recorded and replayed runs bypass the decision cache so every call lands on the cassette
+        cache = None if replay.active() else self.cache
+        use_batches = self.batch_size > 1
+        cache_template = batch_prompt.template if use_batches else prompt.template
+        model_name = getattr(self.llm, 'model_name', type(self.llm).__name__)
 
-        valid_stix_objects = [obj for obj in self.stix_objects if hasattr(obj, 'id') and hasattr(obj, 'type')]
+        valid_stix_objects = [obj for obj in stix_objects if hasattr(obj, 'id') and hasattr(obj, 'type')]
+        encoder = encoder or PromptEncoder(valid_stix_objects)
 
-        for source_obj in valid_stix_objects:
-            potential_targets = [obj for obj in valid_stix_objects if obj.id != source_obj.id]
-            
-            for target_obj in potential_targets[:self.max_relationships_per_object]:
-                valid_relationships = relationship_map.get(source_obj.type, {}).get(target_obj.type, [])
-                if not valid_relationships:
+        candidate_pairs = enumerate_candidate_pairs(valid_stix_objects, self.max_relationships_per_object)
+        logger.info(f"Evaluating {len(candidate_pairs)} candidate pairs for {len(valid_stix_objects)} objects")
+
+        pairs = []
+        for source_index, target_index in candidate_pairs:
+            source_obj = valid_stix_objects[source_index]
+            target_obj = valid_stix_objects[target_index]
+            pairs.append((source_obj, target_obj, relationship_map[source_obj.type][target_obj.type]))
+
+        def decided(i, response):
+            source_index, target_index = candidate_pairs[i]
+            return self._build_relationship(valid_stix_objects[source_index], valid_stix_objects[target_index], response)
+
+        pending = list(range(len(pairs)))
+        cache_keys = [None] * len(pairs)
+        if cache is not None:
+            pending = []
+            # Cache keys describe objects by content and STIX id, independent of this run's aliases
+            object_dicts = [object_to_dict(obj) for obj in valid_stix_objects]
+            for i, (source_index, target_index) in enumerate(candidate_pairs):
+                cache_keys[i] = cache.make_key(object_dicts[source_index], object_dicts[target_index], pairs[i][2],
+                                               model_name, cache_template)
+                response = cache.get(cache_keys[i])
+                if response is None:
+                    pending.append(i)
                     continue
+                relationship = decided(i, response)
+                if relationship is not None:
+                    yield i, relationship
 
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            if use_batches:
+                batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+                futures = {cancellation.submit(executor, self._classify_batch, batch_chain, encoder,
+                                               [pairs[i] for i in batch]): batch
+                           for batch in batches}
+                retry = []
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        batch_decisions = future.result()
+                    except cancellation.Cancelled:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Error classifying relationship batch with LLM: {e}")
+                        metrics.record_failure("relationship_batch", e)
+                        batch_decisions = {}
+                    if cache is not None:
+                        cache.set_many([(cache_keys[i], batch_decisions[pair_id])
+                                        for pair_id, i in enumerate(batch) if pair_id in batch_decisions])
+                    for pair_id, i in enumerate(batch):
+                        if pair_id not in batch_decisions:
+                            retry.append(i)
+                            continue
+                        relationship = decided(i, batch_decisions[pair_id])
+                        if relationship is not None:
+                            yield i, relationship
+                if retry:
+                    logger.info(f"Retrying {len(retry)} malformed batch elements one pair at a time")
+                # Submitted in pair order whatever order the batches finished in
+                pending = sorted(retry)
+
+            futures = {cancellation.submit(executor, self._classify_pair, chain, encoder, pairs[i]): i
+                       for i in pending}
+            for future in as_completed(futures):
+                i = futures[future]
                 try:
-                    result = chain.invoke({
-                        "source_obj": json.dumps(object_to_dict(source_obj)),
-                        "target_obj": json.dumps(object_to_dict(target_obj)),
-                        "valid_relationships": ", ".join(valid_relationships)
-                    })
-                    
-                    logger.info(f"LLM Response for relationship: {result.content}")
-                    
-                    cleaned_content = clean_llm_response(result.content)
-                    response = json.loads(cleaned_content)
-                    relationship_type = response.get("relationship_type")
-                    justification = response.get("justification")
-                    
-                    logger.info(f"Relationship Type: {relationship_type}")
-                    logger.info(f"Justification: {justification}")
-                    
-                    if relationship_type and relationship_type.upper() != "NO_RELATIONSHIP":
-                        relationship = Relationship(relationship_type=relationship_type, 
-                                                    source_ref=source_obj.id, 
-                                                    target_ref=target_obj.id, 
-                                                    description=justification)
-                        self.relationships.append(relationship)
+                    response = future.result()
+                except cancellation.Cancelled:
+                    raise
                 except Exception as e:
                     logger.error(f"Error generating relationship with LLM: {e}")
+                    metrics.record_failure("relationship_pair", e)
+                    continue
+                if cache is not None:
+                    # Stored under cache_keys[i], i.e. the batch template's key when batching, which
+                    # is the key later batched runs look the pair up by
+                    cache.set(cache_keys[i], response)
+                relationship = decided(i, response)
+                if relationship is not None:
+                    yield i, relationship
+        finally:
+            # Only reached early when the consumer stops iterating; drop calls that have not started
+            executor.shutdown(wait=False, cancel_futures=True)
+            if cache is not None:
+                cache.flush()
+                logger.info(f"Relationship cache stats: {cache.stats()}")
 
-    def analyze_story(self):
-        story_prompt = PromptTemplate(
-            input_variables=["relationships"],
-            template="""Given the following STIX relationships:
+    @metrics.stage("relationships")
+    def generate_relationships(self, stix_objects: Optional[List[Any]] = None,
+                               encoder: Optional[PromptEncoder] = None) -> List[Relationship]:
+        """
+        Classify candidate pairs concurrently and return relationships in pair order.
 
-{relationships}
+        Without `stix_objects`, the agent's own objects are used and the results are also
+        appended to `self.relationships`.
+        """
+        store = stix_objects is None
+        if store:
+            stix_objects = self.stix_objects
 
-Provide a brief analysis of the cyber threat story these relationships tell. 
-Focus on key actors, their motivations, and the progression of their activities.
-Limit your response to 3-5 paragraphs."""
-        )
-        
-        story_chain = story_prompt | self.llm
-        
-        relationship_descriptions = [
-            f"{r.source_ref} {r.relationship_type} {r.target_ref}: {getattr(r, 'description', 'No description')}"
-            for r in self.relationships
-        ]
+        relationships = [relationship for _, relationship in sorted(self.iter_relationships(stix_objects, encoder),
+                                                                    key=lambda item: item[0])]
+
+        if store:
+            self.relationships.extend(relationships)
+        return relationships
+
+    def _encoder(self) -> PromptEncoder:
+        # Objects the agent was built with get names in prompts; other refs only an alias
+        return PromptEncoder(obj for obj in self.stix_objects if hasattr(obj, 'id'))
+
+    @metrics.stage("story")
+    def analyze_story(self, relationships: Optional[List[Relationship]] = None,
+                      encoder: Optional[PromptEncoder] = None) -> str:
+        store = relationships is None
+        if store:
+            relationships = self.relationships
+        encoder = encoder or self._encoder()
+
+        story_chain = create_story_prompt() | self.llm
+        cancellation.check()
         
         try:
-            result = story_chain.invoke({"relationships": "\n".join(relationship_descriptions)})
-            self.story = result.content
-            logger.info(f"Generated Story: {self.story}")
+            result = story_chain.invoke(story_inputs(relationships, encoder))
+            story = encoder.expand(result.content)
+            logger.info(f"Generated Story: {story}")
+        except Exception as e:
+            logger.error(f"Error generating story: {e}")
+            metrics.record_failure("story", e)
+            story = "Unable to generate story due to an error."
+
+        if store:
+            self.story = story
+        return story
+
+    def stream_story(self, relationships: List[Relationship],
+                     encoder: Optional[PromptEncoder] = None) -> Iterator[str]:
+        """
+        Yield the story as the LLM streams it, chunk by chunk.
+        """
+        encoder = encoder or self._encoder()
+        story_chain = create_story_prompt() | self.llm
+        cancellation.check()
+        streamed = False
+
+        def contents():
+            for chunk in story_chain.stream(story_inputs(relationships, encoder)):
+                cancellation.check()
+                if chunk.content:
+                    yield chunk.content
+
+        try:
+            for text in encoder.expand_stream(contents()):
+                streamed = True
+                yield text
+        except cancellation.Cancelled:
+            raise
         except Exception as e:
             logger.error(f"Error generating story: {e}")
-            self.story = "Unable to generate story due to an error."
+            metrics.record_failure("story", e)
+            if not streamed:
+                yield "Unable to generate story due to an error."
+
+    @metrics.stage("evaluation")
+    def evaluate_performance(self, relationships: Optional[List[Relationship]] = None,
+                             story: Optional[str] = None, encoder: Optional[PromptEncoder] = None) -> Dict[str, Any]:
+        store = relationships is None
+        if store:
+            relationships = self.relationships
+            story = self.story
+        encoder = encoder or self._encoder()
 
-    def evaluate_performance(self):
         evaluation_prompt = PromptTemplate(
-            input_variables=["relationships", "story"],
+            input_variables=["objects", "relationships", "story"],
             template="""You are an expert in evaluating STIX relationships and cyber threat intelligence narratives.
 
 Given the following generated relationships and story:
 
-Relationships:
+Objects, each listed as "alias: type, name":
+{objects}
+
+Relationships between those aliases:
 {relationships}
 
 Story:
@@ -303,37 +671,103 @@ IMPORTANT: Your response must be valid JSON. Do not include any text before or a
         )
         
         evaluation_chain = evaluation_prompt | self.llm
-        
-        relationship_descriptions = [
-            f"{r.source_ref} {r.relationship_type} {r.target_ref}: {getattr(r, 'description', 'No description')}"
-            for r in self.relationships
-        ]
+        cancellation.check()
         
         try:
-            result = evaluation_chain.invoke({
-                "relationships": "\n".join(relationship_descriptions),
-                "story": self.story
-            })
+            result = evaluation_chain.invoke(dict(story_inputs(relationships, encoder), story=story))
             
             cleaned_content = clean_llm_response(result.content)
-            self.evaluation = json.loads(cleaned_content)
-            logger.info(f"Self-Evaluation: {self.evaluation}")
+            evaluation = json.loads(cleaned_content)
+            if isinstance(evaluation.get("justification"), str):
+                evaluation["justification"] = encoder.expand(evaluation["justification"])
+            logger.info(f"Self-Evaluation: {evaluation}")
         except Exception as e:
             logger.error(f"Error during self-evaluation: {e}")
-            self.evaluation = {"score": 0, "justification": "Unable to evaluate due to an error."}
+            metrics.record_failure("evaluation", e)
+            evaluation = {"score": 0, "justification": "Unable to evaluate due to an error."}
 
-    def run(self):
+        if store:
+            self.evaluation = evaluation
+        return evaluation
+
+    def stream(self, stix_objects: List[Any]) -> Iterator[Tuple[str, Any]]:
+        """
+        Run the pipeline as a sequence of ("relationship", Relationship), ("story", chunk)
+        and finally ("evaluation", dict) events, emitted as soon as each is available.
+        """
+        logger.info("Starting streamed STIX Relationship Agent run")
+        # One set of aliases for the whole run, shared by every prompt
+        encoder = PromptEncoder(obj for obj in stix_objects if hasattr(obj, 'id'))
+        # Streamed stage times include the time the consumer spends on each event
+        start = time.perf_counter()
+        indexed = []
+        for i, relationship in self.iter_relationships(stix_objects, encoder):
+            indexed.append((i, relationship))
+            yield "relationship", relationship
+        metrics.observe_stage("relationships", time.perf_counter() - start)
+        # The story and evaluation see relationships in pair order, as with run()
+        relationships = [relationship for _, relationship in sorted(indexed, key=lambda item: item[0])]
+
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self.stream_story(relationships, encoder):
+            chunks.append(chunk)
+            yield "story", chunk
+        metrics.observe_stage("story", time.perf_counter() - start)
+        yield "evaluation", self.evaluate_performance(relationships, "".join(chunks), encoder)
+
+    def run(self, stix_objects: Optional[List[Any]] = None):
         logger.info("Starting STIX Relationship Agent")
-        self.generate_relationships()
-        self.analyze_story()
-        self.evaluate_performance()
+        if stix_objects is None:
+            encoder = self._encoder()
+            self.generate_relationships(encoder=encoder)
+            self.analyze_story(encoder=encoder)
+            self.evaluate_performance(encoder=encoder)
+            relationships, story, evaluation = self.relationships, self.story, self.evaluation
+        else:
+            encoder = PromptEncoder(obj for obj in stix_objects if hasattr(obj, 'id'))
+            relationships = self.generate_relationships(stix_objects, encoder)
+            story = self.analyze_story(relationships, encoder)
+            evaluation = self.evaluate_performance(relationships, story, encoder)
         logger.info("STIX Relationship Agent completed its run")
         return {
-            "relationships": self.relationships,
-            "story": self.story,
-            "evaluation": self.evaluation
+            "engine": "llm",
+            "relationships": relationships,
+            "story": story,
+            "evaluation": evaluation
         }
 
-def create_stix_story(stix_objects: List):
-    agent = STIXRelationshipAgent(stix_objects)
-    return agent.run()
\ No newline at end of file
+_shared_agent = None
+_shared_agent_lock = threading.Lock()
+
+def get_shared_agent() -> STIXRelationshipAgent:
+    """
+    Return the process-wide agent, built on first use and reused by every request.
+    """
+    global _shared_agent
+    with _shared_agent_lock:
+        if _shared_agent is None:
+            _shared_agent = STIXRelationshipAgent()
+        return _shared_agent
+
+def create_stix_story(stix_objects: List, engine: Optional[str] = None):
+    engine = engine or DEFAULT_RELATIONSHIP_ENGINE
+    if engine not in RELATIONSHIP_ENGINES:
+        raise ValueError(f"Unknown relationship engine '{engine}', expected one of {', '.join(RELATIONSHIP_ENGINES)}")
+    if engine == "rules":
+        # Imported here because relationship_rules builds on this module's relationship_map
+        from relationship_rules import RuleBasedRelationshipEngine
+        return RuleBasedRelationshipEngine().run(stix_objects)
+    return get_shared_agent().run(stix_objects)
+
+def stream_stix_story(stix_objects: List, engine: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming counterpart of create_stix_story, yielding (event, payload) pairs.
+    """
+    engine = engine or DEFAULT_RELATIONSHIP_ENGINE
+    if engine not in RELATIONSHIP_ENGINES:
+        raise ValueError(f"Unknown relationship engine '{engine}', expected one of {', '.join(RELATIONSHIP_ENGINES)}")
+    if engine == "rules":
+        from relationship_rules import RuleBasedRelationshipEngine
+        return RuleBasedRelationshipEngine().stream(stix_objects)
+    return get_shared_agent().stream(stix_objects)
\ No newline at end of file
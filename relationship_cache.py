@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "relationship_cache.sqlite3")
+# Set STIX_RELATIONSHIP_CACHE=off to disable caching entirely
+CACHE_PATH = os.getenv("STIX_RELATIONSHIP_CACHE", DEFAULT_CACHE_PATH)
+CACHE_TTL_SECONDS = float(os.getenv("STIX_RELATIONSHIP_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("STIX_RELATIONSHIP_CACHE_MAX_ENTRIES", "100000"))
+# Writes between sweeps for expired entries
+SWEEP_INTERVAL = 1000
+# Share of max_entries freed by one eviction, so a full cache is not trimmed on every write
+EVICTION_HEADROOM = 0.1
+
+
+class RelationshipCache:
+    """
+    Disk-backed cache of relationship decisions, keyed by a content hash of the request.
+
+    Entries expire `ttl` seconds after they were written, and once the cache holds more than
+    `max_entries` the least recently used entries are evicted.
+
+    Lookups stay read-only: hits are noted in memory and their last-access times written
+    with the next `set_many` or `flush`. The entry count is kept in memory between sweeps.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: Optional[float] = CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_access: Dict[str, float] = {}
+        self._writes_since_sweep = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS relationship_decisions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_relationship_decisions_last_access "
+            "ON relationship_decisions (last_access)"
+        )
+        self._conn.commit()
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM relationship_decisions").fetchone()
+
+    @staticmethod
+    def make_key(source: Dict[str, Any], target: Dict[str, Any], valid_relationships: List[str],
+                 model: str, prompt_template: str) -> str:
+        payload = json.dumps({
+            "source": source,
+            "target": target,
+            "valid_relationships": list(valid_relationships),
+            "model": model,
+            "prompt": prompt_template,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM relationship_decisions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                # Left for the next sweep; it is overwritten if the pair is classified again
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._pending_access[key] = now
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.set_many([(key, value)])
+
+    def set_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Store several decisions in one transaction, along with the pending last-access times.
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO relationship_decisions (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), now, now) for key, value in items]
+            )
+            # Replaced keys are counted twice; the next eviction recounts
+            self._size += len(items)
+            self._writes_since_sweep += len(items)
+            self._flush_access()
+            if self._size > self.max_entries or self._writes_since_sweep >= SWEEP_INTERVAL:
+                self._evict()
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """
+        Write the last-access times of hits since the last write.
+        """
+        with self._lock:
+            if self._pending_access:
+                self._flush_access()
+                self._conn.commit()
+
+    def _flush_access(self) -> None:
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE relationship_decisions SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _evict(self) -> None:
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM relationship_decisions WHERE created < ?", (time.time() - self.ttl,))
+        self._writes_since_sweep = 0
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM relationship_decisions").fetchone()
+        if self._size <= self.max_entries:
+            return
+        overflow = self._size - self.max_entries + int(self.max_entries * EVICTION_HEADROOM)
+        self._conn.execute(
+            "DELETE FROM relationship_decisions WHERE key IN "
+            "(SELECT key FROM relationship_decisions ORDER BY last_access ASC LIMIT ?)",
+            (overflow,)
+        )
+        self._size = max(0, self._size - overflow)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM relationship_decisions")
+            self._conn.commit()
+            self._pending_access.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM relationship_decisions").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": size,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "path": self.path,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[RelationshipCache]:
+    """
+    Return the process-wide cache configured from the environment, or None when disabled.
+    """
+    global _default_cache
+    if CACHE_PATH.lower() in ("", "off", "none"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RelationshipCache()
+        return _default_cache
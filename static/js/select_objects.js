@@ -5,6 +5,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const copyJsonButton = document.getElementById('copy-json');
     const flipButton = document.getElementById('flip-button');
     const flipContainer = document.querySelector('.flip-container');
+    const generationOptions = document.querySelector('.generation-options');
 
     stixObjects.forEach(button => {
         button.addEventListener('click', function() {
@@ -26,19 +27,93 @@ document.addEventListener('DOMContentLoaded', function() {
         inputs.forEach(input => {
             formData.append(input.name, input.value);
         });
+        generationOptions.querySelectorAll('select, input').forEach(option => {
+            if (option.value !== '') {
+                formData.append(option.name, option.value);
+            }
+        });
+
+        const jsonOutput = document.getElementById('json-output');
+        const storyOutput = document.getElementById('story-output');
+        const bundle = { type: 'bundle', id: '', objects: [] };
+        let story = '';
+        let evaluation = null;
+        let status = 'Generating objects...';
+        let renderPending = false;
+
+        // Re-rendering the whole bundle on every event is quadratic, so coalesce
+        // updates into at most one render per animation frame
+        function scheduleRender() {
+            if (renderPending) {
+                return;
+            }
+            renderPending = true;
+            requestAnimationFrame(() => {
+                renderPending = false;
+                jsonOutput.textContent = JSON.stringify(bundle, null, 2);
+                storyOutput.innerHTML = `<p><em>${escapeHtml(status)}</em></p><h4>Story:</h4><p>${escapeHtml(story)}</p>`;
+                if (evaluation) {
+                    const score = evaluation.engine === 'rules'
+                        ? `Heuristic score (rule-based, no LLM review): ${evaluation.heuristic_score}`
+                        : `Score: ${evaluation.score}`;
+                    storyOutput.innerHTML += `<h4>Evaluation:</h4><p>${escapeHtml(score)}</p>` +
+                        `<p>${escapeHtml(evaluation.justification || '')}</p>`;
+                }
+            });
+        }
 
-        fetch('/generate-graph', {
+        function handleEvent(message) {
+            switch (message.event) {
+                case 'start':
+                    bundle.id = message.data.bundle_id;
+                    break;
+                case 'stage':
+                    status = `Stage: ${message.data.stage}...`;
+                    break;
+                case 'object':
+                    bundle.objects.push(message.data);
+                    status = `Generated ${bundle.objects.length} objects...`;
+                    break;
+                case 'relationship':
+                    bundle.objects.push(message.data);
+                    break;
+                case 'story':
+                    story += message.data.delta;
+                    break;
+                case 'evaluation':
+                    evaluation = message.data;
+                    break;
+                case 'error':
+                    console.error('Error:', message.data);
+                    break;
+                case 'done':
+                    status = `Done: ${message.data.objects} objects, ${message.data.relationships} relationships.`;
+                    break;
+            }
+            scheduleRender();
+        }
+
+        fetch('/generate-graph/stream', {
             method: 'POST',
             body: formData
         })
-        .then(response => response.json())
-        .then(data => {
-            let bundleData = data.stix_bundle;
-            if (typeof bundleData === 'string') {
-                bundleData = JSON.parse(bundleData);
+        .then(async response => {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffered = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) {
+                    break;
+                }
+                buffered += decoder.decode(value, { stream: true });
+                const lines = buffered.split('\n');
+                buffered = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+            }
+            if (buffered.trim()) {
+                handleEvent(JSON.parse(buffered));
             }
-            document.getElementById('json-output').textContent = JSON.stringify(bundleData, null, 2);
-            document.getElementById('story-output').innerHTML = `<h4>Story:</h4><p>${data.story}</p>`;
         })
         .catch(error => console.error('Error:', error));
     });
@@ -85,6 +160,12 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    function escapeHtml(string) {
+        const div = document.createElement('div');
+        div.textContent = string;
+        return div.innerHTML;
+    }
+
     function capitalizeFirstLetter(string) {
         return string.charAt(0).toUpperCase() + string.slice(1);
     }
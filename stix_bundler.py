@@ -1,4 +1,356 @@
+import datetime as dt
+import heapq
+import io
+import os
+import tempfile
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+import orjson
 from stix2 import Bundle
+from stix2.base import _STIXBase
+from stix2.utils import format_datetime
+
+from StixObjectLang import cancellation, seeding
+
+# Datetimes are handed to stix_default so they use the STIX timestamp format
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def stix_default(obj):
+    """
+    orjson `default` hook that encodes stix2 objects and timestamps the way stix2's own
+    serializer does, without going through simplejson.
+    """
+    if isinstance(obj, _STIXBase):
+        if obj._defaulted_optional_properties:
+            # Spec defaults (e.g. revoked=False) are left out, as in stix2's STIXJSONEncoder
+            return {key: value for key, value in obj._inner.items()
+                    if key not in obj._defaulted_optional_properties}
+        return obj._inner
+    if isinstance(obj, (dt.date, dt.datetime)):
+        return format_datetime(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(value, pretty=False) -> bytes:
+    """
+    Encode a structure that may contain stix2 objects to JSON bytes in one pass.
+    Output is compact unless `pretty` is set.
+    """
+    options = ORJSON_OPTIONS | orjson.OPT_INDENT_2 if pretty else ORJSON_OPTIONS
+    return orjson.dumps(value, default=stix_default, option=options)
+
+
+def bundle_dict(stix_objects, relationships=(), bundle_id=None):
+    """
+    Return a bundle as a plain structure for `dumps`, without building a stix2 Bundle
+    (which would revalidate and copy every object).
+    """
+    return {
+        "type": "bundle",
+        "id": bundle_id or seeding.new_id("bundle"),
+        "objects": list(chain(stix_objects, relationships)),
+    }
+
+
+class BundleWriter:
+    """
+    Write a bundle incrementally to a path or a binary file-like object (a file,
+    `socket.makefile("wb")`, ...), so memory use stays flat however many objects pass through.
+
+    "json" writes the same document as `dumps(bundle_dict(...))`; "ndjson" writes one object
+    per line without the bundle envelope. `write` also accepts already-encoded JSON bytes.
+    """
+    FORMATS = ("json", "ndjson")
+
+    def __init__(self, target, format="json", bundle_id=None):
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown bundle format '{format}', expected one of {', '.join(self.FORMATS)}")
+        self.format = format
+        self.bundle_id = bundle_id or seeding.new_id("bundle")
+        self.count = 0
+        self.bytes_written = 0
+        self._owns_target = isinstance(target, (str, os.PathLike))
+        self._fp = open(target, "wb") if self._owns_target else target
+        self._closed = False
+        if format == "json":
+            self._emit(b'{"type":"bundle","id":' + orjson.dumps(self.bundle_id) + b',"objects":[')
+
+    def _emit(self, data):
+        self._fp.write(data)
+        self.bytes_written += len(data)
+
+    def write(self, obj):
+        data = bytes(obj) if isinstance(obj, (bytes, bytearray, memoryview)) else dumps(obj)
+        if self.format == "ndjson":
+            self._emit(data + b"\n")
+        elif self.count:
+            self._emit(b"," + data)
+        else:
+            self._emit(data)
+        self.count += 1
+
+    def write_all(self, objects):
+        for obj in objects:
+            self.write(obj)
+        return self.count
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self.format == "json":
+            self._emit(b"]}")
+        if self._owns_target:
+            self._fp.close()
+        elif hasattr(self._fp, "flush"):
+            self._fp.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_bundle(target, stix_objects, relationships=(), format="json", bundle_id=None):
+    """
+    Stream objects and relationships (any iterables, e.g. generators) to `target`; returns the object count.
+    """
+    with BundleWriter(target, format, bundle_id) as writer:
+        writer.write_all(chain(stix_objects, relationships))
+    return writer.count
+
+
+def iter_bundle_chunks(objects, format="json", bundle_id=None, chunk_size=64 * 1024):
+    """
+    Yield an encoded bundle as byte chunks of about `chunk_size`, e.g. for a streamed HTTP response.
+    """
+    buffer = io.BytesIO()
+    writer = BundleWriter(buffer, format, bundle_id)
+    for obj in objects:
+        writer.write(obj)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    writer.close()
+    yield buffer.getvalue()
+
+
+# Bytes a bundle adds around its objects: the JSON envelope plus one comma per object
+BUNDLE_ENVELOPE_BYTES = len(b'{"type":"bundle","id":"bundle--00000000-0000-0000-0000-000000000000","objects":[]}')
+
+
+def object_refs(obj):
+    """
+    Yield (property, referenced id) for the top-level *_ref and *_refs properties of a STIX object.
+    """
+    for key, value in obj.items():
+        if key.endswith("_ref") and isinstance(value, str):
+            yield key, value
+        elif key.endswith("_refs") and isinstance(value, (list, tuple)):
+            for ref in value:
+                yield key, ref
+
+
+def _neighbours(objects, ids):
+    """
+    Undirected adjacency between non-relationship objects, through relationships and embedded refs.
+    """
+    neighbours = defaultdict(list)
+    for index, obj in enumerate(objects):
+        if obj["type"] == "relationship":
+            source, target = ids.get(obj.get("source_ref")), ids.get(obj.get("target_ref"))
+            if source is not None and target is not None:
+                neighbours[source].append(target)
+                neighbours[target].append(source)
+            continue
+        for _, ref in object_refs(obj):
+            target = ids.get(ref)
+            if target is not None and objects[target]["type"] != "relationship":
+                neighbours[index].append(target)
+                neighbours[target].append(index)
+    return neighbours
+
+
+def plan_shards(objects, encoded, max_objects=None, max_bytes=None):
+    """
+    Assign objects to shards, returning a list of shards (lists of object indices).
+
+    Each shard is grown greedily from the objects most linked to it, and every object is
+    packed together with the relationships it is the source of, so a relationship lands in
+    its source_ref's shard and, where the graph allows, next to its target_ref too.
+
+    A shard is closed when the next unit would exceed `max_objects` or `max_bytes`
+    (including the bundle envelope); only a unit too large for any shard is split, and an
+    object larger than `max_bytes` on its own still gets a shard.
+    """
+    ids = {obj["id"]: index for index, obj in enumerate(objects)}
+    outgoing = defaultdict(list)
+    orphan_relationships = []
+    for index, obj in enumerate(objects):
+        if obj["type"] == "relationship":
+            source = ids.get(obj.get("source_ref"))
+            if source is not None and objects[source]["type"] != "relationship":
+                outgoing[source].append(index)
+            else:
+                orphan_relationships.append(index)
+
+    shards = [[]]
+    size = BUNDLE_ENVELOPE_BYTES
+
+    def fits(count, item_bytes):
+        return ((max_objects is None or len(shards[-1]) + count <= max_objects)
+                and (max_bytes is None or size + item_bytes <= max_bytes))
+
+    def place(unit):
+        nonlocal size
+        unit_bytes = sum(len(encoded[index]) + 1 for index in unit)
+        # Start a new shard rather than split a unit that would fit in one on its own
+        if shards[-1] and not fits(len(unit), unit_bytes):
+            shards.append([])
+            size = BUNDLE_ENVELOPE_BYTES
+        for index in unit:
+            item_bytes = len(encoded[index]) + 1
+            if shards[-1] and not fits(1, item_bytes):
+                shards.append([])
+                size = BUNDLE_ENVELOPE_BYTES
+            shards[-1].append(index)
+            size += item_bytes
+
+    # Grow each shard greedily: next comes the unplaced object with the most links into the
+    # current shard, or the first unplaced object in input order when none is linked
+    neighbours = _neighbours(objects, ids)
+    candidates = [index for index, obj in enumerate(objects) if obj["type"] != "relationship"]
+    placed = bytearray(len(objects))
+    gains = {}
+    heap = []
+    next_seed = 0
+    while True:
+        index = None
+        while heap:
+            negative_gain, candidate = heapq.heappop(heap)
+            if not placed[candidate] and gains.get(candidate) == -negative_gain:
+                index = candidate
+                break
+        if index is None:
+            while next_seed < len(candidates) and placed[candidates[next_seed]]:
+                next_seed += 1
+            if next_seed == len(candidates):
+                break
+            index = candidates[next_seed]
+
+        shard_count = len(shards)
+        place([index] + outgoing[index])
+        placed[index] = 1
+        if len(shards) != shard_count:
+            gains.clear()
+            heap.clear()
+        for neighbour in neighbours[index]:
+            if not placed[neighbour]:
+                gains[neighbour] = gains.get(neighbour, 0) + 1
+                heapq.heappush(heap, (-gains[neighbour], neighbour))
+    for index in orphan_relationships:
+        place([index])
+    return [shard for shard in shards if shard]
+
+
+def shard_bundle(objects, output_dir, max_objects=None, max_bytes=None, format="json",
+                 prefix="bundle", workers=4):
+    """
+    Split objects and relationships into bundles capped by object count and/or byte size,
+    written in parallel to `output_dir` together with a manifest.json.
+
+    Each object is encoded once; its encoded size drives the byte cap and the bytes are
+    written as-is. The manifest lists every shard and every reference (relationship
+    endpoints and other *_ref/*_refs properties) that points to an object in a different
+    shard, so consumers can resolve them across bundles.
+
+    Returns:
+        dict: The manifest.
+    """
+    if max_objects is None and max_bytes is None:
+        raise ValueError("shard_bundle needs max_objects and/or max_bytes")
+    objects = list(objects)
+    encoded = [dumps(obj) for obj in objects]
+    shards = plan_shards(objects, encoded, max_objects, max_bytes)
+
+    extension = "ndjson" if format == "ndjson" else "json"
+    width = max(4, len(str(len(shards))))
+    files = [f"{prefix}-{number:0{width}d}.{extension}" for number in range(len(shards))]
+    shard_of = {}
+    for number, shard in enumerate(shards):
+        for index in shard:
+            shard_of[objects[index]["id"]] = number
+
+    cross_references = []
+    external_references = 0
+    for number, shard in enumerate(shards):
+        for index in shard:
+            for prop, ref in object_refs(objects[index]):
+                ref_shard = shard_of.get(ref)
+                if ref_shard is None:
+                    external_references += 1
+                elif ref_shard != number:
+                    cross_references.append({
+                        "object": objects[index]["id"],
+                        "property": prop,
+                        "ref": ref,
+                        "shard": files[number],
+                        "ref_shard": files[ref_shard],
+                    })
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Ids are drawn here, in shard order, so a seeded run names its shards the same way
+    # whichever worker finishes first
+    bundle_ids = [seeding.new_id("bundle") for _ in shards]
+
+    def write_shard(number):
+        path = os.path.join(output_dir, files[number])
+        count = write_bundle(path, (encoded[index] for index in shards[number]), format=format,
+                             bundle_id=bundle_ids[number])
+        return {"file": files[number], "bundle_id": bundle_ids[number] if format == "json" else None,
+                "objects": count, "bytes": os.path.getsize(path)}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [cancellation.submit(executor, write_shard, number) for number in range(len(shards))]
+        shard_entries = [future.result() for future in futures]
+
+    manifest = {
+        "format": format,
+        "max_objects": max_objects,
+        "max_bytes": max_bytes,
+        "total_objects": len(objects),
+        "shards": shard_entries,
+        "cross_shard_references": cross_references,
+        "external_references": external_references,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "wb") as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    return manifest
+
+
+def write_sharded_zip(objects, target, max_objects=None, max_bytes=None, format="json",
+                      prefix="bundle"):
+    """
+    Shard objects with `shard_bundle` and pack the shards and manifest.json into a zip
+    archive written to `target` (a path or a binary file-like object).
+
+    Returns:
+        dict: The manifest.
+    """
+    with tempfile.TemporaryDirectory(prefix="stix-shards-") as output_dir:
+        manifest = shard_bundle(objects, output_dir, max_objects, max_bytes, format, prefix)
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as archive:
+            for entry in manifest["shards"]:
+                archive.write(os.path.join(output_dir, entry["file"]), entry["file"])
+            archive.write(os.path.join(output_dir, "manifest.json"), "manifest.json")
+    return manifest
+
 
 def create_bundle(stix_objects, relationships):
     all_objects = stix_objects + relationships
@@ -1,32 +1,14 @@
 from faker import Faker
 from stix2 import ThreatActor, Identity, Malware, Tool,Infrastructure, Indicator, AttackPattern, Campaign, IntrusionSet, Vulnerability, Location, CourseOfAction, MalwareAnalysis, Note, Opinion, ObservedData, Report, Grouping
 
-from StixObjectLang.PhaseOne.Campaign import generate_campaigns
-from StixObjectLang.PhaseOne.Identity import generate_identities
-from StixObjectLang.PhaseOne.Indicator import generate_indicator
-from StixObjectLang.PhaseOne.Infrastructure import generate_infrastructures
-from StixObjectLang.PhaseOne.IntrusionSet import generate_intrusion_set
-from StixObjectLang.PhaseOne.Location import generate_locations
-from StixObjectLang.PhaseOne.Malware import generate_malware
-from StixObjectLang.PhaseOne.ThreatActor import generate_threat_actor
-from StixObjectLang.PhaseOne.Tool import generate_tool
+from StixObjectLang import metrics, registry
+from StixObjectLang.seeding import new_id, utcnow
+from fast_stix import build_object
+from object_pool import ObjectPool
 
-from StixObjectLang.PhaseTwo.AttackPattern import generate_attack_pattern
-from StixObjectLang.PhaseTwo.CourseOfAction import generate_course_of_action
-from StixObjectLang.PhaseTwo.Grouping import generate_grouping
-from StixObjectLang.PhaseTwo.MalwareAnalysis import generate_malware_analysis
-from StixObjectLang.PhaseTwo.Note import generate_notes
-from StixObjectLang.PhaseTwo.Opinion import generate_opinions
-from StixObjectLang.PhaseTwo.ObservedData import generate_observed_data
-from StixObjectLang.PhaseTwo.Report import generate_reports
-from StixObjectLang.PhaseTwo.Vulnerability import generate_vulnerabilities
-
-from stix2 import KillChainPhase
+from stix2 import ExternalReference, KillChainPhase
 from datetime import datetime, timedelta
-from dateutil.parser import parse
 from typing import List, Optional
-import random
-import uuid
 
 def convert_to_iso_format(date_str: Optional[str]) -> Optional[str]:
     """
@@ -39,7 +21,7 @@ def convert_to_iso_format(date_str: Optional[str]) -> Optional[str]:
         date_obj = datetime.fromisoformat(date_str.rstrip('Z'))
         return date_obj.isoformat() + "Z"
     except ValueError:
-        return datetime.utcnow().isoformat() + "Z"
+        return utcnow().isoformat() + "Z"
 
 def format_kill_chain_phases(phases):
     if not phases:
@@ -47,6 +29,19 @@ def format_kill_chain_phases(phases):
     return [KillChainPhase(kill_chain_name=phase.get('kill_chain_name'), phase_name=phase.get('phase_name')) 
             for phase in phases if 'kill_chain_name' in phase and 'phase_name' in phase]
 
+def format_external_references(references):
+    """
+    Build ExternalReference objects from generated dicts, dropping unknown keys and
+    entries without a source_name and an external_id, url or description.
+    """
+    if not references:
+        return None
+    fields = ('source_name', 'description', 'url', 'external_id')
+    return [ExternalReference(**{key: value for key, value in ref.items() if key in fields and value})
+            for ref in references
+            if isinstance(ref, dict) and ref.get('source_name')
+            and any(ref.get(key) for key in ('description', 'url', 'external_id'))] or None
+
 def format_stix_pattern(pattern: str) -> str:
     pattern = pattern.strip()
     if not pattern.startswith('[') and not pattern.endswith(']'):
@@ -54,30 +49,32 @@ def format_stix_pattern(pattern: str) -> str:
     pattern = pattern.replace('email:message-subject', 'email-message:subject')
     return pattern
 
-def get_random_refs(phase_1_objects, count=2):
-    return random.sample([obj.id for obj in phase_1_objects], min(count, len(phase_1_objects)))
+def get_random_refs(phase_1_objects, count=2, types=None):
+    return ObjectPool.of(phase_1_objects).sample_ids(count, types)
 
-def create_attack_patterns(count, phase_1_objects):
-    synthetic_results = generate_attack_pattern(count)
+@metrics.stage("create", "attack-pattern")
+def create_attack_patterns(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("attack-pattern", count, backend=backend)
     fake_attack_patterns = []
     for item in synthetic_results:
-        fake_attack_pattern = AttackPattern(
+        fake_attack_pattern = build_object(AttackPattern,
             type=item.type,
             spec_version="2.1",
-            id=f"attack-pattern--{str(uuid.uuid4())}",
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("attack-pattern"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description,
-            external_references=get_random_refs(phase_1_objects),
+            external_references=format_external_references(item.external_references),
             aliases=item.aliases,
             kill_chain_phases=format_kill_chain_phases(item.kill_chain_phases) if item.kill_chain_phases else None,
         )
         fake_attack_patterns.append(fake_attack_pattern)
     return fake_attack_patterns
 
-def create_campaigns(count):
-    synthetic_results = generate_campaigns(count)
+@metrics.stage("create", "campaign")
+def create_campaigns(count, backend=None):
+    synthetic_results = registry.generate("campaign", count, backend=backend)
     fake_campaigns = []
     for item in synthetic_results:
         try:
@@ -85,12 +82,12 @@ def create_campaigns(count):
             first_seen = item.first_seen.rstrip('Z').split('+')[0] if item.first_seen else None
             last_seen = item.last_seen.rstrip('Z').split('+')[0] if item.last_seen else None
             
-            fake_campaign = Campaign(
+            fake_campaign = build_object(Campaign,
                 type=item.type,
                 spec_version=item.spec_version,
-                id=f"campaign--{str(uuid.uuid4())}",
-                created=datetime.utcnow(),
-                modified=datetime.utcnow(),
+                id=new_id("campaign"),
+                created=utcnow(),
+                modified=utcnow(),
                 name=item.name,
                 description=item.description,
                 aliases=item.aliases,
@@ -104,70 +101,77 @@ def create_campaigns(count):
             print(f"Problematic item: {item}")
     return fake_campaigns
 
-def create_notes(count, phase_1_objects):
-    synthetic_results = generate_notes(count)
+@metrics.stage("create", "note")
+def create_notes(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("note", count, backend=backend)
+    pool = ObjectPool.of(phase_1_objects)
     fake_notes = []
     for item in synthetic_results:
-        fake_note = Note(
+        fake_note = build_object(Note,
             type=item.type,
             spec_version="2.1",
-            id="note--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("note"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             abstract=item.abstract,
             content=item.content,
             authors=item.authors,
-            object_refs=get_random_refs(phase_1_objects)
+            object_refs=pool.sample_ids(2)
         )
         fake_notes.append(fake_note)
     return fake_notes
 
-def create_observed_datas(count, phase_1_objects):
-    synthetic_results = generate_observed_data(count)
+@metrics.stage("create", "observed-data")
+def create_observed_datas(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("observed-data", count, backend=backend)
     fake_observed_data = []
     for item in synthetic_results:
-        fake_observed_datum = ObservedData(
+        fake_observed_datum = build_object(ObservedData,
             type=item.type,
             spec_version="2.1",
-            id="observed-data--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("observed-data"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             first_observed=datetime.fromisoformat(item.first_observed.rstrip('Z')),
             last_observed=datetime.fromisoformat(item.last_observed.rstrip('Z')),
             number_observed=item.number_observed,
-            objects=get_random_refs(phase_1_objects)
+            # Observed data may only reference SCOs and SROs, which phase one does not produce
+            object_refs=item.object_refs
         )
         fake_observed_data.append(fake_observed_datum)
     return fake_observed_data
 
-def create_reports(count, phase_1_objects):
-    synthetic_results = generate_reports(count)
+@metrics.stage("create", "report")
+def create_reports(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("report", count, backend=backend)
+    pool = ObjectPool.of(phase_1_objects)
     fake_reports = []
     for item in synthetic_results:
-        fake_report = Report(
+        fake_report = build_object(Report,
             type=item.type,
             spec_version="2.1",
-            id="report--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("report"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description,
             published=datetime.fromisoformat(item.published.rstrip('Z')),
-            object_refs=get_random_refs(phase_1_objects)
+            object_refs=pool.sample_ids(2)
         )
         fake_reports.append(fake_report)
     return fake_reports
 
-def create_course_of_actions(count, phase_1_objects):
-    synthetic_results = generate_course_of_action(count)
+@metrics.stage("create", "course-of-action")
+def create_course_of_actions(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("course-of-action", count, backend=backend)
     fake_courses_of_action = []
     for item in synthetic_results:
-        fake_course_of_action = CourseOfAction(
+        fake_course_of_action = build_object(CourseOfAction,
             type=item.type,
             spec_version="2.1",
-            id="course-of-action--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("course-of-action"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description
             
@@ -176,17 +180,18 @@ def create_course_of_actions(count, phase_1_objects):
 
     return fake_courses_of_action
 
-def create_identities(count):
-    synthetic_results = generate_identities(count)
+@metrics.stage("create", "identity")
+def create_identities(count, backend=None):
+    synthetic_results = registry.generate("identity", count, backend=backend)
     fake_identities = []
     for item in synthetic_results:
         try:
-            fake_identity = Identity(
+            fake_identity = build_object(Identity,
                 type=item.type,
                 spec_version=item.spec_version,
-                id="identity--" + str(uuid.uuid4()),
-                created=datetime.utcnow().isoformat() + "Z",
-                modified=datetime.utcnow().isoformat() + "Z",
+                id=new_id("identity"),
+                created=utcnow().isoformat() + "Z",
+                modified=utcnow().isoformat() + "Z",
                 name=item.name,
                 description=item.description,
                 roles=item.roles,
@@ -200,55 +205,61 @@ def create_identities(count):
             print(f"Problematic item: {item}")
     return fake_identities
 
-def create_groupings(count, phase_1_objects):
-    synthetic_results = generate_grouping(count)
+@metrics.stage("create", "grouping")
+def create_groupings(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("grouping", count, backend=backend)
+    pool = ObjectPool.of(phase_1_objects)
     fake_groupings = []
     for item in synthetic_results:
-        fake_grouping = Grouping(
+        fake_grouping = build_object(Grouping,
             type=item.type,
             spec_version="2.1",
-            id="grouping--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("grouping"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description,
             context=item.context,
-            object_refs=get_random_refs(phase_1_objects)
+            object_refs=pool.sample_ids(2)
         )
         fake_groupings.append(fake_grouping)
     return fake_groupings
 
-def create_opinions(count, phase_1_objects):
-    synthetic_results = generate_opinions(count)
+@metrics.stage("create", "opinion")
+def create_opinions(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("opinion", count, backend=backend)
+    pool = ObjectPool.of(phase_1_objects)
     fake_opinions = []
     for item in synthetic_results:
-        fake_opinion = Opinion(
+        fake_opinion = build_object(Opinion,
             type=item.type,
             spec_version="2.1",
-            id="opinion--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
-            opinion=item.opinion,
+            id=new_id("opinion"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
+            opinion=getattr(item.opinion, 'value', item.opinion),
             explanation=item.explanation,
             authors=item.authors,
-            object_refs=get_random_refs(phase_1_objects)
+            object_refs=pool.sample_ids(2)
         )
         fake_opinions.append(fake_opinion)
+    return fake_opinions
 
-def create_indicators(count):
-    synthetic_results = generate_indicator(count)
+@metrics.stage("create", "indicator")
+def create_indicators(count, backend=None):
+    synthetic_results = registry.generate("indicator", count, backend=backend)
     fake_indicators = []
     for item in synthetic_results:
         try:
-            fake_indicator = Indicator(
+            fake_indicator = build_object(Indicator,
                 type=item.type,
                 spec_version=item.spec_version,
-                id=f"indicator--{str(uuid.uuid4())}",
-                created=datetime.utcnow(),
-                modified=datetime.utcnow(),
+                id=new_id("indicator"),
+                created=utcnow(),
+                modified=utcnow(),
                 name=item.name,
                 description=item.description,
-                pattern=item.pattern,
+                pattern=format_stix_pattern(" OR ".join(item.pattern) if isinstance(item.pattern, list) else item.pattern),
                 pattern_type=item.pattern_type,
                 valid_from=datetime.fromisoformat(item.valid_from.rstrip('Z')),
                 valid_until=datetime.fromisoformat(item.valid_until.rstrip('Z')) if item.valid_until else None,
@@ -260,16 +271,17 @@ def create_indicators(count):
             print(f"Problematic item: {item}")
     return fake_indicators
 
-def create_infrastructures(count):
-    synthetic_results = generate_infrastructures(count)
+@metrics.stage("create", "infrastructure")
+def create_infrastructures(count, backend=None):
+    synthetic_results = registry.generate("infrastructure", count, backend=backend)
     stix_infrastructures = []
     for item in synthetic_results:
-        stix_infrastructure = Infrastructure(
+        stix_infrastructure = build_object(Infrastructure,
             type=item.type,
             spec_version="2.1",
-            id=f"infrastructure--{str(uuid.uuid4())}",
-            created=datetime.utcnow(),
-            modified=datetime.utcnow(),
+            id=new_id("infrastructure"),
+            created=utcnow(),
+            modified=utcnow(),
             name=item.name,
             description=item.description,
             infrastructure_types=item.infrastructure_types,
@@ -281,17 +293,18 @@ def create_infrastructures(count):
         stix_infrastructures.append(stix_infrastructure)
     return stix_infrastructures
 
-def create_intrusion_sets(count):
-    synthetic_results = generate_intrusion_set(count)
+@metrics.stage("create", "intrusion-set")
+def create_intrusion_sets(count, backend=None):
+    synthetic_results = registry.generate("intrusion-set", count, backend=backend)
     fake_intrusion_sets = []
     for item in synthetic_results:
         try:
-            fake_intrusion_set = IntrusionSet(
+            fake_intrusion_set = build_object(IntrusionSet,
                 type=item.type,
                 spec_version="2.1",
-                id=f"intrusion-set--{str(uuid.uuid4())}",
-                created=datetime.utcnow(),
-                modified=datetime.utcnow(),
+                id=new_id("intrusion-set"),
+                created=utcnow(),
+                modified=utcnow(),
                 name=item.name,
                 description=item.description,
                 aliases=item.aliases,
@@ -308,16 +321,17 @@ def create_intrusion_sets(count):
             print(f"Problematic item: {item}")
     return fake_intrusion_sets
 
-def create_locations(count):
-    synthetic_results = generate_locations(count)
+@metrics.stage("create", "location")
+def create_locations(count, backend=None):
+    synthetic_results = registry.generate("location", count, backend=backend)
     fake_locations = []
     for item in synthetic_results:
-        fake_location = Location(
+        fake_location = build_object(Location,
             type=item.type,
             spec_version="2.1",
-            id="location--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("location"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description,
             latitude=item.latitude,
@@ -334,16 +348,17 @@ def create_locations(count):
 
     return fake_locations
 
-def create_malwares(count):
-    synthetic_results = generate_malware(count)
+@metrics.stage("create", "malware")
+def create_malwares(count, backend=None):
+    synthetic_results = registry.generate("malware", count, backend=backend)
     fake_malwares = []
     for item in synthetic_results:
-        fake_malware = Malware(
+        fake_malware = build_object(Malware,
             type=item.type,
             spec_version="2.1",
-            id="malware--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("malware"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description,
             malware_types=item.malware_types,
@@ -355,16 +370,17 @@ def create_malwares(count):
         fake_malwares.append(fake_malware)
     return fake_malwares
 
-def create_malware_analysis(count, phase_1_objects):
-    synthetic_results = generate_malware_analysis(count)
+@metrics.stage("create", "malware-analysis")
+def create_malware_analysis(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("malware-analysis", count, backend=backend)
     fake_malware_analyses = []
     for item in synthetic_results:
-        fake_malware_analysis = MalwareAnalysis(
+        fake_malware_analysis = build_object(MalwareAnalysis,
             type=item.type,
             spec_version="2.1",
-            id="malware-analysis--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("malware-analysis"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             product=item.product,
             version=item.version,
             configuration_version=item.configuration_version,
@@ -374,23 +390,25 @@ def create_malware_analysis(count, phase_1_objects):
             submitted=item.submitted,
             analysis_started=item.analysis_started,
             analysis_ended=item.analysis_ended,
-            analysis_sco_refs=get_random_refs(phase_1_objects)
+            # analysis_sco_refs may only reference SCOs, so the verdict is recorded instead
+            result=item.av_result or "unknown"
         )
         fake_malware_analyses.append(fake_malware_analysis)
     return fake_malware_analyses
 
-def create_threat_actors(count):
-    synthetic_results = generate_threat_actor(count)
+@metrics.stage("create", "threat-actor")
+def create_threat_actors(count, backend=None):
+    synthetic_results = registry.generate("threat-actor", count, backend=backend)
 
     # Convert the synthetic results to the format expected by STIX
     fake_threat_actors = []
     for item in synthetic_results:
-        fake_threat_actor = ThreatActor(
+        fake_threat_actor = build_object(ThreatActor,
             type=item.type,
             spec_version="2.1",
-            id="threat-actor--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("threat-actor"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description,
             threat_actor_types=item.threat_actor_types,
@@ -409,16 +427,17 @@ def create_threat_actors(count):
 
     return fake_threat_actors
 
-def create_tools(count):
-    synthetic_results = generate_tool(count)
+@metrics.stage("create", "tool")
+def create_tools(count, backend=None):
+    synthetic_results = registry.generate("tool", count, backend=backend)
     fake_tools = []
     for item in synthetic_results:
-        fake_tool = Tool(
+        fake_tool = build_object(Tool,
             type=item.type,
             spec_version="2.1",
-            id="tool--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("tool"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
             name=item.name,
             description=item.description,
             tool_version=item.tool_version,
@@ -429,33 +448,25 @@ def create_tools(count):
         fake_tools.append(fake_tool)
     return fake_tools
 
-def create_vulnerabilities(count, phase_1_objects):
-    synthetic_results = generate_vulnerabilities(count)
+@metrics.stage("create", "vulnerability")
+def create_vulnerabilities(count, phase_1_objects, backend=None):
+    synthetic_results = registry.generate("vulnerability", count, backend=backend)
+    # Vulnerabilities are attributed to a generated identity when there is one
+    pool = ObjectPool.of(phase_1_objects)
+    has_identities = pool.count('identity') > 0
     fake_vulnerabilities = []
     for item in synthetic_results:
-        # Extract potential sources from phase 1 objects
-        potential_sources = [obj for obj in phase_1_objects if obj.type in ['identity', 'tool', 'malware']]
-        source = random.choice(potential_sources) if potential_sources else None
-        
-        fake_vulnerability = Vulnerability(
+        fake_vulnerability = build_object(Vulnerability,
             type=item.type,
             spec_version="2.1",
-            id="vulnerability--" + str(uuid.uuid4()),
-            created=datetime.utcnow().isoformat() + "Z",
-            modified=datetime.utcnow().isoformat() + "Z",
+            id=new_id("vulnerability"),
+            created=utcnow().isoformat() + "Z",
+            modified=utcnow().isoformat() + "Z",
+            created_by_ref=pool.sample_ids(1, 'identity')[0] if has_identities else None,
             name=item.name,
             description=item.description,
-            vulnerability_types=item.vulnerability_types,
-            first_seen=parse(item.first_seen).isoformat() + "Z",
-            last_seen=parse(item.last_seen).isoformat() + "Z",
-            severity=item.severity,
-            impact=item.impact,
-            likelihood=item.likelihood
+            external_references=format_external_references(item.external_references)
         )
-        
-        if source:
-            fake_vulnerability.source_name = source.name
-        
         fake_vulnerabilities.append(fake_vulnerability)
 
     return fake_vulnerabilities
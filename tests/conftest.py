@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Nothing under test talks to OpenAI, but ChatOpenAI refuses to construct without a key.
+# Keep the SQLite stores and cassettes out of the working tree.
+_scratch = tempfile.mkdtemp(prefix="stix-gen-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("STIX_RELATIONSHIP_CACHE", "off")
+os.environ.setdefault("STIX_JOB_DB", os.path.join(_scratch, "jobs.sqlite3"))
+os.environ.setdefault("STIX_DATASET_DB", os.path.join(_scratch, "dataset.sqlite3"))
+os.environ.setdefault("STIX_LLM_CASSETTE_DIR", os.path.join(_scratch, "cassettes"))
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import types
+
+from test_engine import Record, fake_generator
+
+from StixObjectLang import engine
+
+
+def test_parse_plain_array():
+    records = engine.parse_batch_response('[{"name": "a", "score": 1}, {"name": "b", "score": 2}]', Record)
+    assert [record.name for record in records] == ["a", "b"]
+
+
+def test_parse_strips_code_fences():
+    records = engine.parse_batch_response('```json\n[{"name": "a", "score": 1}]\n```', Record)
+    assert [record.name for record in records] == ["a"]
+
+
+def test_parse_accepts_wrapper_object_and_single_record():
+    wrapped = engine.parse_batch_response('{"records": [{"name": "a", "score": 1}]}', Record)
+    single = engine.parse_batch_response('{"name": "b", "score": 2}', Record)
+    assert [record.name for record in wrapped] == ["a"]
+    assert [record.name for record in single] == ["b"]
+
+
+def test_parse_drops_invalid_elements():
+    records = engine.parse_batch_response('[{"name": "a", "score": 1}, {"name": "b"}, {"score": "x"}]', Record)
+    assert [record.name for record in records] == ["a"]
+
+
+def test_describe_schema_fields_marks_required_fields():
+    lines = engine.describe_schema_fields(Record).splitlines()
+    assert lines == ["- name (string, required)", "- score (integer, required)"]
+
+
+class FakeBatchLLM:
+    """
+    Answers each batch prompt with the requested number of records, one of which is invalid
+    on the first call, so the engine has to top the batch up.
+    """
+
+    def __init__(self):
+        self.sizes = []
+
+    async def ainvoke(self, prompt):
+        size = int(prompt.split("exactly ", 1)[1].split(" ", 1)[0])
+        self.sizes.append(size)
+        records = [{"name": f"r{len(self.sizes)}-{index}", "score": index} for index in range(size)]
+        if len(self.sizes) == 1:
+            records[0] = {"name": "missing score"}
+        return types.SimpleNamespace(content=json.dumps(records))
+
+
+def batch_generator(llm):
+    generator = fake_generator(llm=llm)
+    generator.template.format = lambda subject, extra: f"Examples of {subject}.\n"
+    return generator
+
+
+def test_batches_split_requests_and_top_up_invalid_records():
+    llm = FakeBatchLLM()
+    records = asyncio.run(engine.agenerate_batched(batch_generator(llm), Record, "malware", "", runs=7, batch_size=3))
+    assert len(records) == 7
+    # 3 + 3 + 1 in the first round, then one record to replace the invalid one
+    assert llm.sizes[:3] == [3, 3, 1] and llm.sizes[3:] == [1]
+
+
+def test_batch_mode_is_selected_by_batch_size():
+    llm = FakeBatchLLM()
+    records = engine.generate(batch_generator(llm), "malware", "", runs=4, batch_size=4, output_schema=Record)
+    assert len(records) == 4
@@ -0,0 +1,40 @@
+import json
+
+from relationship_builder import parse_batch_relationship_response
+
+VALID = {0: ["uses"], 1: ["targets", "uses"], 2: ["indicates"]}
+
+
+def decisions(elements):
+    return parse_batch_relationship_response(json.dumps(elements), VALID)
+
+
+def test_valid_decisions_are_kept():
+    result = decisions([
+        {"pair_id": 0, "relationship_type": "uses", "justification": "j0"},
+        {"pair_id": 1, "relationship_type": "NO_RELATIONSHIP", "justification": "j1"},
+    ])
+    assert result == {
+        0: {"relationship_type": "uses", "justification": "j0"},
+        1: {"relationship_type": "NO_RELATIONSHIP", "justification": "j1"},
+    }
+
+
+def test_invalid_elements_are_left_for_retry():
+    result = decisions([
+        {"pair_id": 0, "relationship_type": "targets"},   # not valid for this pair
+        {"pair_id": 7, "relationship_type": "uses"},      # unknown pair
+        {"pair_id": "x", "relationship_type": "uses"},    # malformed id
+        {"pair_id": 2},                                    # no relationship type
+        "not an object",
+        {"pair_id": "1", "relationship_type": "targets"},
+        {"pair_id": 1, "relationship_type": "uses"},      # repeated pair: first answer wins
+    ])
+    assert result == {1: {"relationship_type": "targets", "justification": None}}
+
+
+def test_code_fences_and_wrapper_objects():
+    content = '```json\n{"decisions": [{"pair_id": 2, "relationship_type": "indicates"}]}\n```'
+    assert parse_batch_relationship_response(content, VALID) == {
+        2: {"relationship_type": "indicates", "justification": None}
+    }
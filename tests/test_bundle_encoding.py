@@ -0,0 +1,48 @@
+import json
+
+import stix2
+
+from stix_bundler import bundle_dict, dumps
+from StixObjectLang import seeding
+
+
+def sample_objects():
+    malware = stix2.Malware(name="OrchidBot", is_family=True, malware_types=["bot"],
+                            kill_chain_phases=[{"kill_chain_name": "lockheed", "phase_name": "delivery"}])
+    tool = stix2.Tool(name="Mimikatz", tool_types=["credential-exploitation"])
+    relationship = stix2.Relationship(malware, "uses", tool, description="drops it")
+    return [malware, tool], [relationship]
+
+
+def test_objects_encode_like_stix2():
+    objects, relationships = sample_objects()
+    for obj in objects + relationships:
+        assert json.loads(dumps(obj)) == json.loads(obj.serialize())
+        # Spec defaults stix2 leaves out (revoked=False, ...) stay out
+        assert b'"revoked"' not in dumps(obj)
+
+
+def test_timestamps_use_the_stix_format():
+    objects, _ = sample_objects()
+    assert json.loads(dumps(objects[0]))["created"] == stix2.utils.format_datetime(objects[0].created)
+
+
+def test_bundle_dict_matches_a_stix2_bundle():
+    objects, relationships = sample_objects()
+    encoded = json.loads(dumps(bundle_dict(objects, relationships, bundle_id="bundle--1")))
+    expected = json.loads(stix2.Bundle(objects=objects + relationships, allow_custom=True).serialize())
+    assert encoded["objects"] == expected["objects"]
+    assert encoded["id"] == "bundle--1"
+
+
+def test_pretty_output_is_opt_in():
+    objects, _ = sample_objects()
+    assert b"\n" not in dumps(objects[0])
+    assert json.loads(dumps(objects[0], pretty=True)) == json.loads(dumps(objects[0]))
+
+
+def test_seeded_bundle_ids_repeat():
+    with seeding.run(3):
+        first = bundle_dict([])["id"]
+    with seeding.run(3):
+        assert bundle_dict([])["id"] == first
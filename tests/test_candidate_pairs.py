@@ -0,0 +1,71 @@
+import types
+from collections import Counter
+
+import numpy as np
+
+from relationship_builder import (
+    VALIDITY_MATRIX,
+    TYPE_INDEX,
+    candidate_pair_arrays,
+    compile_relationship_matrix,
+    enumerate_candidate_pairs,
+    relationship_map,
+)
+
+
+def objects(*counts):
+    return [types.SimpleNamespace(type=stix_type, id=f"{stix_type}--{i}")
+            for stix_type, count in counts for i in range(count)]
+
+
+def test_matrix_matches_relationship_map():
+    stix_types, type_index, matrix = compile_relationship_matrix({"a": {"b": ["uses"], "c": []}})
+    assert stix_types == ["a", "b", "c"]
+    assert matrix[type_index["a"], type_index["b"]] == 1
+    assert matrix[type_index["a"], type_index["c"]] == 0
+    assert matrix[type_index["b"], type_index["a"]] == 0
+
+
+def test_pairs_are_valid_distinct_and_bounded():
+    stix_objects = objects(("threat-actor", 5), ("malware", 7), ("tool", 4), ("identity", 3), ("note", 2))
+    sources, targets = candidate_pair_arrays(stix_objects, max_per_source=3)
+    assert len(sources) == len(targets) > 0
+    for source, target in zip(sources, targets):
+        source_type, target_type = stix_objects[source].type, stix_objects[target].type
+        assert source != target
+        assert relationship_map[source_type][target_type]
+    assert max(Counter(sources.tolist()).values()) <= 3
+    assert len(set(zip(sources.tolist(), targets.tolist()))) == len(sources)
+    assert np.all(np.diff(sources) >= 0)
+
+
+def test_budget_is_filled_when_enough_targets_exist():
+    stix_objects = objects(("threat-actor", 3), ("malware", 10))
+    sources, _ = candidate_pair_arrays(stix_objects, max_per_source=4)
+    counts = Counter(sources.tolist())
+    assert all(counts[i] == 4 for i in range(3))
+
+
+def test_targets_are_spread_across_sources():
+    stix_objects = objects(("threat-actor", 4), ("malware", 8))
+    sources, targets = candidate_pair_arrays(stix_objects, max_per_source=2)
+    actor_targets = [targets[sources == i].tolist() for i in range(4)]
+    # Staggered offsets: the actors do not all spend their budget on the same targets
+    assert len({target for chosen in actor_targets for target in chosen}) > 2
+
+
+def test_types_without_valid_targets_produce_no_pairs():
+    stix_objects = objects(("location", 3))
+    assert not VALIDITY_MATRIX[TYPE_INDEX["location"], TYPE_INDEX["location"]]
+    sources, targets = candidate_pair_arrays(stix_objects, max_per_source=5)
+    assert len(sources) == len(targets) == 0
+
+
+def test_empty_inputs():
+    assert enumerate_candidate_pairs([], 5) == []
+    assert enumerate_candidate_pairs(objects(("malware", 2), ("tool", 2)), 0) == []
+
+
+def test_enumeration_is_deterministic():
+    stix_objects = objects(("campaign", 6), ("malware", 6), ("vulnerability", 6), ("report", 3))
+    assert enumerate_candidate_pairs(stix_objects, 4) == enumerate_candidate_pairs(stix_objects, 4)
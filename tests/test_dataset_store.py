@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from dataset_store import DatasetQuery, DatasetStore, decode_cursor, encode_cursor
+
+
+def malware(i, **properties):
+    return {"type": "malware", "spec_version": "2.1", "id": f"malware--{i:08d}-0000-4000-8000-000000000000",
+            "created": f"2024-01-01T00:00:{i:02d}.000Z", "modified": f"2024-01-01T00:00:{i:02d}.000Z",
+            "name": f"Malware {i}", "is_family": False, **properties}
+
+
+def relationship(i, source_ref, target_ref):
+    return {"type": "relationship", "spec_version": "2.1", "id": f"relationship--{i:08d}-0000-4000-8000-000000000000",
+            "created": f"2024-01-01T00:01:{i:02d}.000Z", "modified": f"2024-01-01T00:01:{i:02d}.000Z",
+            "relationship_type": "related-to", "source_ref": source_ref, "target_ref": target_ref}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DatasetStore(str(tmp_path / "dataset.sqlite3"))
+
+
+def names(payloads):
+    return [json.loads(payload).get("name") for payload in payloads]
+
+
+def test_filters_combine(store):
+    objects = [malware(0, malware_types=["ransomware", "worm"]), malware(1, malware_types=["worm"]),
+               malware(2, is_family=True), malware(3)]
+    run_id = store.save_run(objects, [relationship(0, objects[0]["id"], objects[1]["id"])])
+
+    def query(**filters):
+        return names(store.query(DatasetQuery(**filters))[0])
+
+    assert query(types=["malware"], properties={"malware_types": "ransomware"}) == ["Malware 0"]
+    assert query(properties={"malware_types": "worm"}) == ["Malware 0", "Malware 1"]
+    assert query(properties={"is_family": "true"}) == ["Malware 2"]
+    assert query(name_prefix="Malware", created_after="2024-01-01T00:00:01.000Z",
+                 created_before="2024-01-01T00:00:03.000Z") == ["Malware 1", "Malware 2"]
+    assert query(ref=objects[1]["id"], run_id=run_id) == [None]
+    assert query(run_id="no-such-run") == []
+
+
+def test_where_uses_placeholders_for_every_value():
+    where, params = DatasetQuery(types=["malware", "tool"], name="x'; DROP TABLE stix_objects; --").where()
+    assert where == " WHERE type IN (?, ?) AND name = ?"
+    assert params == ["malware", "tool", "x'; DROP TABLE stix_objects; --"]
+    assert DatasetQuery().where() == ("", [])
+    with pytest.raises(ValueError):
+        DatasetQuery(properties={"name) OR (1": "x"})
+
+
+def test_cursor_pages_cover_every_object_once(store):
+    store.save_run([malware(i) for i in range(7)])
+    seen, cursor = [], None
+    while True:
+        payloads, cursor = store.query(cursor=cursor, limit=3)
+        seen += names(payloads)
+        if cursor is None:
+            break
+    assert seen == [f"Malware {i}" for i in range(7)]
+    assert names(store.iter_payloads(page_size=2)) == seen
+    with pytest.raises(ValueError):
+        store.query(cursor="not a cursor")
+    assert decode_cursor(encode_cursor(["2024", "malware--x", "run"])) == ("2024", "malware--x", "run")
+
+
+def test_a_seeded_rerun_keeps_the_earlier_runs_objects(store):
+    first = store.save_run([malware(0), malware(1)])
+    second = store.save_run([malware(0, description="rerun")])
+    assert len(store.query(DatasetQuery(run_id=first))[0]) == 2
+    assert json.loads(store.get(malware(0)["id"], first)).get("description") is None
+    assert json.loads(store.get(malware(0)["id"]))["description"] == "rerun"
+    # Both runs' copies page through in a stable order
+    query = DatasetQuery(name="Malware 0")
+    payloads, cursor = store.query(query, limit=1)
+    rest, cursor = store.query(query, cursor, limit=1)
+    assert len(payloads + rest) == 2 and payloads != rest
+    assert store.query(query, cursor, limit=1) == ([], None)
+    assert store.stats()["objects_by_type"] == {"malware": 3}
+    assert store.get_run(second)["objects"] == 1
+
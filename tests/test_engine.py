@@ -0,0 +1,90 @@
+import asyncio
+import json
+import types
+
+import pytest
+from langchain_core.pydantic_v1 import BaseModel
+
+from StixObjectLang import engine
+
+
+class Record(BaseModel):
+    name: str
+    score: int
+
+
+class FakeChain:
+    """
+    Stands in for the generator's LLM chain: returns one Record per call, fails the runs
+    listed in `fail`, and tracks how many calls are in flight at once.
+    """
+
+    def __init__(self, fail=(), delay=0.01):
+        self.fail = set(fail)
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def arun(self, subject, extra):
+        index = self.calls
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later runs finish first, so results only come back in run order if the engine orders them
+            await asyncio.sleep(self.delay / (index + 1))
+            if index in self.fail:
+                raise RuntimeError(f"run {index} failed")
+            return Record(name=f"{subject}-{index}", score=index)
+        finally:
+            self.in_flight -= 1
+
+
+def fake_generator(chain=None, llm=None):
+    template = types.SimpleNamespace(example_selector=None, examples=[])
+    generator = types.SimpleNamespace(
+        llm_chain=chain or types.SimpleNamespace(llm=llm),
+        template=template,
+        example_input_key="example",
+    )
+    generator._update_examples = lambda result: template.examples.append({"example": json.dumps(result.dict())})
+    return generator
+
+
+def test_generate_returns_records_in_run_order():
+    chain = FakeChain()
+    results = engine.generate(fake_generator(chain), "malware", "", runs=6, max_concurrency=3)
+    assert [record.score for record in results] == list(range(6))
+
+
+def test_generate_bounds_requests_in_flight():
+    chain = FakeChain()
+    engine.generate(fake_generator(chain), "malware", "", runs=10, max_concurrency=2)
+    assert chain.calls == 10
+    assert chain.max_in_flight == 2
+
+
+def test_failed_runs_are_dropped():
+    chain = FakeChain(fail={1, 3})
+    results = engine.generate(fake_generator(chain), "malware", "", runs=5)
+    assert [record.score for record in results] == [0, 2, 4]
+
+
+def test_all_runs_failing_raises():
+    with pytest.raises(RuntimeError):
+        engine.generate(fake_generator(FakeChain(fail=range(3))), "malware", "", runs=3)
+
+
+def test_generate_inside_running_event_loop():
+    async def caller():
+        return engine.generate(fake_generator(FakeChain()), "malware", "", runs=2)
+
+    assert len(asyncio.run(caller())) == 2
+
+
+def test_generated_records_extend_the_few_shot_window_with_escaped_braces():
+    generator = fake_generator(FakeChain())
+    engine.generate(generator, "malware", "", runs=2)
+    assert len(generator.template.examples) == 2
+    assert all("{{" in example["example"] for example in generator.template.examples)
@@ -0,0 +1,55 @@
+import stix2
+
+import app
+import fast_stix
+import generation_scheduler
+from stix_bundler import dumps
+from StixObjectLang import seeding
+
+MALWARE = {"name": "OrchidBot", "is_family": True, "malware_types": ["bot"], "description": "Loader"}
+
+
+def test_records_serialize_like_stix2_objects(monkeypatch):
+    monkeypatch.setattr(fast_stix, "VALIDATION_MODE", "full")
+    with seeding.run(1):
+        record = fast_stix.build(stix2.Malware, **MALWARE)
+    assert dumps(record) == dumps(stix2.Malware(**record))
+    assert record.name == "OrchidBot"
+
+
+def test_sampled_validation_follows_the_seed_without_changing_objects(monkeypatch):
+    checked = []
+    monkeypatch.setattr(fast_stix, "validate", lambda record: checked.append(record["id"]))
+    monkeypatch.setattr(fast_stix, "VALIDATION_SAMPLE_RATE", 0.5)
+    runs = []
+    for mode in ("sample", "sample", "none"):
+        monkeypatch.setattr(fast_stix, "VALIDATION_MODE", mode)
+        checked.clear()
+        with seeding.run(7):
+            records = [fast_stix.build(stix2.Malware, **MALWARE) for _ in range(40)]
+            ids = [seeding.new_id("malware") for _ in range(3)] + [seeding.rng.random()]
+        runs.append((dumps(records), ids, list(checked)))
+    assert runs[0] == runs[1]
+    assert 0 < len(runs[0][2]) < 40
+    # Sampling draws from its own stream, so the objects match a run that validates nothing
+    assert runs[2][:2] == runs[0][:2]
+
+
+def test_deferred_validation_reports_failures_from_the_shared_pool():
+    with seeding.run(1):
+        records = [fast_stix.build(stix2.Malware, **MALWARE) for _ in range(6)]
+    records[4] = dict(records[4], name=5)
+    errors = fast_stix.validate_records(records, chunk_size=2)
+    assert [object_id for object_id, _ in errors] == [records[4]["id"]]
+    assert generation_scheduler._process_pool is not None
+
+
+def test_generate_graph_reports_deferred_validation(monkeypatch):
+    monkeypatch.setattr(fast_stix, "OBJECT_MODE", "fast")
+    monkeypatch.setattr(fast_stix, "VALIDATION_MODE", "deferred")
+    response = app.app.test_client().post("/generate-graph", data={
+        "malware-count": "3", "tool-count": "2", "backend": "faker", "relationship-engine": "rules",
+        "seed": "1", "persist": "0",
+    })
+    assert response.status_code == 200, response.json
+    assert response.json["validation"] == {"checked": 5, "failed": 0, "errors": []}
@@ -0,0 +1,65 @@
+import pytest
+
+from StixObjectLang import few_shot, registry, seeding
+
+
+class RecordingSelector(few_shot.CorpusExampleSelector):
+    def rank(self, texts, vectors, query):
+        self.queries.append(query)
+        return list(range(len(texts)))
+
+
+def test_the_base_selector_is_abstract():
+    with pytest.raises(TypeError):
+        few_shot.CorpusExampleSelector([{"example": "x"}])
+
+
+@pytest.mark.parametrize("stix_type", sorted(registry.GENERATOR_MODULES))
+def test_every_type_has_a_corpus_worth_selecting_from(stix_type):
+    corpus = few_shot.load_corpus(stix_type)
+    assert len(corpus) >= 15
+    assert all(example["example"].startswith(f"Type: {stix_type}") for example in corpus)
+
+
+def test_the_query_follows_the_latest_generated_records():
+    selector = RecordingSelector(few_shot.load_corpus("malware"), k=2)
+    selector.queries = []
+    selector.select_examples({"input": "Generate a malware object"})
+    selector.add_example({"example": "Type: malware, Name: FirstBot"})
+    selector.select_examples({"input": "Generate a malware object"})
+    for name in ("SecondBot", "ThirdBot"):
+        selector.add_example({"example": f"Type: malware, Name: {name}"})
+    selector.select_examples({"input": "Generate a malware object"})
+    assert selector.queries[0] == "Generate a malware object"
+    assert selector.queries[1].endswith("FirstBot")
+    assert "FirstBot" not in selector.queries[2]
+    assert "SecondBot" in selector.queries[2] and "ThirdBot" in selector.queries[2]
+
+
+def test_mmr_picks_stay_within_k_and_the_token_budget():
+    selector = few_shot.build_selector("tool", "mmr", k=3, token_budget=200)
+    examples = selector.select_examples({"input": "credential dumping"})
+    assert 1 <= len(examples) <= 3
+    assert sum(few_shot.estimate_tokens(example["example"]) for example in examples) <= 200
+
+
+def test_mmr_follows_the_seed_and_varies_with_recent_records():
+    def picks(recent=()):
+        selector = few_shot.build_selector("malware", "mmr", k=3)
+        for text in recent:
+            selector.add_example({"example": text})
+        with seeding.run(11):
+            return [example["example"] for example in selector.select_examples({"input": "malware"})]
+
+    assert picks() == picks()
+    ransomware = ["Type: malware, Name: CryptoHold, Malware Types: [ransomware], Description: ransomware "
+                  "that encrypts files and deletes shadow copies before demanding a ransom"] * 2
+    assert picks(ransomware) != picks()
+
+
+def test_all_selector_returns_every_example_with_escaped_braces():
+    selector = few_shot.build_selector("vulnerability", "all")
+    selector.add_example({"example": "Type: vulnerability, Name: {x}"})
+    examples = selector.select_examples({})
+    assert len(examples) == len(few_shot.load_corpus("vulnerability")) + 1
+    assert examples[-1]["example"].endswith("{{x}}")
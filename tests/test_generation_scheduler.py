@@ -0,0 +1,90 @@
+import pytest
+
+import app
+import generation_scheduler as scheduler
+from stix_bundler import dumps
+from StixObjectLang import seeding
+
+TYPES = ("threat-actor", "malware", "tool", "identity", "indicator", "report", "note", "vulnerability")
+
+
+def generate(counts, seed=3):
+    backends = {object_type: "faker" for object_type in counts}
+    by_type = {}
+    with seeding.run(seed):
+        for object_type, objects, error in scheduler.iter_scheduled_objects(counts, backends):
+            assert error is None
+            by_type[object_type] = objects
+    return dumps([obj for object_type in scheduler.OBJECT_TYPES for obj in by_type.get(object_type, ())])
+
+
+def shutdown_pool():
+    # Not monkeypatched: restoring the old pool would hand later tests a shut-down executor
+    if scheduler._process_pool is not None:
+        scheduler._process_pool.shutdown()
+        scheduler._process_pool = None
+
+
+def restart_pool(monkeypatch, workers):
+    shutdown_pool()
+    monkeypatch.setattr(scheduler, "PROCESS_WORKERS", workers)
+
+
+@pytest.fixture
+def processes(monkeypatch):
+    monkeypatch.setattr(scheduler, "EXECUTION_MODE", "processes")
+    monkeypatch.setattr(scheduler, "SHARD_SIZE", 10)
+    yield
+    shutdown_pool()
+
+
+def test_dependencies_wait_only_for_requested_referenced_types():
+    requested = {"malware": 1, "tool": 1, "note": 1, "opinion": 1, "identity": 1}
+    assert scheduler.dependencies("note", requested) == ("malware", "tool")
+    assert scheduler.dependencies("vulnerability", requested) == ("identity",)
+    assert scheduler.dependencies("attack-pattern", requested) == ()
+    # Types that need references fall back to every requested phase-one type
+    assert scheduler.dependencies("report", {"identity": 1, "report": 1}) == ("identity",)
+
+
+def test_unknown_types_are_rejected():
+    with pytest.raises(ValueError):
+        list(scheduler.iter_scheduled_objects({"x-custom": 1}))
+
+
+def test_seeded_threads_runs_are_byte_identical(monkeypatch):
+    monkeypatch.setattr(scheduler, "EXECUTION_MODE", "threads")
+    counts = {object_type: 12 for object_type in TYPES}
+    assert generate(counts) == generate(counts)
+    assert generate(counts) != generate(counts, seed=4)
+
+
+def test_seeded_processes_runs_are_byte_identical_whatever_the_worker_count(monkeypatch, processes):
+    counts = {object_type: 25 for object_type in TYPES}
+    restart_pool(monkeypatch, 1)
+    first = generate(counts)
+    restart_pool(monkeypatch, 3)
+    assert generate(counts) == first
+    assert generate(counts) == first
+
+
+def test_sharded_objects_reference_the_parent_pool(monkeypatch, processes):
+    restart_pool(monkeypatch, 2)
+    with seeding.run(1):
+        tools = scheduler.create_objects("tool", 5, "faker")
+        notes = scheduler.create_objects("note", 30, "faker", tools)
+    assert len(notes) == 30
+    tool_ids = {tool.id for tool in tools}
+    assert all(set(note["object_refs"]) <= tool_ids for note in notes)
+
+
+@pytest.mark.parametrize("mode", ["threads", "processes"])
+def test_seeded_generate_graph_responses_repeat(monkeypatch, processes, mode):
+    monkeypatch.setattr(scheduler, "EXECUTION_MODE", mode)
+    form = {f"{object_type}-count": "15" for object_type in TYPES}
+    form.update({"backend": "faker", "relationship-engine": "rules", "seed": "8", "persist": "0"})
+    client = app.app.test_client()
+    bodies = [client.post("/generate-graph", data=form).json for _ in range(2)]
+    assert bodies[0]["stix_bundle"]["objects"]
+    assert dumps(bodies[0]["stix_bundle"]) == dumps(bodies[1]["stix_bundle"])
+    assert bodies[0]["story"] == bodies[1]["story"]
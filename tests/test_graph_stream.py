@@ -0,0 +1,79 @@
+import json
+
+import app
+
+FORM = {"malware-count": "3", "tool-count": "2", "threat-actor-count": "2", "backend": "faker",
+        "relationship-engine": "rules", "persist": "0", "seed": "5"}
+
+
+def post(form=FORM, **kwargs):
+    response = app.app.test_client().post("/generate-graph/stream", data=form, **kwargs)
+    assert response.status_code == 200
+    return response
+
+
+def ndjson_events(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def sse_events(response):
+    events = []
+    for message in response.get_data(as_text=True).split("\n\n"):
+        if not message:
+            continue
+        event_line, data_line = message.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append({"event": event_line[len("event: "):], "data": json.loads(data_line[len("data: "):])})
+    return events
+
+
+def test_ndjson_events_follow_the_pipeline():
+    response = post()
+    assert response.mimetype == "application/x-ndjson"
+    events = ndjson_events(response)
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "start" and kinds[-1] == "done"
+    stages = [event["data"]["stage"] for event in events if event["event"] == "stage"]
+    assert stages == ["objects", "relationships", "story", "evaluation"]
+    # Every object comes before the relationships stage, every relationship after it
+    relationships_stage = kinds.index("stage", kinds.index("object"))
+    assert kinds.count("object") == 7 and "object" not in kinds[relationships_stage:]
+    assert "relationship" not in kinds[:relationships_stage]
+    assert kinds.index("story") < kinds.index("evaluation") < kinds.index("done")
+    assert "error" not in kinds and "dataset" not in kinds
+    done = events[-1]["data"]
+    assert (done["objects"], done["relationships"]) == (7, kinds.count("relationship"))
+    assert done["metrics"]["stages"]["objects"]["count"] == 1
+    assert events[0]["data"]["bundle_id"].startswith("bundle--")
+
+
+def test_sse_is_used_for_format_sse_or_an_event_stream_accept_header():
+    # Each streamed response is read before the next request is made
+    for form, headers in ((dict(FORM, format="sse"), {}), (FORM, {"Accept": "text/event-stream"})):
+        response = post(form, headers=headers)
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+        events = sse_events(response)
+        assert events[0]["event"] == "start" and events[-1]["event"] == "done"
+        assert {event["data"]["type"] for event in events if event["event"] == "object"} == {
+            "malware", "tool", "threat-actor"}
+
+
+def test_seeded_streams_repeat():
+    first, second = (ndjson_events(post()) for _ in range(2))
+    # Object types stream in the order their threads finish, and the closing metrics hold timings
+    assert sorted(map(json.dumps, first[:-1])) == sorted(map(json.dumps, second[:-1]))
+
+
+def test_an_error_mid_stream_is_reported_before_done(monkeypatch):
+    def failing_story(stix_objects, engine=None):
+        yield "relationship", {"type": "relationship", "id": "relationship--x"}
+        raise RuntimeError("engine failed")
+
+    monkeypatch.setattr(app, "stream_stix_story", failing_story)
+    events = ndjson_events(post())
+    kinds = [event["event"] for event in events]
+    assert kinds[-2:] == ["error", "done"]
+    assert events[-2]["data"] == {"message": "engine failed"}
+    assert "relationship" in kinds and "story" not in kinds
+    assert events[-1]["data"]["relationships"] == 1
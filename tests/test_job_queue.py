@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+
+import pytest
+
+from job_queue import JobManager, JobStore
+from StixObjectLang import cancellation
+
+
+def wait_for(store, job_id, statuses=("completed", "failed", "cancelled"), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is still {store.get(job_id)['status']}")
+
+
+def pipeline(params):
+    yield "stage", {"stage": "objects"}
+    for i in range(params["objects"]):
+        yield "object", {"type": "malware", "id": f"malware--{i}"}
+    yield "stage", {"stage": "relationships"}
+    yield "relationship", {"type": "relationship", "id": "relationship--0"}
+    yield "stage", {"stage": "story"}
+    yield "story", {"delta": "Once "}
+    yield "story", {"delta": "upon a time."}
+    yield "stage", {"stage": "evaluation"}
+    yield "evaluation", {"score": 7, "justification": "fine"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_completed_job_records_progress_items_story_and_evaluation(store):
+    manager = JobManager(pipeline, store, max_workers=1)
+    job = wait_for(store, manager.submit({"objects": 3}))
+    assert job["status"] == "completed"
+    assert job["progress"]["objects"] == {"status": "completed", "count": 3}
+    assert job["progress"]["story"]["count"] == len("Once upon a time.")
+    assert job["story"] == "Once upon a time."
+    assert job["evaluation"] == {"score": 7, "justification": "fine"}
+    kinds = [kind for kind, _ in store.items(job["id"])]
+    assert kinds == ["object"] * 3 + ["relationship"]
+    manager.shutdown()
+
+
+def test_items_page_and_filter_by_kind(store):
+    manager = JobManager(pipeline, store, max_workers=1)
+    job_id = wait_for(store, manager.submit({"objects": 5}))["id"]
+    page = store.items(job_id, offset=2, limit=2)
+    assert [json.loads(payload)["id"] for _, payload in page] == ["malware--2", "malware--3"]
+    assert [kind for kind, _ in store.items(job_id, kind="relationship")] == ["relationship"]
+    assert len(list(store.iter_payloads(job_id, page_size=2))) == 6
+    manager.shutdown()
+
+
+def test_failing_pipeline_marks_the_job_failed(store):
+    def broken(params):
+        yield "stage", {"stage": "objects"}
+        raise RuntimeError("boom")
+
+    manager = JobManager(broken, store, max_workers=1)
+    job = wait_for(store, manager.submit({}))
+    assert (job["status"], job["error"]) == ("failed", "boom")
+    assert job["progress"]["objects"]["status"] == "failed"
+    manager.shutdown()
+
+
+def test_cancel_stops_a_running_job_before_its_next_llm_call(store):
+    started = threading.Event()
+
+    def slow(params):
+        yield "stage", {"stage": "objects"}
+        started.set()
+        while True:
+            cancellation.check()
+            time.sleep(0.01)
+            yield "object", {"type": "malware", "id": "malware--x"}
+
+    manager = JobManager(slow, store, max_workers=1)
+    job_id = manager.submit({})
+    assert started.wait(5)
+    manager.cancel(job_id)
+    assert wait_for(store, job_id)["status"] == "cancelled"
+    manager.shutdown()
+
+
+def test_queued_job_is_cancelled_without_running(store):
+    release = threading.Event()
+
+    def blocking(params):
+        release.wait(5)
+        yield "stage", {"stage": "objects"}
+
+    manager = JobManager(blocking, store, max_workers=1)
+    first = manager.submit({})
+    second = manager.submit({})
+    assert manager.cancel(second)["status"] == "cancelled"
+    release.set()
+    wait_for(store, first)
+    assert store.get(second)["status"] == "cancelled"
+    manager.shutdown()
+
+
+def test_unfinished_jobs_fail_on_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job_id = JobStore(path).create({})
+    JobManager(pipeline, JobStore(path), max_workers=1).shutdown()
+    job = JobStore(path).get(job_id)
+    assert job["status"] == "failed"
+    assert "restart" in job["error"]
@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+import app
+from StixObjectLang import metrics
+
+
+def scrape():
+    response = app.app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    return response.get_data(as_text=True)
+
+
+def sample(text, line_prefix):
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", text, re.MULTILINE)
+    assert match, f"no sample {line_prefix}"
+    return float(match.group(1))
+
+
+def test_metrics_endpoint_renders_the_prometheus_text_format():
+    with metrics.request_summary() as summary:
+        with metrics.stage("metrics-test"):
+            pass
+        with pytest.raises(KeyError):
+            with metrics.stage("metrics-test-failure"):
+                raise KeyError("x")
+        metrics.record_llm_call("metrics-test-model", 0.3, "ok", {"prompt_tokens": 12, "completion_tokens": 5})
+    text = scrape()
+
+    for name, kind in (("stix_gen_stage_duration_seconds", "histogram"), ("stix_gen_llm_calls_total", "counter"),
+                       ("stix_gen_llm_tokens_total", "counter"), ("stix_gen_failures_total", "counter")):
+        assert f"# TYPE {name} {kind}\n" in text
+    stage = 'stix_gen_stage_duration_seconds_bucket{stage="metrics-test",object_type=""'
+    assert sample(text, stage + ',le="0.005"}') >= 1
+    assert sample(text, stage + ',le="+Inf"}') >= 1
+    assert sample(text, 'stix_gen_stage_duration_seconds_count{stage="metrics-test",object_type=""}') >= 1
+    assert sample(text, 'stix_gen_stage_duration_seconds_sum{stage="metrics-test",object_type=""}') >= 0
+    assert sample(text, 'stix_gen_llm_call_duration_seconds_bucket{model="metrics-test-model",le="0.25"}') == 0
+    assert sample(text, 'stix_gen_llm_call_duration_seconds_bucket{model="metrics-test-model",le="0.5"}') >= 1
+    assert sample(text, 'stix_gen_llm_calls_total{model="metrics-test-model",outcome="ok"}') >= 1
+    assert sample(text, 'stix_gen_llm_tokens_total{model="metrics-test-model",kind="prompt"}') >= 12
+    assert sample(text, 'stix_gen_llm_tokens_total{model="metrics-test-model",kind="completion"}') >= 5
+    assert sample(text, 'stix_gen_failures_total{stage="metrics-test-failure",error="KeyError"}') >= 1
+
+    assert summary.to_dict()["llm"]["metrics-test-model"]["prompt_tokens"] == 12
+    assert summary.to_dict()["failures"] == {"metrics-test-failure": {"KeyError": 1}}
+
+
+def test_replayed_calls_spend_no_tokens():
+    metrics.record_llm_call("metrics-replay-model", 0.01, "replayed", {"prompt_tokens": 12})
+    text = scrape()
+    assert sample(text, 'stix_gen_llm_calls_total{model="metrics-replay-model",outcome="replayed"}') >= 1
+    assert 'stix_gen_llm_tokens_total{model="metrics-replay-model"' not in text
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("escaped_total", "Escaping", ("name",))
+    counter.inc(name='a "quoted"\nvalue\\')
+    assert counter.samples() == ['escaped_total{name="a \\"quoted\\"\\nvalue\\\\"} 1']
+
+
+def test_generate_graph_returns_the_request_summary():
+    response = app.app.test_client().post("/generate-graph", data={
+        "malware-count": "3", "tool-count": "2", "backend": "faker", "relationship-engine": "rules", "persist": "0",
+    })
+    assert response.status_code == 200
+    summary = response.json["metrics"]
+    assert summary["total_seconds"] > 0
+    assert {"objects", "create:malware", "create:tool", "relationships", "bundle"} <= set(summary["stages"])
+    assert summary["stages"]["objects"]["count"] == 1
+    assert summary["failures"] == {}
+    assert sample(scrape(), 'stix_gen_stage_duration_seconds_count{stage="bundle",object_type=""}') >= 1
@@ -0,0 +1,133 @@
+import json
+import types
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from mock_llm_server import MockConfig, create_app
+from prompt_encoding import PromptEncoder
+from relationship_builder import (STIXRelationshipAgent, create_batch_relationship_prompt, create_story_prompt,
+                                  story_inputs)
+from StixObjectLang import engine, registry, seeding
+
+
+@pytest.fixture
+def client():
+    return create_app(MockConfig(seed=0)).test_client()
+
+
+def chat(client, content, **body):
+    response = client.post("/v1/chat/completions", json={"model": "gpt-4o", **body,
+                                                         "messages": [{"role": "user", "content": content}]})
+    assert response.status_code == 200
+    return response
+
+
+class MockChat(FakeListChatModel):
+    """
+    Sends each prompt the agent builds to the mock server, so prompt wording drift shows up here.
+    """
+    responses: list = ["unused"]
+    model_name: str = "mock"
+    client: object = None
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        body = chat(self.client, messages[-1].content).json
+        return body["choices"][0]["message"]["content"]
+
+
+def make_objects():
+    names = [("threat-actor", "APT Mock"), ("malware", "Loader"), ("tool", "Dropper"), ("identity", "Bank")]
+    return [types.SimpleNamespace(type=stix_type, id=f"{stix_type}--0000000{i}-0000-4000-8000-000000000000",
+                                  name=name, description="test object")
+            for i, (stix_type, name) in enumerate(names)]
+
+
+def test_function_calls_return_a_record_of_the_schema_type(client):
+    # The functions the malware generator sends, as built by its LLM chain
+    functions = registry.get_generator("malware").llm_chain.llm_kwargs["functions"]
+    message = chat(client, "Generate malware.", functions=functions).json["choices"][0]["message"]
+    arguments = json.loads(message["function_call"]["arguments"])
+    record = registry.get_schema("malware").parse_obj(arguments["output"])
+    assert record.type == "malware"
+    tools = [{"type": "function", "function": function} for function in functions]
+    response = chat(client, "Generate malware.", tools=tools).json
+    assert response["choices"][0]["finish_reason"] == "tool_calls"
+
+
+def test_batch_prompts_return_the_requested_number_of_records(client):
+    generator = registry.get_generator("tool")
+    prompt = engine.build_batch_prompt(generator, registry.get_schema("tool"), "tool", "", 3)
+    content = chat(client, prompt).json["choices"][0]["message"]["content"]
+    records = engine.parse_batch_response(content, registry.get_schema("tool"))
+    assert len(records) == 3 and {record.type for record in records} == {"tool"}
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_the_agent_prompts_are_answered(client, batch_size):
+    agent = STIXRelationshipAgent(use_cache=False, batch_size=batch_size, max_concurrency=2)
+    agent.llm = MockChat(client=client)
+    objects = make_objects()
+    with seeding.run(1):
+        relationships = agent.generate_relationships(objects)
+        story = agent.analyze_story(relationships)
+        evaluation = agent.evaluate_performance(relationships, story)
+    stats = client.get("/mock/stats").json
+    kind = "kind:relationship_batch" if batch_size > 1 else "kind:relationship"
+    # Every pair got a decision from the mock, not from the single-pair fallback
+    assert stats[kind] >= 1 and stats.get("kind:other", 0) == 0
+    assert relationships
+    assert story.startswith(f"The activity centres on {len(relationships)} relationships")
+    assert 5 <= evaluation["score"] <= 9
+
+
+def test_batched_relationship_prompts_get_one_decision_per_pair(client):
+    agent = STIXRelationshipAgent(use_cache=False, batch_size=4)
+    objects = make_objects()
+    pairs = [(objects[0], objects[1], ["uses"]), (objects[1], objects[2], ["uses", "drops"]),
+             (objects[2], objects[3], ["targets"])]
+    seen = []
+
+    class Chain:
+        def invoke(self, inputs):
+            content = chat(client, create_batch_relationship_prompt().format(**inputs)).json[
+                "choices"][0]["message"]["content"]
+            seen.extend(json.loads(content))
+            return types.SimpleNamespace(content=content)
+
+    decisions = agent._classify_batch(Chain(), PromptEncoder(objects), pairs)
+    assert sorted(decision["pair_id"] for decision in seen) == [0, 1, 2]
+    assert set(decisions) == {0, 1, 2}
+
+
+def test_story_prompts_stream_in_chunks(client):
+    objects = make_objects()
+    relationships = [types.SimpleNamespace(source_ref=objects[0].id, target_ref=objects[1].id,
+                                           relationship_type="uses", description="because")]
+    prompt = create_story_prompt().format(**story_inputs(relationships, PromptEncoder(objects)))
+    story = chat(client, prompt).json["choices"][0]["message"]["content"]
+    assert story.startswith("The activity centres on 1 relationships")
+
+    response = chat(client, prompt, stream=True)
+    assert response.mimetype == "text/event-stream"
+    messages = [line[len("data: "):] for line in response.get_data(as_text=True).split("\n\n") if line]
+    assert messages[-1] == "[DONE]"
+    chunks = [json.loads(message)["choices"][0] for message in messages[:-1]]
+    assert "".join(chunk["delta"].get("content", "") for chunk in chunks) == story
+    assert chunks[-1]["finish_reason"] == "stop"
+
+
+def test_injected_faults_and_config(client):
+    assert client.post("/mock/config", json={"error_rate": 1}).status_code == 200
+    response = client.post("/v1/chat/completions", json={"messages": [{"role": "user", "content": "hi"}]})
+    assert response.status_code == 500 and response.json["error"]["type"] == "server_error"
+
+    client.post("/mock/config", json={"error_rate": 0, "rpm": 1, "retry_after": 2})
+    client.post("/mock/reset")
+    assert chat(client, "hi").status_code == 200
+    response = client.post("/v1/chat/completions", json={"messages": [{"role": "user", "content": "hi"}]})
+    assert response.status_code == 429 and response.headers["Retry-After"] == "2"
+    assert client.get("/mock/stats").json["rate_limited"] == 1
+
+    response = client.post("/mock/config", json={"latency": 5})
+    assert response.status_code == 400 and "latency" in response.json["error"]
@@ -0,0 +1,82 @@
+import random
+from collections import Counter
+
+import pytest
+
+from object_pool import ObjectPool
+
+
+def make_objects(counts):
+    return [{"type": stix_type, "id": f"{stix_type}--{i}"} for stix_type, n in counts.items() for i in range(n)]
+
+
+def test_objects_are_indexed_once_by_id_and_type():
+    objects = make_objects({"malware": 3, "tool": 2})
+    pool = ObjectPool(objects + objects[:2])
+    assert len(pool) == 5
+    assert pool.types() == ["malware", "tool"]
+    assert pool.count("tool") == 2
+    assert pool.count(["tool", "identity"]) == 2
+    assert pool.get("malware--1") is objects[1]
+    assert "tool--9" not in pool
+
+
+def test_of_reuses_an_existing_pool():
+    pool = ObjectPool(make_objects({"tool": 1}))
+    assert ObjectPool.of(pool) is pool
+    assert len(ObjectPool.of(None)) == 0
+
+
+def test_samples_are_distinct_ids_of_the_requested_types():
+    pool = ObjectPool(make_objects({"malware": 50, "tool": 50, "identity": 5}), rng=random.Random(1))
+    ids = pool.sample_ids(30, ["malware", "identity"])
+    assert len(set(ids)) == 30
+    assert {object_id.split("--")[0] for object_id in ids} <= {"malware", "identity"}
+    # Asking for more than there is returns everything once
+    assert sorted(pool.sample_ids(10, "identity")) == sorted(f"identity--{i}" for i in range(5))
+
+
+def test_sampling_without_candidates_is_an_error():
+    pool = ObjectPool(make_objects({"malware": 2}))
+    with pytest.raises(ValueError, match="tool"):
+        pool.sample_ids(1, "tool")
+
+
+def test_the_same_rng_state_draws_the_same_ids():
+    objects = make_objects({"malware": 100, "tool": 100})
+    for skew in (0, 1.2):
+        first = ObjectPool(objects, skew=skew, rng=random.Random(3)).sample_ids(20)
+        assert ObjectPool(objects, skew=skew, rng=random.Random(3)).sample_ids(20) == first
+
+
+def test_uniform_sampling_covers_types_in_proportion():
+    pool = ObjectPool(make_objects({"malware": 300, "tool": 100}), rng=random.Random(0))
+    draws = Counter(object_id.split("--")[0] for _ in range(200) for object_id in pool.sample_ids(4))
+    assert 0.65 < draws["malware"] / 800 < 0.85
+
+
+def test_skew_favours_the_first_objects_of_each_type():
+    pool = ObjectPool(make_objects({"malware": 200}), skew=1.5, rng=random.Random(0))
+    draws = Counter(object_id for _ in range(500) for object_id in pool.sample_ids(1))
+    assert draws["malware--0"] > 100
+    assert draws["malware--0"] > 5 * draws.get("malware--20", 0)
+
+
+def test_explicit_weights_and_near_exhaustive_weighted_draws():
+    pool = ObjectPool(rng=random.Random(0))
+    for i, obj in enumerate(make_objects({"tool": 10})):
+        pool.add(obj, weight=1000.0 if i == 0 else 0.001)
+    assert pool.weighted
+    # k close to the candidate count falls back to weighted keys and still returns k distinct ids
+    assert sorted(pool.sample_ids(10, "tool")) == sorted(f"tool--{i}" for i in range(10))
+    with pytest.raises(ValueError):
+        pool.add({"type": "tool", "id": "tool--x"}, weight=0)
+
+
+def test_ids_only_copy_samples_like_the_original():
+    objects = [dict(obj, name="x" * 100) for obj in make_objects({"malware": 40, "tool": 40})]
+    pool = ObjectPool(objects, skew=1.0, rng=random.Random(4))
+    copy = pool.ids_only()
+    copy.rng = random.Random(4)
+    assert copy.get("tool--3") == {"type": "tool", "id": "tool--3"}
+    assert copy.sample_ids(15, "malware") == pool.sample_ids(15, "malware")
@@ -0,0 +1,26 @@
+import pytest
+
+from StixObjectLang import offline, registry
+
+
+@pytest.mark.parametrize("stix_type", sorted(registry.GENERATOR_MODULES))
+def test_records_validate_against_the_llm_schema(stix_type):
+    schema = registry.get_schema(stix_type)
+    records = offline.generate(stix_type, 5)
+    assert len(records) == 5
+    for record in records:
+        # Records are built with construct(); a full parse must accept them unchanged
+        assert schema.parse_obj(record.dict()) == record
+        assert record.id.startswith(f"{stix_type}--")
+
+
+def test_ids_are_unique():
+    records = offline.generate("malware", 200)
+    assert len({record.id for record in records}) == 200
+
+
+def test_values_come_from_the_stix_vocabularies():
+    for record in offline.generate("malware", 50):
+        assert set(record.malware_types) <= set(offline.MALWARE_TYPES)
+    for record in offline.generate("identity", 50):
+        assert record.identity_class in offline.IDENTITY_CLASSES
@@ -0,0 +1,68 @@
+import json
+import types
+
+from prompt_encoding import PromptEncoder
+
+
+def make(stix_type, i, name=None):
+    return types.SimpleNamespace(type=stix_type, id=f"{stix_type}--0000000{i}-0000-4000-8000-000000000000",
+                                 name=name, description="test object")
+
+
+def relationship(source, target):
+    return types.SimpleNamespace(source_ref=source.id, target_ref=target.id, relationship_type="uses",
+                                 description="because")
+
+
+ACTOR = make("threat-actor", 1, "APT Test")
+OTHER_ACTOR = make("threat-actor", 2, "Second Actor")
+MALWARE = make("malware", 3, "Loader")
+UNNAMED = make("x-custom", 4)
+
+
+def test_aliases_are_numbered_per_type_and_stable():
+    encoder = PromptEncoder([ACTOR, MALWARE, OTHER_ACTOR, UNNAMED])
+    assert [encoder.alias(obj) for obj in (ACTOR, MALWARE, OTHER_ACTOR, UNNAMED)] == ["TA1", "MW1", "TA2", "OBJ1"]
+    # The same id keeps its alias, whether given as an object or as the id itself
+    assert encoder.alias(ACTOR.id) == "TA1"
+    assert encoder.alias(make("threat-actor", 1, "APT Test")) == "TA1"
+    assert encoder.alias(make("malware", 5, "New")) == "MW2"
+
+
+def test_resolve_maps_aliases_back_to_ids():
+    encoder = PromptEncoder([ACTOR, MALWARE])
+    assert encoder.resolve("MW1") == MALWARE.id
+    assert encoder.resolve(" TA1 ") == ACTOR.id
+    assert encoder.resolve("TA99") is None
+
+
+def test_objects_json_lists_each_object_once():
+    encoder = PromptEncoder([ACTOR, MALWARE])
+    assert json.loads(encoder.objects_json([ACTOR, MALWARE, ACTOR])) == {
+        "TA1": {"type": "threat-actor", "name": "APT Test", "description": "test object"},
+        "MW1": {"type": "malware", "name": "Loader", "description": "test object"},
+    }
+
+
+def test_legends():
+    encoder = PromptEncoder([ACTOR, MALWARE, UNNAMED])
+    assert encoder.legend([ACTOR.id, UNNAMED.id, ACTOR.id]) == "TA1: threat-actor, APT Test\nOBJ1: x-custom"
+    relationships = [relationship(ACTOR, MALWARE), relationship(MALWARE, ACTOR)]
+    assert encoder.relationship_legend(relationships) == "TA1: threat-actor, APT Test\nMW1: malware, Loader"
+    assert encoder.describe_relationships(relationships[:1]) == "TA1 uses MW1: because"
+
+
+def test_expand_replaces_known_aliases_only():
+    encoder = PromptEncoder([ACTOR, MALWARE, UNNAMED])
+    assert encoder.expand("TA1 deploys MW1, unlike TA99 or TA1x.") == "APT Test deploys Loader, unlike TA99 or TA1x."
+    # Objects without a name fall back to their STIX id
+    assert encoder.expand("See OBJ1.") == f"See {UNNAMED.id}."
+
+
+def test_expand_stream_rebuilds_aliases_split_across_chunks():
+    encoder = PromptEncoder([ACTOR, MALWARE])
+    chunks = ["In the story T", "A", "1 used M", "W1", " and TA", "99"]
+    expanded = list(encoder.expand_stream(chunks))
+    assert "".join(expanded) == "In the story APT Test used Loader and TA99"
+    # The split alias is held back and expanded as a whole
+    assert any("APT Test" in chunk for chunk in expanded)
@@ -0,0 +1,49 @@
+import pytest
+
+from StixObjectLang import registry
+
+
+def test_resolve_backend_precedence(monkeypatch):
+    monkeypatch.setattr(registry, "DEFAULT_BACKEND", "llm")
+    monkeypatch.delenv("STIX_GEN_BACKEND_THREAT_ACTOR", raising=False)
+    assert registry.resolve_backend("threat-actor") == "llm"
+
+    monkeypatch.setenv("STIX_GEN_BACKEND_THREAT_ACTOR", "faker")
+    assert registry.resolve_backend("threat-actor") == "faker"
+    assert registry.resolve_backend("malware") == "llm"
+    # An explicit backend wins over the environment
+    assert registry.resolve_backend("threat-actor", "llm") == "llm"
+
+
+def test_resolve_backend_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        registry.resolve_backend("malware", "gpt-2")
+
+
+def test_unknown_type_is_a_key_error():
+    with pytest.raises(KeyError):
+        registry.get_module("x-custom")
+
+
+def test_schema_is_named_after_its_module():
+    assert registry.get_schema("intrusion-set").__name__ == "IntrusionSet"
+
+
+def test_generators_are_built_once_on_first_use(monkeypatch):
+    module = registry.get_module("tool")
+    builds = []
+    monkeypatch.setattr(module, "build_generator", lambda: builds.append(1) or object())
+    registry.clear()
+    try:
+        first = registry.get_generator("tool")
+        assert registry.get_generator("tool") is first
+        assert builds == [1]
+    finally:
+        registry.clear()
+
+
+def test_faker_backend_does_not_build_llm_generators():
+    registry.clear()
+    records = registry.generate("tool", 3, backend="faker")
+    assert len(records) == 3
+    assert "tool" not in registry._generators
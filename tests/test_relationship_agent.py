@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+import types
+import uuid
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from relationship_builder import STIXRelationshipAgent
+from relationship_cache import RelationshipCache
+from stix_bundler import dumps
+from StixObjectLang import metrics, seeding
+
+TYPES = ["threat-actor", "malware", "tool", "identity"]
+
+
+class FakeChat(FakeListChatModel):
+    """
+    Answers batch prompts with each pair's first valid relationship and single-pair prompts
+    likewise. The first batch (every pair sourced from Object 0) is slow; `drop_first` makes one
+    element per batch invalid.
+    """
+    responses: list = ["unused"]
+    model_name: str = "fake"
+    drop_first: bool = False
+    calls: list = []
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        text = messages[-1].content
+        with _calls_lock:
+            self.calls.append(text)
+        if "candidate pairs" in text:
+            start = text.index("\n\n[") + 2
+            pairs = json.loads(text[start:text.index("]\n\nTask") + 1])
+            start = text.index("\n\n{") + 2
+            objects = json.loads(text[start:text.index("}\n\n") + 1])
+            if all(objects[p["source"]]["name"] == "Object 0" for p in pairs):
+                time.sleep(0.3)
+            out = [{"pair_id": p["pair_id"], "relationship_type": p["valid_relationships"][0], "justification": "b"}
+                   for p in pairs]
+            if self.drop_first:
+                out[0]["relationship_type"] = "bogus"
+            return json.dumps(out)
+        if "Valid relationship types:" not in text:
+            time.sleep(0.2)
+            return "A story."
+        line = next(line for line in text.splitlines() if "Valid relationship types:" in line)
+        relationship_type = line.split(":", 1)[1].split(",")[0].strip()
+        return json.dumps({"relationship_type": relationship_type, "justification": "single"})
+
+
+_calls_lock = threading.Lock()
+
+
+def make_objects(n=24):
+    return [types.SimpleNamespace(type=stix_type, id=f"{stix_type}--{uuid.UUID(int=i + 1, version=4)}",
+                                  name=f"Object {i}", description="test object")
+            for i in range(n) for stix_type in [TYPES[i % len(TYPES)]]]
+
+
+def make_agent(cache=None, **llm_options):
+    agent = STIXRelationshipAgent(cache=cache, use_cache=cache is not None, batch_size=4, max_concurrency=4)
+    agent.llm = FakeChat(calls=[], **llm_options)
+    return agent
+
+
+def test_batches_are_yielded_as_they_complete():
+    agent = make_agent()
+    with seeding.run(1):
+        indices = [i for i, _ in agent.iter_relationships(make_objects())]
+    # The first batch was slow, so later pairs came back before pair 0
+    assert indices[0] != 0
+    assert sorted(indices) == list(range(len(indices)))
+
+
+def test_collected_relationships_are_in_pair_order_whatever_the_timing():
+    with seeding.run(1):
+        first = make_agent().generate_relationships(make_objects())
+    with seeding.run(1):
+        second = make_agent().generate_relationships(make_objects())
+    assert first and dumps(first) == dumps(second)
+
+
+def test_invalid_batch_elements_are_retried_one_pair_at_a_time():
+    agent = make_agent(drop_first=True)
+    with seeding.run(1):
+        relationships = agent.generate_relationships(make_objects())
+    assert any(r.description == "single" for r in relationships)
+    assert any("Valid relationship types:" in call for call in agent.llm.calls)
+
+
+def test_retried_pairs_are_cached_under_the_batch_key(tmp_path):
+    cache = RelationshipCache(str(tmp_path / "cache.sqlite3"))
+    with seeding.run(1):
+        first = make_agent(cache, drop_first=True).generate_relationships(make_objects())
+    agent = make_agent(cache)
+    with seeding.run(1):
+        second = agent.generate_relationships(make_objects())
+    # Every pair, retried ones included, is found under the key batched runs look up
+    assert agent.llm.calls == []
+    assert dumps(first) == dumps(second)
+
+
+def test_story_generation_is_timed_as_the_story_stage():
+    agent = make_agent()
+    with seeding.run(1), metrics.request_summary() as summary:
+        relationships = agent.generate_relationships(make_objects(8))
+        story = agent.analyze_story(relationships)
+    assert story == "A story."
+    # The stage covers the (slow) story call itself, not just building the prompt encoder
+    assert summary.to_dict()["stages"]["story"]["seconds"] >= 0.2
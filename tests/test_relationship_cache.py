@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+import relationship_cache
+from relationship_cache import RelationshipCache
+
+SOURCE = {"id": "malware--1", "type": "malware", "name": "OrchidBot"}
+TARGET = {"id": "tool--1", "type": "tool", "name": "Mimikatz"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RelationshipCache(str(tmp_path / "cache.sqlite3"), ttl=60, max_entries=10)
+
+
+def test_keys_are_stable_and_cover_every_input():
+    key = RelationshipCache.make_key(SOURCE, TARGET, ["uses"], "gpt-4o", "prompt")
+    assert key == RelationshipCache.make_key(dict(SOURCE), dict(TARGET), ("uses",), "gpt-4o", "prompt")
+    assert key != RelationshipCache.make_key(TARGET, SOURCE, ["uses"], "gpt-4o", "prompt")
+    assert key != RelationshipCache.make_key(SOURCE, TARGET, ["uses"], "gpt-4o-mini", "prompt")
+    assert key != RelationshipCache.make_key(SOURCE, TARGET, ["uses"], "gpt-4o", "other prompt")
+
+
+def test_round_trip_and_hit_counts(cache):
+    assert cache.get("a") is None
+    cache.set("a", {"relationship_type": "uses"})
+    assert cache.get("a") == {"relationship_type": "uses"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    cache.set("a", {"relationship_type": "uses"})
+    now = relationship_cache.time.time()
+    monkeypatch.setattr(relationship_cache.time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+
+
+def test_hits_are_written_on_flush_not_on_lookup(cache):
+    cache.set("a", {})
+    reader = sqlite3.connect(cache.path)
+    (written,) = reader.execute("SELECT last_access FROM relationship_decisions WHERE key = 'a'").fetchone()
+    cache.get("a")
+    assert reader.execute("SELECT last_access FROM relationship_decisions").fetchone()[0] == written
+    cache.flush()
+    assert reader.execute("SELECT last_access FROM relationship_decisions").fetchone()[0] > written
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.set_many([(f"k{i}", {"i": i}) for i in range(10)])
+    # k0 is the oldest write but the most recent hit
+    cache.get("k0")
+    cache.set("k10", {"i": 10})
+    assert cache.stats()["entries"] <= 10
+    assert cache.get("k0") == {"i": 0}
+    assert cache.get("k1") is None
+    assert cache.get("k10") == {"i": 10}
+
+
+def test_size_is_tracked_across_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    RelationshipCache(path, max_entries=5).set_many([(f"k{i}", {}) for i in range(5)])
+    reopened = RelationshipCache(path, max_entries=5)
+    assert reopened._size == 5
+    reopened.set("k5", {})
+    assert reopened.stats()["entries"] <= 5
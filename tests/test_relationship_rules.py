@@ -0,0 +1,80 @@
+import types
+import uuid
+from collections import Counter
+
+import pytest
+
+import fast_stix
+from relationship_builder import relationship_map
+from relationship_rules import RuleBasedRelationshipEngine, describe_reasons
+from stix_bundler import dumps
+from StixObjectLang import seeding
+
+TYPES = ["threat-actor", "malware", "tool", "identity", "campaign", "vulnerability", "infrastructure", "indicator"]
+WORDS = ["ransomware", "espionage", "banking", "phishing", "loader", "stealer", "botnet", "finance", "energy"]
+
+
+def make_objects(n=160):
+    return [types.SimpleNamespace(type=TYPES[i % len(TYPES)],
+                                  id=f"{TYPES[i % len(TYPES)]}--{uuid.UUID(int=i + 1, version=4)}",
+                                  name=f"Object {i}",
+                                  description=" ".join(WORDS[(i + k) % len(WORDS)] for k in range(3)))
+            for i in range(n)]
+
+
+def run(engine, stix_objects):
+    with seeding.run(7):
+        return engine.run(stix_objects)
+
+
+def test_relationships_are_valid_and_capped_per_source():
+    engine = RuleBasedRelationshipEngine(max_relationships_per_object=3)
+    stix_objects = make_objects()
+    by_id = {obj.id: obj for obj in stix_objects}
+    relationships = run(engine, stix_objects)["relationships"]
+    assert relationships
+    for r in relationships:
+        assert r.relationship_type in relationship_map[by_id[r.source_ref].type][by_id[r.target_ref].type]
+    assert max(Counter(r.source_ref for r in relationships).values()) <= 3
+
+
+def test_min_score_filters_pairs():
+    stix_objects = make_objects()
+    everything = RuleBasedRelationshipEngine(min_score=0).select_pairs(stix_objects)[0]
+    strict = RuleBasedRelationshipEngine(min_score=0.9).select_pairs(stix_objects)[0]
+    assert len(strict) < len(everything)
+
+
+def test_seeded_output_is_byte_identical():
+    engine = RuleBasedRelationshipEngine()
+    assert dumps(run(engine, make_objects())) == dumps(run(engine, make_objects()))
+
+
+def test_fast_records_match_stix2_objects(monkeypatch):
+    engine = RuleBasedRelationshipEngine()
+    stix2_result = run(engine, make_objects())
+    monkeypatch.setattr(fast_stix, "OBJECT_MODE", "fast")
+    monkeypatch.setattr(fast_stix, "VALIDATION_MODE", "full")
+    fast_result = run(engine, make_objects())
+    assert all(isinstance(r, fast_stix.StixRecord) for r in fast_result["relationships"])
+    assert dumps(fast_result["relationships"]) == dumps(stix2_result["relationships"])
+
+
+def test_evaluation_is_marked_heuristic():
+    result = run(RuleBasedRelationshipEngine(), make_objects())
+    evaluation = result["evaluation"]
+    assert result["engine"] == evaluation["engine"] == "rules"
+    assert "score" not in evaluation
+    assert 0 <= evaluation["heuristic_score"] <= 1
+
+
+def test_empty_input():
+    result = run(RuleBasedRelationshipEngine(), [])
+    assert result["relationships"] == []
+    assert result["evaluation"]["heuristic_score"] is None
+
+
+@pytest.mark.parametrize("reasons, text", [(0, "compatible object types"),
+                                           (8 | 1, "matching object attributes, overlapping description keywords")])
+def test_describe_reasons(reasons, text):
+    assert describe_reasons(reasons) == text
@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+from StixObjectLang import replay
+
+
+def model(*responses):
+    return replay.RecordReplayChatModel(inner=FakeListChatModel(responses=list(responses)))
+
+
+def test_recorded_calls_replay_without_the_model(tmp_path):
+    path = str(tmp_path / "run.json")
+    with replay.scope("record", path):
+        recording = model("first", "second")
+        recorded = [recording.invoke([HumanMessage(content="hi")]).content for _ in range(2)]
+        recorded.append(recording.invoke([HumanMessage(content="other")]).content)
+    assert recorded == ["first", "second", "first"]
+
+    # Same model parameters, so the same keys; replay never advances it
+    replaying = model("first", "second")
+    with replay.scope("replay", path):
+        # Repeated prompts are answered in call order
+        assert [replaying.invoke([HumanMessage(content="hi")]).content for _ in range(2)] == recorded[:2]
+        assert replaying.invoke([HumanMessage(content="other")]).content == "first"
+        with pytest.raises(replay.ReplayMiss):
+            replaying.invoke([HumanMessage(content="hi")])
+    assert replaying.inner.i == 0
+
+
+def test_call_keys_replace_the_prompt_hash(tmp_path):
+    path = str(tmp_path / "run.json")
+    with replay.scope("record", path), replay.call_key("malware/0"):
+        model("answer").invoke([HumanMessage(content="prompt with rolling examples")])
+    with replay.scope("replay", path), replay.call_key("malware/0"):
+        replayed = model("other model").invoke([HumanMessage(content="changed")])
+    assert replayed.content == "answer"
+
+
+def test_streamed_calls_are_recorded_whole(tmp_path):
+    path = str(tmp_path / "run.json")
+    with replay.scope("record", path):
+        streamed = "".join(chunk.content for chunk in model("a story").stream([HumanMessage(content="s")]))
+    with replay.scope("replay", path):
+        chunks = list(model("a story").stream([HumanMessage(content="s")]))
+    assert [chunk.content for chunk in chunks] == [streamed]
+
+
+def test_off_mode_passes_calls_through():
+    with replay.scope("off") as cassette:
+        assert cassette is None
+        assert not replay.active()
+        assert model("live").invoke([HumanMessage(content="x")]).content == "live"
+
+
+def test_scope_and_cassette_names_are_validated(tmp_path):
+    with pytest.raises(ValueError):
+        with replay.scope("rewind", str(tmp_path / "x.json")):
+            pass
+    with pytest.raises(ValueError):
+        with replay.scope("record"):
+            pass
+    with pytest.raises(FileNotFoundError):
+        with replay.scope("replay", str(tmp_path / "missing.json")):
+            pass
+    assert replay.cassette_path("seed-1").endswith("seed-1.json")
+    for name in ("../etc", ".hidden", "a/b"):
+        with pytest.raises(ValueError):
+            replay.cassette_path(name)
@@ -0,0 +1,63 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from StixObjectLang import cancellation, seeding
+
+
+def draw():
+    return [seeding.new_id("malware") for _ in range(3)], [seeding.rng.random() for _ in range(3)]
+
+
+def test_a_seed_repeats_ids_values_and_timestamps():
+    with seeding.run(42):
+        first, now = draw(), seeding.utcnow()
+    with seeding.run(42):
+        assert draw() == first
+        assert seeding.utcnow() == now == seeding.SEEDED_EPOCH
+    with seeding.run(43):
+        assert draw() != first
+
+
+def test_outside_a_run_ids_are_random_uuid4():
+    assert seeding.current_run() is None
+    object_id = seeding.new_id("tool")
+    assert uuid.UUID(object_id.split("--")[1]).version == 4
+    with seeding.run(None) as seeded:
+        assert seeded is None
+        assert seeding.new_id("tool") != object_id
+
+
+def test_streams_are_independent_of_the_order_they_are_used_in():
+    with seeding.run(1):
+        with seeding.stream("a"):
+            a = draw()
+        with seeding.stream("b"):
+            b = draw()
+    with seeding.run(1):
+        with seeding.stream("b"):
+            assert draw() == b
+        with seeding.stream("a"):
+            assert draw() == a
+
+
+def test_content_ids_depend_on_content_not_on_draw_order():
+    with seeding.run(1):
+        seeding.new_id("malware")
+        first = seeding.new_id("relationship", "malware--1", "uses", "tool--1")
+        repeat = seeding.new_id("relationship", "malware--1", "uses", "tool--1")
+    with seeding.run(1):
+        assert seeding.new_id("relationship", "malware--1", "uses", "tool--1") == first
+    assert repeat != first
+
+
+def test_the_run_reaches_pools_through_cancellation_submit():
+    def in_stream(name):
+        with seeding.stream(name):
+            return draw()
+
+    results = []
+    for workers in (1, 4):
+        with seeding.run(9), ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [cancellation.submit(executor, in_stream, f"type-{i}") for i in range(8)]
+            results.append([future.result() for future in futures])
+    assert results[0] == results[1]
@@ -0,0 +1,161 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from stix_bundler import (BUNDLE_ENVELOPE_BYTES, BundleWriter, bundle_dict, dumps, iter_bundle_chunks,
+                          plan_shards, shard_bundle, write_bundle)
+from StixObjectLang import seeding
+
+
+def make_objects(n=5):
+    return [{"type": "malware", "id": f"malware--{i}", "name": f"Malware {i}"} for i in range(n)]
+
+
+def test_json_writer_matches_a_single_encode():
+    objects = make_objects()
+    buffer = io.BytesIO()
+    with BundleWriter(buffer, bundle_id="bundle--1") as writer:
+        writer.write_all(objects)
+    assert buffer.getvalue() == dumps(bundle_dict(objects, bundle_id="bundle--1"))
+    assert (writer.count, writer.bytes_written) == (5, len(buffer.getvalue()))
+
+
+def test_empty_bundle_is_valid_json():
+    buffer = io.BytesIO()
+    BundleWriter(buffer, bundle_id="bundle--1").close()
+    assert json.loads(buffer.getvalue()) == {"type": "bundle", "id": "bundle--1", "objects": []}
+
+
+def test_ndjson_writes_one_object_per_line_and_accepts_encoded_bytes():
+    objects = make_objects(3)
+    buffer = io.BytesIO()
+    with BundleWriter(buffer, format="ndjson") as writer:
+        writer.write(objects[0])
+        writer.write(dumps(objects[1]))
+        writer.write(objects[2])
+    assert [json.loads(line) for line in buffer.getvalue().splitlines()] == objects
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        BundleWriter(io.BytesIO(), format="xml")
+
+
+def test_write_bundle_to_a_path(tmp_path):
+    path = tmp_path / "bundle.json"
+    objects = make_objects(2)
+    relationships = ({"type": "relationship", "id": "relationship--0"} for _ in range(1))
+    assert write_bundle(str(path), iter(objects), relationships) == 3
+    assert len(json.loads(path.read_bytes())["objects"]) == 3
+
+
+def test_chunks_join_to_the_whole_bundle():
+    objects = make_objects(200)
+    chunks = list(iter_bundle_chunks(objects, bundle_id="bundle--1", chunk_size=1024))
+    assert len(chunks) > 2
+    assert b"".join(chunks) == dumps(bundle_dict(objects, bundle_id="bundle--1"))
+
+
+def make_graph(actors=6, malware_per_actor=4):
+    objects, relationships = [], []
+    for a in range(actors):
+        actor = {"type": "threat-actor", "id": f"threat-actor--{a}", "name": f"Actor {a}"}
+        objects.append(actor)
+        for m in range(malware_per_actor):
+            malware = {"type": "malware", "id": f"malware--{a}-{m}", "name": "x" * (10 * m),
+                       "created_by_ref": actor["id"]}
+            objects.append(malware)
+            relationships.append({"type": "relationship", "id": f"relationship--{a}-{m}",
+                                  "source_ref": actor["id"], "target_ref": malware["id"],
+                                  "relationship_type": "uses"})
+    # Interleave so shard placement cannot rely on input order
+    return relationships[::2] + objects + relationships[1::2]
+
+
+def plan(objects, **limits):
+    return plan_shards(objects, [dumps(obj) for obj in objects], **limits)
+
+
+def test_every_object_lands_in_exactly_one_shard():
+    objects = make_graph()
+    shards = plan(objects, max_objects=7)
+    assert sorted(index for shard in shards for index in shard) == list(range(len(objects)))
+
+
+def test_shards_respect_the_object_limit():
+    shards = plan(make_graph(), max_objects=7)
+    assert max(len(shard) for shard in shards) <= 7
+    assert len(shards) > 1
+
+
+def test_shards_respect_the_byte_limit():
+    objects = make_graph()
+    encoded = [dumps(obj) for obj in objects]
+    max_bytes = 1200
+    for shard in plan_shards(objects, encoded, max_bytes=max_bytes):
+        assert BUNDLE_ENVELOPE_BYTES + sum(len(encoded[i]) + 1 for i in shard) <= max_bytes
+
+
+def test_an_object_larger_than_the_byte_limit_gets_its_own_shard():
+    objects = [{"type": "malware", "id": "malware--big", "name": "x" * 5000},
+               {"type": "malware", "id": "malware--small", "name": "y"}]
+    assert plan(objects, max_bytes=1000) == [[0], [1]]
+
+
+def test_relationships_share_a_shard_with_their_source():
+    objects = make_graph()
+    shard_of = {objects[i]["id"]: n for n, shard in enumerate(plan(objects, max_objects=9)) for i in shard}
+    for obj in objects:
+        if obj["type"] == "relationship":
+            assert shard_of[obj["id"]] == shard_of[obj["source_ref"]]
+
+
+def test_shard_bundle_writes_bundles_and_a_cross_reference_manifest(tmp_path):
+    objects = make_graph()
+    manifest = shard_bundle(objects, str(tmp_path), max_objects=7)
+    assert json.loads((tmp_path / "manifest.json").read_bytes()) == manifest
+    assert sum(entry["objects"] for entry in manifest["shards"]) == manifest["total_objects"] == len(objects)
+
+    shard_of = {}
+    for entry in manifest["shards"]:
+        data = (tmp_path / entry["file"]).read_bytes()
+        bundle = json.loads(data)
+        assert (bundle["id"], len(bundle["objects"]), len(data)) == (entry["bundle_id"], entry["objects"], entry["bytes"])
+        shard_of.update((obj["id"], entry["file"]) for obj in bundle["objects"])
+    for reference in manifest["cross_shard_references"]:
+        assert shard_of[reference["object"]] == reference["shard"]
+        assert shard_of[reference["ref"]] == reference["ref_shard"] != reference["shard"]
+
+
+def test_shard_bundle_needs_a_limit(tmp_path):
+    with pytest.raises(ValueError):
+        shard_bundle(make_graph(), str(tmp_path))
+
+
+def test_seeded_shard_bundle_ids_repeat_whatever_the_worker_count(tmp_path):
+    with seeding.run(5):
+        first = shard_bundle(make_graph(), str(tmp_path / "a"), max_objects=5, workers=1)
+    with seeding.run(5):
+        second = shard_bundle(make_graph(), str(tmp_path / "b"), max_objects=5, workers=8)
+    assert [entry["bundle_id"] for entry in first["shards"]] == [entry["bundle_id"] for entry in second["shards"]]
+    for entry in first["shards"]:
+        assert (tmp_path / "a" / entry["file"]).read_bytes() == (tmp_path / "b" / entry["file"]).read_bytes()
+
+
+def test_job_bundle_route_returns_a_zip_of_shards():
+    import app
+
+    store = app.get_job_manager().store
+    job_id = store.create({})
+    objects = make_graph()
+    store.append_items(job_id, 0, [("object", dumps(obj).decode()) for obj in objects])
+    response = app.app.test_client().get(f"/jobs/{job_id}/bundle?max_objects=10&format=ndjson")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        lines = [line for entry in manifest["shards"] for line in archive.read(entry["file"]).splitlines()]
+    assert manifest["format"] == "ndjson"
+    assert sorted(json.loads(line)["id"] for line in lines) == sorted(obj["id"] for obj in objects)
+    assert app.app.test_client().get(f"/jobs/{job_id}/bundle?max_bytes=0").status_code == 400